@@ -0,0 +1,79 @@
+"""Compare end-to-end build latency of the cold subprocess path against the
+warm compile server.
+
+    python -m benchmarks.bench_compile_server --runs 3 [--script path.py]
+
+Each run goes through NuitkaCompiler.compile exactly like a GUI build.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from src import compile_server
+from src.compiler import NuitkaCompiler
+
+SAMPLE_SCRIPT = 'print("hello from the compile server benchmark")\n'
+
+def time_builds(script: str, output_dir: str, runs: int, use_server: bool) -> list:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        success, error = NuitkaCompiler.compile(
+            script,
+            {'output_dir': output_dir, 'use_compile_server': use_server},
+            lambda text: None,
+            lambda: None
+        )
+        timings.append(time.perf_counter() - start)
+        if not success:
+            sys.exit(f"Build failed: {error}")
+    return timings
+
+def wait_for_server(timeout: float = 30.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = compile_server.get_status()
+        if status:
+            return status
+        time.sleep(0.2)
+    sys.exit("Compile server did not start")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--script', help="Script to build (default: a tiny sample)")
+    args = parser.parse_args()
+
+    if not compile_server.is_supported():
+        sys.exit("The compile server is not supported on this platform")
+
+    with tempfile.TemporaryDirectory(prefix='bench-compile-server-') as tmp:
+        script = args.script
+        if not script:
+            script = os.path.join(tmp, 'sample.py')
+            with open(script, 'w', encoding='utf-8') as f:
+                f.write(SAMPLE_SCRIPT)
+        output_dir = os.path.join(tmp, 'out')
+
+        if not compile_server.get_status():
+            compile_server.start_server(NuitkaCompiler.get_python_path())
+        wait_for_server()
+
+        # One build per path first, so both compare with a warm build directory
+        time_builds(script, output_dir, 1, False)
+        cold = time_builds(script, output_dir, args.runs, False)
+        warm = time_builds(script, output_dir, args.runs, True)
+
+    print(f"{'path':<8}{'median s':>10}{'mean s':>10}{'min s':>10}")
+    for name, timings in (('cold', cold), ('warm', warm)):
+        print(f"{name:<8}{statistics.median(timings):>10.2f}"
+              f"{statistics.mean(timings):>10.2f}{min(timings):>10.2f}")
+    saved = statistics.median(cold) - statistics.median(warm)
+    print(f"\nWarm server saves {saved:.2f}s per build "
+          f"({saved / statistics.median(cold) * 100:.1f}%)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# Stand-in for the real Nuitka package, used by the benchmarks only
@@ -0,0 +1,49 @@
+"""Emit Nuitka-like build output at a controlled rate.
+
+FAKE_NUITKA_LINES   number of module lines to print (default 10000)
+FAKE_NUITKA_RATE    lines per second, 0 for as fast as possible (default 0)
+FAKE_NUITKA_EXIT    exit code (default 0)
+
+Every line carries a wall-clock stamp "[ts=...]" so consumers can measure
+latency from emission to display.
+"""
+import os
+import sys
+import time
+
+TEMPLATES = (
+    "Nuitka-Progress: Compiling module 'pkg.module_{i}'.",
+    "Nuitka-Optimization: pkg/module_{i}.py:{line} : new_constant : Value propagated for 'x' from '{line}'.",
+    "Nuitka-Inclusion: Included module 'pkg.module_{i}' found via 'import' statement.",
+    "Nuitka:INFO: Optimizing module 'pkg.module_{i}', pass {line}.",
+    "Nuitka-Scons: Compiling C file 'module.pkg.module_{i}.c'.",
+)
+
+def main():
+    count = int(os.environ.get('FAKE_NUITKA_LINES', '10000'))
+    rate = float(os.environ.get('FAKE_NUITKA_RATE', '0'))
+    interval = 1.0 / rate if rate > 0 else 0.0
+
+    print("Nuitka-Options: Used command line options: " + " ".join(sys.argv[1:]), flush=True)
+    print("Nuitka: Starting Python compilation with Nuitka 'fake' on Python '3' commercial None.",
+          flush=True)
+
+    start = time.monotonic()
+    for i in range(count):
+        line = TEMPLATES[i % len(TEMPLATES)].format(i=i, line=i % 997)
+        print(f"{line} [ts={time.time():.6f}]", flush=interval > 0)
+        if i % 1000 == 999:
+            print(f"Nuitka-Scons:WARNING: Slow C compilation detected for module_{i}.",
+                  file=sys.stderr, flush=True)
+        if interval:
+            # Pace against the start time so the average rate stays exact
+            delay = start + (i + 1) * interval - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+    print("Nuitka: Linking executable.", flush=True)
+    print("Nuitka: Successfully created 'fake.bin'.", flush=True)
+    sys.exit(int(os.environ.get('FAKE_NUITKA_EXIT', '0')))
+
+if __name__ == "__main__":
+    main()
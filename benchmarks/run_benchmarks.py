@@ -0,0 +1,227 @@
+"""Benchmarks for the compile pipeline and the GUI log view.
+
+    python -m benchmarks.run_benchmarks                    # compare with baseline
+    python -m benchmarks.run_benchmarks --update-baseline  # store new numbers
+
+Runs headless (QT_QPA_PLATFORM=offscreen) against the fake "nuitka" module in
+benchmarks/fake_nuitka, so no real C compilation happens. Every benchmark runs
+in its own process with a throwaway HOME, so build logs and caches of the
+user are not touched. Exits with status 1 if a metric regressed.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_ROOT = BENCH_DIR.parent
+FAKE_NUITKA_DIR = BENCH_DIR / 'fake_nuitka'
+BASELINE_FILE = BENCH_DIR / 'baseline.json'
+
+COMPILE_LINES = 200000
+# Below what the GUI thread can render on one core (about 0.7 ms per line),
+# faster output builds up a backlog and the latency only measures its length
+GUI_LINES = 2000
+GUI_RATE = 400
+# Processes per benchmark, the median of each metric is reported
+REPEATS = {'gui_latency': 3}
+STARTUP_RUNS = 5
+
+# metric: (better direction, relative tolerance, absolute slack)
+METRICS = {
+    'compile_lines_per_sec': ('higher', 0.30, 0),
+    'gui_latency_p50_ms': ('lower', 0.50, 5),
+    'gui_latency_p95_ms': ('lower', 0.50, 10),
+    'gui_peak_rss_mb': ('lower', 0.20, 10),
+    'startup_s': ('lower', 0.30, 0.1),
+}
+
+_STAMP = re.compile(r"\[ts=(\d+\.\d+)\]")
+
+def _write_script(directory: str) -> str:
+    script = os.path.join(directory, 'bench_app.py')
+    with open(script, 'w', encoding='utf-8') as f:
+        f.write('print("benchmark")\n')
+    return script
+
+def bench_compile_throughput() -> dict:
+    """Lines per second through NuitkaCompiler.compile"""
+    from src.compiler import NuitkaCompiler
+
+    os.environ['FAKE_NUITKA_LINES'] = str(COMPILE_LINES)
+    os.environ['FAKE_NUITKA_RATE'] = '0'
+    with tempfile.TemporaryDirectory() as tmp:
+        script = _write_script(tmp)
+        start = time.perf_counter()
+        success, error = NuitkaCompiler.compile(script, {'output_dir': tmp}, lambda text: None, lambda: None)
+        elapsed = time.perf_counter() - start
+    if not success:
+        raise RuntimeError(error)
+    return {'compile_lines_per_sec': COMPILE_LINES / elapsed}
+
+def bench_gui_latency() -> dict:
+    """Emission-to-paint latency of output lines through CompilerThread, and peak memory"""
+    import resource
+    from PyQt6.QtCore import QObject, QEvent
+    from PyQt6.QtWidgets import QApplication, QScrollArea
+    from src.nuitka_gui import NuitkaGUI, CompilerThread
+
+    os.environ['FAKE_NUITKA_LINES'] = str(GUI_LINES)
+    os.environ['FAKE_NUITKA_RATE'] = str(GUI_RATE)
+
+    app = QApplication(sys.argv)
+    window = NuitkaGUI()
+    window.resize(1200, 1000)
+    window.show()
+    # Widgets scrolled out of view are never painted
+    window.findChild(QScrollArea).ensureWidgetVisible(window.output_text)
+    app.processEvents()
+
+    pending = []
+    latencies = []
+
+    class PaintProbe(QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Type.Paint and pending:
+                now = time.time()
+                latencies.extend(now - stamp for stamp in pending)
+                pending.clear()
+            return False
+
+    def record(text):
+        match = _STAMP.search(text)
+        if match:
+            pending.append(float(match.group(1)))
+
+    probe = PaintProbe()
+    window.output_text.viewport().installEventFilter(probe)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        thread = CompilerThread(_write_script(tmp), dict(window.options, output_dir=tmp))
+        # Same wiring as NuitkaGUI.compile, the probe runs after the real slot
+        thread.output_signal.connect(window.update_output)
+        thread.output_signal.connect(record)
+        thread.finished_signal.connect(lambda success, error: app.quit())
+        thread.start()
+        app.exec()
+        thread.wait()
+
+    if not latencies:
+        raise RuntimeError("No paint events observed")
+    latencies.sort()
+    return {
+        'gui_latency_p50_ms': statistics.median(latencies) * 1000,
+        'gui_latency_p95_ms': latencies[int(len(latencies) * 0.95)] * 1000,
+        # ru_maxrss is in kilobytes on Linux
+        'gui_peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    }
+
+STARTUP_SNIPPET = """
+import sys, time
+start = time.perf_counter()
+from PyQt6.QtWidgets import QApplication
+app = QApplication(sys.argv)
+from src.nuitka_gui import NuitkaGUI
+window = NuitkaGUI()
+window.show()
+app.processEvents()
+print(time.perf_counter() - start)
+"""
+
+def bench_startup() -> dict:
+    """Time from interpreter start to the first shown window, median of fresh processes"""
+    timings = []
+    for _ in range(STARTUP_RUNS):
+        result = subprocess.run([sys.executable, '-c', STARTUP_SNIPPET], cwd=REPO_ROOT,
+                                capture_output=True, text=True, check=True)
+        timings.append(float(result.stdout.strip().splitlines()[-1]))
+    return {'startup_s': statistics.median(timings)}
+
+BENCHMARKS = {
+    'compile_throughput': bench_compile_throughput,
+    'gui_latency': bench_gui_latency,
+    'startup': bench_startup,
+}
+
+def run_isolated(name: str, home: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        'HOME': home,
+        'QT_QPA_PLATFORM': 'offscreen',
+        'PYTHONPATH': os.pathsep.join(filter(None, [str(FAKE_NUITKA_DIR), str(REPO_ROOT),
+                                                    os.environ.get('PYTHONPATH')])),
+    })
+    result = subprocess.run([sys.executable, '-m', 'benchmarks.run_benchmarks', '--single', name],
+                            cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Benchmark {name} failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def compare(results: dict, baseline: dict) -> list:
+    """Return a description of every metric that regressed"""
+    regressions = []
+    for metric, (direction, tolerance, slack) in METRICS.items():
+        if metric not in results or metric not in baseline:
+            continue
+        value, base = results[metric], baseline[metric]
+        if direction == 'higher':
+            limit = base * (1 - tolerance) - slack
+            failed = value < limit
+        else:
+            limit = base * (1 + tolerance) + slack
+            failed = value > limit
+        if failed:
+            regressions.append(f"{metric}: {value:.2f} (baseline {base:.2f}, limit {limit:.2f})")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Nuitka GUI benchmarks")
+    parser.add_argument('--single', choices=BENCHMARKS, help=argparse.SUPPRESS)
+    parser.add_argument('--only', choices=BENCHMARKS, action='append',
+                        help="Run only this benchmark (repeatable)")
+    parser.add_argument('--update-baseline', action='store_true',
+                        help="Store the results as the new baseline")
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(BENCHMARKS[args.single]()))
+        return
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='nuitka-gui-bench-') as home:
+        for name in args.only or BENCHMARKS:
+            print(f"Running {name}...", file=sys.stderr)
+            runs = [run_isolated(name, home) for _ in range(REPEATS.get(name, 1))]
+            results.update({metric: statistics.median(run[metric] for run in runs) for metric in runs[0]})
+
+    for metric, value in results.items():
+        print(f"{metric:<26}{value:>14.2f}")
+
+    if args.update_baseline:
+        baseline = {}
+        if BASELINE_FILE.exists():
+            baseline = json.loads(BASELINE_FILE.read_text(encoding='utf-8'))
+        baseline.update(results)
+        BASELINE_FILE.write_text(json.dumps(baseline, indent=4) + "\n", encoding='utf-8')
+        print(f"Baseline written to {BASELINE_FILE}")
+        return
+
+    if not BASELINE_FILE.exists():
+        print("No baseline stored yet, run with --update-baseline")
+        return
+    regressions = compare(results, json.loads(BASELINE_FILE.read_text(encoding='utf-8')))
+    if regressions:
+        print("\nRegressions against baseline:")
+        for regression in regressions:
+            print("  " + regression)
+        sys.exit(1)
+    print("\nNo regressions against baseline")
+
+if __name__ == "__main__":
+    main()
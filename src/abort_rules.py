@@ -0,0 +1,92 @@
+import json
+import re
+from typing import List, Optional, Tuple
+
+from src.config import ABORT_RULES_FILE
+
+# Output that means the build cannot succeed anymore, as (name, regex)
+DEFAULT_RULES = [
+    ("Nuitka fatal error", r"^(Nuitka[\w-]*:\s*)?FATAL:"),
+    ("C compile error", r"^\S.*?:\d+(:\d+)?:\s+(fatal\s+)?error:"
+                        r"|^(cc1\w*|gcc|clang)(-[\d.]+)?(\.exe)?: fatal error:"),
+    ("MSVC compile error", r"\(\d+(,\d+)?\)\s*:\s+(fatal\s+)?error\s+C\d{4}:"),
+    ("Link error", r"undefined reference to|collect2(\.exe)?: error:"
+                   r"|\b(ld|ld\.lld|ld\.gold|mold)(\.exe)?: (fatal|error):|fatal error LNK\d{4}:"),
+    ("Compiler crash", r"internal compiler error|Killed signal terminated program"),
+]
+
+# Every line the default rules match contains one of these, all other
+# lines skip the regular expressions
+DEFAULT_HINTS = ("rror", "FATAL", "fatal", "undefined reference", "Killed")
+_HINTS = re.compile("|".join(re.escape(hint) for hint in DEFAULT_HINTS))
+
+# The GUI shows output lines starting with this as the failure reason
+ABORT_MARKER = "Build aborted, fatal output: "
+
+class AbortRules:
+    """Compiled rules of one build.
+
+    match() runs once per output line, so the rules are joined into one
+    alternation, and the default ones only run on lines containing a hint.
+    """
+
+    def __init__(self, default: List[Tuple[str, str]], extra: List[Tuple[str, str]]):
+        self.rules = [(name, re.compile(pattern)) for name, pattern in default + extra]
+        self.default = self._join(default)
+        self.extra = self._join(extra)
+
+    @staticmethod
+    def _join(rules: List[Tuple[str, str]]) -> List[re.Pattern]:
+        if not rules:
+            return []
+        try:
+            return [re.compile("|".join(f"(?:{pattern})" for _, pattern in rules))]
+        except re.error:
+            # Inline flags like (?i) must start a pattern, such rules stay separate
+            return [re.compile(pattern) for _, pattern in rules]
+
+    def __bool__(self) -> bool:
+        return bool(self.rules)
+
+    def match(self, line: str) -> Optional[str]:
+        hit = any(pattern.search(line) for pattern in self.extra) if self.extra else False
+        if not hit and self.default and _HINTS.search(line):
+            hit = any(pattern.search(line) for pattern in self.default)
+        if not hit:
+            return None
+        # Only for the rare fatal line, name the first rule in order
+        for name, pattern in self.rules:
+            if pattern.search(line):
+                return name
+        return None
+
+def _load_user_rules() -> Optional[List[Tuple[str, str]]]:
+    """Rules from the rules file, a JSON list of {"name", "pattern"}, replacing the defaults"""
+    try:
+        with open(ABORT_RULES_FILE, 'r', encoding='utf-8') as f:
+            return [(rule['name'], rule['pattern']) for rule in json.load(f)]
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid abort rules file {ABORT_RULES_FILE}: {str(e)}")
+
+def load_rules(options: dict) -> AbortRules:
+    """Compiled rules for a build, empty when early abort is off.
+
+    Raises ValueError for a broken rules file and re.error for a bad pattern.
+    """
+    if not options.get('early_abort', True):
+        return AbortRules([], [])
+    default, extra = list(DEFAULT_RULES), []
+    user_rules = _load_user_rules()
+    if user_rules is not None:
+        # No hints are known for these, they see every line
+        default, extra = [], user_rules
+    pattern = options.get('abort_pattern', '').strip()
+    if pattern:
+        extra.append(("custom rule", pattern))
+    return AbortRules(default, extra)
+
+def match(rules: AbortRules, line: str) -> Optional[str]:
+    """Name of the first rule matching line"""
+    return rules.match(line)
@@ -0,0 +1,146 @@
+import ctypes
+import ctypes.util
+import os
+import platform
+import subprocess
+import sys
+from typing import Callable, List, Optional, Set
+
+from src.project_settings import load_project_settings, update_project_settings
+
+# Options that control the resources of a build, remembered per project
+LIMIT_OPTIONS = {'build_nice': '', 'build_cpus': '', 'build_memory_limit_mb': '', 'build_io_idle': False}
+
+# ioprio_set syscall numbers, the C library has no wrapper
+_IOPRIO_SET = {'x86_64': 251, 'i386': 289, 'i686': 289, 'aarch64': 30, 'armv7l': 314,
+               'ppc64le': 273, 's390x': 282, 'riscv64': 30}
+_IOPRIO_CLASS_IDLE = 3
+_IOPRIO_CLASS_SHIFT = 13
+_IOPRIO_WHO_PROCESS = 1
+
+def parse_cpu_list(text: str) -> Set[int]:
+    """Parse an affinity list like "0-3,6" into CPU numbers"""
+    cpus = set()
+    for part in text.replace(' ', '').split(','):
+        if not part:
+            continue
+        if '-' in part:
+            first, last = part.split('-', 1)
+            cpus.update(range(int(first), int(last) + 1))
+        else:
+            cpus.add(int(part))
+    return cpus
+
+def load_project_limits(file_path: str) -> dict:
+    """Resource settings last used for the project containing file_path"""
+    stored = load_project_settings(file_path).get('limits', {})
+    return {key: stored.get(key, default) for key, default in LIMIT_OPTIONS.items()}
+
+def save_project_limits(file_path: str, options: dict):
+    update_project_settings(file_path, 'limits', {key: options.get(key, default)
+                                                  for key, default in LIMIT_OPTIONS.items()})
+
+def limit_problems(options: dict) -> List[str]:
+    """Values of the resource settings that cannot be applied"""
+    problems = []
+    nice = str(options.get('build_nice', '')).strip()
+    if nice:
+        try:
+            if not -20 <= int(nice) <= 19:
+                raise ValueError
+        except ValueError:
+            problems.append(f"Build priority must be a nice level from -20 to 19, not '{nice}'")
+
+    cpus = str(options.get('build_cpus', '')).strip()
+    if cpus:
+        try:
+            cpu_set = parse_cpu_list(cpus)
+        except ValueError:
+            cpu_set = None
+        if not cpu_set:
+            problems.append(f"CPU affinity must be a list like 0-3,6, not '{cpus}'")
+        elif max(cpu_set) >= (os.cpu_count() or 1):
+            problems.append(f"CPU affinity {cpus} names CPUs this machine does not have "
+                            f"(0-{(os.cpu_count() or 1) - 1})")
+
+    memory = str(options.get('build_memory_limit_mb', '')).strip()
+    if memory:
+        try:
+            if int(memory) <= 0:
+                raise ValueError
+        except ValueError:
+            problems.append(f"Memory limit must be a positive number of MB, not '{memory}'")
+    return problems
+
+def creation_flags(options: dict) -> int:
+    """Windows priority class for the nice level, inherited by the whole tree"""
+    if sys.platform != "win32" or not str(options.get('build_nice', '')).strip():
+        return 0
+    nice = int(options['build_nice'])
+    if nice >= 10:
+        return subprocess.IDLE_PRIORITY_CLASS
+    return subprocess.BELOW_NORMAL_PRIORITY_CLASS if nice > 0 else 0
+
+def _io_idle_setter() -> Callable[[], None]:
+    # Look up the syscall in the parent, a preexec_fn should not load libraries
+    number = _IOPRIO_SET.get(platform.machine())
+    libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True) if number else None
+
+    def set_io_idle():
+        if number is None:
+            raise OSError(f"ioprio_set is not known for {platform.machine()}")
+        if libc.syscall(number, _IOPRIO_WHO_PROCESS, 0, _IOPRIO_CLASS_IDLE << _IOPRIO_CLASS_SHIFT) != 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+    return set_io_idle
+
+def limit_setter(options: dict) -> Optional[Callable[[], None]]:
+    """Function that lowers priority and caps resources of the calling process.
+
+    Pass it as preexec_fn, so the limits are in place before the build
+    execs. Nice level, IO class, affinity and rlimits are inherited on fork
+    and kept across exec, so they reach scons and the C compiler too.
+    Results go to the process's stderr, which the build output shows.
+    Returns None when no limit is set or on Windows, where creation_flags()
+    covers the priority.
+    """
+    if sys.platform == "win32":
+        return None
+    steps = []
+
+    nice = str(options.get('build_nice', '')).strip()
+    if nice:
+        steps.append((f"nice {nice}", lambda: os.setpriority(os.PRIO_PROCESS, 0, int(nice))))
+
+    if options.get('build_io_idle') and sys.platform.startswith('linux'):
+        steps.append(("idle IO priority", _io_idle_setter()))
+
+    cpus = str(options.get('build_cpus', '')).strip()
+    if cpus:
+        steps.append((f"CPU affinity {cpus}", lambda: os.sched_setaffinity(0, parse_cpu_list(cpus))))
+
+    memory = str(options.get('build_memory_limit_mb', '')).strip()
+    if memory:
+        import resource
+
+        def set_memory_limit():
+            limit = int(memory) * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        # RLIMIT_RSS is not enforced by Linux, the address space limit is
+        steps.append((f"address space limit {memory} MB per process", set_memory_limit))
+
+    if not steps:
+        return None
+
+    def apply():
+        applied = []
+        report = ""
+        for description, action in steps:
+            try:
+                action()
+                applied.append(description)
+            except (OSError, ValueError, AttributeError) as e:
+                report += f"Warning: could not set {description}: {str(e)}\n"
+        if applied:
+            report += "Build resource limits: " + ", ".join(applied) + "\n"
+        os.write(2, report.encode('utf-8', 'replace'))
+    return apply
@@ -0,0 +1,127 @@
+import gzip
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from src.config import BUILD_LOG_DIR, MAX_BUILD_LOGS, MAX_BUILD_LOG_BYTES
+
+LOG_SUFFIX = ".log.gz"
+RECORD_SUFFIX = ".json"
+# Uncompressed characters read from a log at a time
+LOG_CHUNK_CHARS = 64 * 1024
+
+class BuildLog:
+    """Stream the raw output of one build to a gzip-compressed log file.
+
+    Next to the log a small JSON build record is kept with the command,
+    timing and result, so later tools can attach their reports to a build.
+    """
+
+    def __init__(self, file_path: str, log_dir: Optional[Path] = None):
+        self.log_dir = Path(log_dir or BUILD_LOG_DIR)
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        base_name = os.path.splitext(os.path.basename(file_path))[0]
+        self.name = f"build-{stamp}-{base_name}"
+        self.log_path = self.log_dir / (self.name + LOG_SUFFIX)
+        self.record_path = self.log_dir / (self.name + RECORD_SUFFIX)
+        self.record = {
+            'file_path': file_path,
+            'log_file': self.log_path.name,
+            'started': time.time()
+        }
+
+        # A moderate level keeps up with fast output at a good ratio
+        self._stream = gzip.open(self.log_path, 'wt', encoding='utf-8',
+                                 errors='replace', compresslevel=6)
+
+    def write(self, text: str):
+        """Append raw output to the log"""
+        if self._stream is not None:
+            self._stream.write(text)
+
+    def update(self, **fields):
+        """Add fields to the build record"""
+        self.record.update(fields)
+
+    def close(self):
+        """Finish the log, write the build record and rotate old logs"""
+        if self._stream is None:
+            return
+        self._stream.close()
+        self._stream = None
+
+        self.record['finished'] = time.time()
+        self.record['duration'] = self.record['finished'] - self.record['started']
+        save_record(self.record_path, self.record)
+        rotate_logs(self.log_dir)
+
+def save_record(record_path: Path, record: dict):
+    """Write a build record or report as JSON"""
+    with open(record_path, 'w', encoding='utf-8') as f:
+        json.dump(record, f, indent=4, default=str)
+
+def load_record(record_path: Path) -> dict:
+    """Read a build record, returning an empty dict if it is missing"""
+    try:
+        with open(record_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def list_logs(log_dir: Optional[Path] = None) -> List[Path]:
+    """Return all stored build logs, newest first"""
+    log_dir = Path(log_dir or BUILD_LOG_DIR)
+    if not log_dir.is_dir():
+        return []
+    # Names start with a sortable timestamp
+    return sorted(log_dir.glob("build-*" + LOG_SUFFIX), reverse=True)
+
+def record_path_for(log_path: Path) -> Path:
+    """Get the build record that belongs to a log file"""
+    log_path = Path(log_path)
+    return log_path.with_name(log_path.name[:-len(LOG_SUFFIX)] + RECORD_SUFFIX)
+
+def latest_record_path(log_dir: Optional[Path] = None) -> Optional[Path]:
+    """Get the build record of the most recent build, if any"""
+    logs = list_logs(log_dir)
+    return record_path_for(logs[0]) if logs else None
+
+def read_log_chunks(log_path: Path, chunk_chars: int = LOG_CHUNK_CHARS) -> Iterator[str]:
+    """Decompress a build log piece by piece, a log can be hundreds of MB"""
+    with gzip.open(log_path, 'rt', encoding='utf-8', errors='replace') as f:
+        while True:
+            chunk = f.read(chunk_chars)
+            if not chunk:
+                return
+            yield chunk
+
+def rotate_logs(log_dir: Optional[Path] = None,
+                max_count: int = MAX_BUILD_LOGS,
+                max_bytes: int = MAX_BUILD_LOG_BYTES):
+    """Delete the oldest logs until both the count and size limits hold"""
+    logs = list(reversed(list_logs(log_dir)))  # oldest first
+    sizes = {}
+    for log in logs:
+        try:
+            sizes[log] = log.stat().st_size
+        except OSError:
+            sizes[log] = 0
+    total = sum(sizes.values())
+
+    while logs and (len(logs) > max_count or total > max_bytes):
+        oldest = logs.pop(0)
+        total -= sizes[oldest]
+        # Remove the log together with its record and attached reports
+        prefix = oldest.name[:-len(LOG_SUFFIX)] + "."
+        for path in oldest.parent.iterdir():
+            if not path.name.startswith(prefix):
+                continue
+            try:
+                path.unlink()
+            except OSError as e:
+                print(f"Error removing old build log {path}: {e}")
@@ -0,0 +1,320 @@
+"""Warm-cache bundles for seeding fresh build machines.
+
+    python -m src.cache_bundle export caches.tar [--compress]
+    python -m src.cache_bundle verify caches.tar
+    python -m src.cache_bundle import caches.tar [--benchmark app.py]
+
+A bundle is a tar archive of Nuitka's cache directories (downloaded
+tools, ccache, clcache, bytecode and dependency caches) with a manifest
+listing every file with its SHA-256. The locations are asked from Nuitka
+in the target interpreter, so NUITKA_CACHE_DIR and CCACHE_DIR are
+honoured on both ends. Importing checks every file against the manifest
+and only adds files, existing cache entries are kept.
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+from typing import List, Optional
+
+FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+CACHES_PREFIX = "caches"
+QUERY_TIMEOUT = 30
+# Files up to this size are staged in memory before going into the archive
+SPOOL_MAX_BYTES = 16 * 1024 * 1024
+# Nuitka cache directories worth carrying to another machine
+COMPONENTS = ['downloads', 'ccache', 'clcache', 'module-cache', 'library_dependencies',
+              'adapted_headers']
+
+_QUERY_LOCATIONS = """
+import json, os, sys
+from nuitka.utils.AppDirs import getCacheDir
+from nuitka.Version import getNuitkaVersion
+dirs = {name: getCacheDir(name) for name in sys.argv[1:]}
+if os.environ.get('CCACHE_DIR') and 'ccache' in dirs:
+    dirs['ccache'] = os.environ['CCACHE_DIR']
+print(json.dumps({'dirs': dirs, 'nuitka': getNuitkaVersion(),
+                  'python': '%d.%d' % sys.version_info[:2]}))
+"""
+
+def cache_locations(python_exe: str, components: Optional[List[str]] = None) -> dict:
+    """Cache directories, Nuitka and Python version of the target interpreter"""
+    result = subprocess.run([python_exe, "-c", _QUERY_LOCATIONS] + (components or COMPONENTS),
+                            capture_output=True, text=True, timeout=QUERY_TIMEOUT,
+                            stdin=subprocess.DEVNULL)
+    if result.returncode != 0:
+        raise RuntimeError(f"Cannot locate Nuitka caches with {python_exe}: "
+                           f"{result.stderr.strip().splitlines()[-1:] or result.returncode}")
+    return json.loads(result.stdout)
+
+def machine_tag() -> str:
+    # Downloaded tools and compiled objects only fit the same OS and CPU
+    return f"{sys.platform}-{platform.machine().lower()}"
+
+class _HashingReader:
+    """File wrapper that hashes what tarfile reads through it"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.digest = hashlib.sha256()
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        self.digest.update(data)
+        return data
+
+def _safe_relative(name: str) -> Optional[str]:
+    """Relative path of an archive member, None when it would leave its directory"""
+    parts = name.split('/')
+    if not name or name.startswith('/') or '..' in parts or any(':' in p or '\\' in p for p in parts):
+        return None
+    return os.path.join(*parts)
+
+def export_bundle(output: str, python_exe: str, components: Optional[List[str]] = None,
+                  compress: bool = False) -> dict:
+    locations = cache_locations(python_exe, components)
+    started = time.monotonic()
+    report = {'files': 0, 'bytes': 0, 'skipped': 0, 'components': {}}
+    entries = []
+
+    # A fast level, most cache content is compressed already
+    archive_options = {'mode': 'w:gz', 'compresslevel': 1} if compress else {'mode': 'w'}
+    with tarfile.open(output, **archive_options) as tar:
+        for component, directory in locations['dirs'].items():
+            if not os.path.isdir(directory):
+                continue
+            counts = report['components'].setdefault(component, {'files': 0, 'bytes': 0})
+            for dirpath, _, filenames in os.walk(directory):
+                for filename in filenames:
+                    path = os.path.join(dirpath, filename)
+                    relative = os.path.relpath(path, directory).replace(os.sep, '/')
+                    arcname = f"{CACHES_PREFIX}/{component}/{relative}"
+                    # Caches change while builds run. Copy the file first, so
+                    # the header describes the bytes actually read and a file
+                    # that vanishes or shrinks never leaves half a member.
+                    with tempfile.SpooledTemporaryFile(SPOOL_MAX_BYTES) as staged:
+                        try:
+                            info = tar.gettarinfo(path, arcname)
+                            if not info.isfile():
+                                continue
+                            with open(path, 'rb') as f:
+                                reader = _HashingReader(f)
+                                shutil.copyfileobj(reader, staged)
+                        except OSError:
+                            report['skipped'] += 1
+                            continue
+                        info.size = staged.tell()
+                        staged.seek(0)
+                        tar.addfile(info, staged)
+                    entries.append({'path': arcname, 'size': info.size,
+                                    'sha256': reader.digest.hexdigest()})
+                    counts['files'] += 1
+                    counts['bytes'] += info.size
+                    report['files'] += 1
+                    report['bytes'] += info.size
+
+        manifest = {'format': FORMAT_VERSION, 'created': time.time(), 'host': platform.node(),
+                    'machine': machine_tag(), 'nuitka': locations['nuitka'],
+                    'python': locations['python'], 'components': report['components'],
+                    'files': entries}
+        data = json.dumps(manifest, indent=1).encode('utf-8')
+        info = tarfile.TarInfo(MANIFEST_NAME)
+        info.size = len(data)
+        info.mtime = int(time.time())
+        tar.addfile(info, io.BytesIO(data))
+
+    # Checksum of the whole archive for transfers, in sha256sum format
+    digest = hashlib.sha256()
+    with open(output, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    with open(output + ".sha256", 'w', encoding='utf-8') as f:
+        f.write(f"{digest.hexdigest()}  {os.path.basename(output)}\n")
+
+    report['archive_bytes'] = os.path.getsize(output)
+    report['seconds'] = time.monotonic() - started
+    return report
+
+def read_manifest(tar: tarfile.TarFile) -> dict:
+    try:
+        manifest = json.load(tar.extractfile(MANIFEST_NAME))
+    except (KeyError, ValueError) as e:
+        raise ValueError(f"Not a cache bundle, no valid manifest: {str(e)}")
+    if manifest.get('format', 0) > FORMAT_VERSION:
+        raise ValueError(f"Bundle format {manifest['format']} is newer than supported {FORMAT_VERSION}")
+    return manifest
+
+def _check_archive_checksum(bundle: str) -> List[str]:
+    sidecar = bundle + ".sha256"
+    if not os.path.isfile(sidecar):
+        return []
+    with open(sidecar, 'r', encoding='utf-8') as f:
+        expected = f.read().split()[0]
+    digest = hashlib.sha256()
+    with open(bundle, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return [] if digest.hexdigest() == expected else [f"archive checksum differs from {sidecar}"]
+
+def verify_bundle(bundle: str) -> tuple:
+    """Check every file against the manifest, returns (manifest, problems)"""
+    problems = _check_archive_checksum(bundle)
+    with tarfile.open(bundle, 'r:*') as tar:
+        manifest = read_manifest(tar)
+        expected = {entry['path']: entry for entry in manifest['files']}
+        seen = set()
+        for member in tar:
+            if member.name == MANIFEST_NAME or not member.isfile():
+                continue
+            entry = expected.get(member.name)
+            if entry is None:
+                problems.append(f"not in manifest: {member.name}")
+                continue
+            digest = hashlib.sha256()
+            stream = tar.extractfile(member)
+            for chunk in iter(lambda: stream.read(1024 * 1024), b''):
+                digest.update(chunk)
+            if digest.hexdigest() != entry['sha256']:
+                problems.append(f"changed: {member.name}")
+            seen.add(member.name)
+        problems.extend(f"missing: {path}" for path in expected if path not in seen)
+    return manifest, problems
+
+def import_bundle(bundle: str, python_exe: str, force: bool = False) -> dict:
+    """Verify and add the bundle's files to this machine's caches"""
+    started = time.monotonic()
+    problems = _check_archive_checksum(bundle)
+    if problems and not force:
+        raise ValueError(problems[0])
+    report = {'added': 0, 'kept': 0, 'bytes': 0, 'problems': problems}
+
+    with tarfile.open(bundle, 'r:*') as tar:
+        manifest = read_manifest(tar)
+        if manifest['machine'] != machine_tag() and not force:
+            raise ValueError(f"Bundle is for {manifest['machine']}, this machine is {machine_tag()}")
+        expected = {entry['path']: entry for entry in manifest['files']}
+        locations = cache_locations(python_exe, list(manifest['components']))
+        report.update(nuitka=manifest['nuitka'], local_nuitka=locations['nuitka'])
+
+        for member in tar:
+            if member.name == MANIFEST_NAME or not member.isfile():
+                continue
+            prefix, _, rest = member.name.partition('/')
+            component, _, relative = rest.partition('/')
+            relative = _safe_relative(relative)
+            entry = expected.get(member.name)
+            if prefix != CACHES_PREFIX or component not in locations['dirs'] or not relative or not entry:
+                report['problems'].append(f"unexpected member: {member.name}")
+                continue
+
+            target = os.path.join(locations['dirs'][component], relative)
+            if os.path.exists(target):
+                report['kept'] += 1
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            temp = f"{target}.import-{os.getpid()}"
+            try:
+                reader = _HashingReader(tar.extractfile(member))
+                with open(temp, 'wb') as f:
+                    shutil.copyfileobj(reader, f)
+                if reader.digest.hexdigest() != entry['sha256']:
+                    report['problems'].append(f"changed: {member.name}")
+                    continue
+                os.chmod(temp, member.mode & 0o777 | 0o600)
+                os.utime(temp, (member.mtime, member.mtime))
+                os.replace(temp, target)
+            finally:
+                # Gone after os.replace, left over after a mismatch or error
+                if os.path.exists(temp):
+                    os.unlink(temp)
+            report['added'] += 1
+            report['bytes'] += member.size
+
+    report['seconds'] = time.monotonic() - started
+    return report
+
+def _timed_build(python_exe: str, script: str, env: dict, extra: List[str]) -> float:
+    with tempfile.TemporaryDirectory(prefix='nuitka-gui-cache-bench-') as output_dir:
+        start = time.perf_counter()
+        subprocess.run([python_exe, "-m", "nuitka", "--remove-output", f"--output-dir={output_dir}"]
+                       + extra + [script], env=env, stdin=subprocess.DEVNULL,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        return time.perf_counter() - start
+
+def first_build_speedup(script: str, python_exe: str, extra: Optional[List[str]] = None) -> dict:
+    """Build script with empty caches and with the current ones"""
+    extra = extra or []
+    with tempfile.TemporaryDirectory(prefix='nuitka-gui-empty-cache-') as empty:
+        env = {k: v for k, v in os.environ.items()
+               if k != 'CCACHE_DIR' and not k.startswith('NUITKA_CACHE_DIR')}
+        env['NUITKA_CACHE_DIR'] = empty
+        cold = _timed_build(python_exe, script, env, extra)
+    warm = _timed_build(python_exe, script, dict(os.environ), extra)
+    return {'cold_s': cold, 'warm_s': warm, 'speedup': cold / warm if warm else 0.0}
+
+def _megabytes(size: int) -> str:
+    return f"{size / (1024 * 1024):.1f} MB"
+
+def main():
+    parser = argparse.ArgumentParser(description="Export and import warm Nuitka build caches")
+    parser.add_argument('--python', default=sys.executable, help="Interpreter that runs Nuitka")
+    commands = parser.add_subparsers(dest='action', required=True)
+    export = commands.add_parser('export', help="Pack this machine's caches into a bundle")
+    export.add_argument('output')
+    export.add_argument('--components', default=','.join(COMPONENTS))
+    export.add_argument('--compress', action='store_true',
+                        help="gzip the archive, ccache entries are compressed already")
+    check = commands.add_parser('verify', help="Check a bundle against its manifest")
+    check.add_argument('bundle')
+    load = commands.add_parser('import', help="Verify a bundle and add it to this machine's caches")
+    load.add_argument('bundle')
+    load.add_argument('--force', action='store_true', help="Import a bundle from another platform")
+    load.add_argument('--benchmark', metavar='SCRIPT',
+                      help="Afterwards, compare building SCRIPT with empty and with warm caches")
+    load.add_argument('--standalone', action='store_true', help="Benchmark a standalone build")
+    args = parser.parse_args()
+
+    try:
+        if args.action == 'export':
+            report = export_bundle(args.output, args.python, args.components.split(','), args.compress)
+            for component, counts in report['components'].items():
+                print(f"  {component}: {counts['files']} files, {_megabytes(counts['bytes'])}")
+            print(f"Exported {report['files']} files ({_megabytes(report['bytes'])}) to {args.output}, "
+                  f"{_megabytes(report['archive_bytes'])} in {report['seconds']:.1f}s")
+        elif args.action == 'verify':
+            manifest, problems = verify_bundle(args.bundle)
+            print(f"Bundle format {manifest['format']} from {manifest['host']} ({manifest['machine']}), "
+                  f"Nuitka {manifest['nuitka']}, Python {manifest['python']}, {len(manifest['files'])} files")
+            print("\n".join(problems) if problems else "All files match the manifest")
+            sys.exit(1 if problems else 0)
+        else:
+            report = import_bundle(args.bundle, args.python, args.force)
+            if report['nuitka'] != report['local_nuitka']:
+                print(f"Note: bundle was made with Nuitka {report['nuitka']}, "
+                      f"this machine has {report['local_nuitka']}")
+            print(f"Imported {report['added']} files ({_megabytes(report['bytes'])}), "
+                  f"kept {report['kept']} existing in {report['seconds']:.1f}s")
+            for problem in report['problems']:
+                print(f"  rejected, {problem}")
+            if args.benchmark:
+                print(f"Building {args.benchmark} with empty and with imported caches...")
+                result = first_build_speedup(args.benchmark, args.python,
+                                             ["--standalone"] if args.standalone else [])
+                print(f"First build: {result['cold_s']:.1f}s with empty caches, "
+                      f"{result['warm_s']:.1f}s with imported caches, speedup {result['speedup']:.2f}x")
+            sys.exit(1 if report['problems'] else 0)
+    except (OSError, ValueError, RuntimeError, tarfile.TarError, subprocess.SubprocessError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
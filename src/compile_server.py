@@ -0,0 +1,352 @@
+"""Warm compile server.
+
+A long-lived local process that has Nuitka imported already. Each job is
+run in a forked, isolated child, so builds skip interpreter startup, the
+re-execution Nuitka does for itself and importing its own modules.
+
+Start it with ``python -m src.compile_server``; the GUI also starts it on
+demand when "Use warm compile server" is enabled. POSIX only.
+"""
+import ast
+import os
+import sys
+
+# Re-executed with -S below, so put the import path of the launching
+# interpreter back before importing anything from site-packages
+_SYS_PATH_ENV = 'NUITKA_GUI_SERVER_SYS_PATH'
+if __name__ == "__main__" and _SYS_PATH_ENV in os.environ:
+    sys.path[:] = ast.literal_eval(os.environ.pop(_SYS_PATH_ENV))
+
+import io
+import json
+import runpy
+import signal
+import socket
+import subprocess
+import traceback
+from pathlib import Path
+from typing import List, Optional
+
+from src import build_limits
+from src.config import COMPILE_SERVER_SOCKET
+
+EXIT_MARKER = "\0NUITKA-GUI-EXIT "
+PID_MARKER = "NUITKA-GUI-PID "
+CONNECT_TIMEOUT = 1.0
+
+# Environment Nuitka passes to itself when it re-executes, computed once
+_LAUNCH_ENV_KEYS = ('NUITKA_NAMESPACES', 'NUITKA_PTH_IMPORTED', 'NUITKA_USER_SITE')
+_SITE_FILENAME_ENV = 'NUITKA_GUI_SERVER_SITE'
+
+def is_supported() -> bool:
+    return hasattr(os, 'fork') and hasattr(socket, 'AF_UNIX')
+
+def _connect(timeout: Optional[float] = CONNECT_TIMEOUT) -> socket.socket:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(str(COMPILE_SERVER_SOCKET))
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+def get_status() -> Optional[dict]:
+    """Return the running server's status, or None if no server answers"""
+    if not is_supported():
+        return None
+    try:
+        with _connect() as sock:
+            with sock.makefile('rwb') as sock_file:
+                sock_file.write(json.dumps({'type': 'status'}).encode('utf-8') + b"\n")
+                sock_file.flush()
+                return json.loads(sock_file.readline())
+    except (OSError, ValueError):
+        return None
+
+def start_server(python_exe: str):
+    """Launch a detached compile server for the given interpreter"""
+    subprocess.Popen(
+        [python_exe, "-m", "src.compile_server"],
+        cwd=str(Path(__file__).resolve().parent.parent),
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True
+    )
+
+class _ServerOutput:
+    """Readable stream over the job connection that strips the exit marker"""
+    def __init__(self, process, sock_file):
+        self.process = process
+        self.sock_file = sock_file
+
+    def readline(self) -> str:
+        try:
+            line = self.sock_file.readline()
+        except (OSError, ValueError):
+            line = ''
+        if line.startswith(EXIT_MARKER):
+            self.process.returncode = int(line[len(EXIT_MARKER):])
+            return ''
+        if not line and self.process.returncode is None:
+            # Connection lost without an exit status
+            self.process.returncode = -1
+        return line
+
+    def close(self):
+        self.sock_file.close()
+
+class CompileServerProcess:
+    """Stand-in for subprocess.Popen that runs a Nuitka job on the warm server"""
+    def __init__(self, args: List[str], env: dict, cwd: Optional[str] = None,
+                 limits: Optional[dict] = None):
+        self.returncode = None
+        self._sock = _connect(timeout=None)
+        sock_file = self._sock.makefile('rw', encoding='utf-8', errors='replace', newline='\n')
+        sock_file.write(json.dumps({
+            'type': 'job',
+            'args': args,
+            'env': env,
+            'cwd': cwd or os.getcwd(),
+            'limits': limits or {}
+        }) + "\n")
+        sock_file.flush()
+
+        header = sock_file.readline()
+        if not header.startswith(PID_MARKER):
+            sock_file.close()
+            self._sock.close()
+            raise OSError("Compile server did not accept the job")
+        self.pid = int(header[len(PID_MARKER):])
+        self.stdout = _ServerOutput(self, sock_file)
+        self.stderr = io.StringIO()
+
+    def poll(self) -> Optional[int]:
+        return self.returncode
+
+    def terminate(self):
+        # The job runs in its own session, so this reaches the whole tree
+        try:
+            os.killpg(self.pid, signal.SIGTERM)
+        except OSError:
+            pass
+
+    def kill(self):
+        try:
+            os.killpg(self.pid, signal.SIGKILL)
+        except OSError:
+            pass
+
+def _exec_warm_server():
+    """Re-execute with the interpreter flags Nuitka insists on.
+
+    Nuitka restarts itself unless it runs without the site module, with a
+    fixed hash seed and without frozen stdlib modules. Doing this once for
+    the server means forked jobs never restart.
+    """
+    from nuitka.importing.PreloadedPackages import (detectPreLoadedPackagePaths,
+                                                    detectPthImportedPackages)
+
+    env = dict(os.environ)
+    env['NUITKA_NAMESPACES'] = repr(detectPreLoadedPackagePaths())
+    if 'site' in sys.modules:
+        site_filename = sys.modules['site'].__file__
+        if site_filename.endswith('.pyc'):
+            site_filename = site_filename[:-4] + '.py'
+        env[_SITE_FILENAME_ENV] = site_filename
+        env['NUITKA_PTH_IMPORTED'] = repr(detectPthImportedPackages())
+        user_site = getattr(sys.modules['site'], 'USER_SITE', None)
+        if user_site is not None:
+            env['NUITKA_USER_SITE'] = repr(user_site)
+    env[_SYS_PATH_ENV] = repr(sys.path)
+    env['PYTHONHASHSEED'] = '0'
+
+    args = [sys.executable, '-S']
+    if sys.version_info >= (3, 11):
+        args += ['-X', 'frozen_modules=off']
+    args += [os.path.abspath(__file__)] + sys.argv[1:]
+    os.execve(sys.executable, args, env)
+
+def _warm_up():
+    """Import the parts of Nuitka every build needs"""
+    import nuitka  # pylint: disable=unused-import
+    for module_name in ('nuitka.Tracing', 'nuitka.options.Options',
+                        'nuitka.plugins.Plugins'):
+        try:
+            __import__(module_name)
+        except Exception as e:
+            print(f"Compile server: could not preload {module_name}: {e}", file=sys.stderr)
+
+def _launch_environment(job_env: dict, cwd: str) -> dict:
+    """Build the environment a re-executed Nuitka expects, for this process"""
+    import nuitka
+
+    # "python -m nuitka" would have put the job's directory first
+    sys_path = [cwd] + _SERVER_SYS_PATH[1:]
+    tag = str(os.getpid()) + ":"
+    nuitka_main = os.path.join(nuitka.__path__[0], '__main__.py')
+    env = dict(job_env)
+    env.update({
+        'PYTHONHASHSEED': '0',
+        'NUITKA_BINARY_NAME': tag + nuitka_main,
+        'NUITKA_PACKAGE_HOME': tag + os.path.dirname(os.path.abspath(nuitka.__path__[0])),
+        'NUITKA_SYS_PREFIX': tag + sys.prefix,
+        'NUITKA_PYTHONPATH': tag + repr(sys_path),
+        'NUITKA_PYTHONPATH_AST': tag + os.path.dirname(ast.__file__),
+        'NUITKA_RE_EXECUTION': tag + "1"
+    })
+    for key in _LAUNCH_ENV_KEYS:
+        if key in _SERVER_ENV:
+            env[key] = _SERVER_ENV[key]
+    if _SITE_FILENAME_ENV in _SERVER_ENV:
+        env['NUITKA_SITE_FILENAME'] = tag + _SERVER_ENV[_SITE_FILENAME_ENV]
+    return env
+
+def _run_job(conn: socket.socket, request: dict):
+    """Body of the forked job process, never returns"""
+    code = 1
+    try:
+        os.setsid()
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        os.dup2(conn.fileno(), 1)
+        os.dup2(conn.fileno(), 2)
+        sys.stdout = open(1, 'w', encoding='utf-8', errors='replace', buffering=1, closefd=False)
+        sys.stderr = open(2, 'w', encoding='utf-8', errors='replace', buffering=1, closefd=False)
+
+        # The job is the build's root process, limit it like a cold build
+        set_limits = build_limits.limit_setter(request.get('limits') or {})
+        if set_limits:
+            set_limits()
+
+        cwd = request.get('cwd') or '/'
+        os.chdir(cwd)
+        env = _launch_environment(request.get('env') or {}, cwd)
+        os.environ.clear()
+        os.environ.update(env)
+        sys.argv = [env['NUITKA_BINARY_NAME'].split(':', 1)[1]] + list(request['args'])
+
+        try:
+            runpy.run_module('nuitka', run_name='__main__', alter_sys=True)
+            code = 0
+        except SystemExit as e:
+            if e.code is None:
+                code = 0
+            elif isinstance(e.code, int):
+                code = e.code
+            else:
+                print(e.code, file=sys.stderr)
+                code = 1
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(code)
+
+def _supervise_job(conn: socket.socket, request: dict):
+    """Run one job in a grandchild and report its exit status, never returns"""
+    try:
+        # The job may only write once its pid has been announced
+        ready_read, ready_write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_write)
+            os.read(ready_read, 1)
+            os.close(ready_read)
+            _run_job(conn, request)
+        os.close(ready_read)
+        conn.sendall(f"{PID_MARKER}{pid}\n".encode('utf-8'))
+        os.write(ready_write, b"1")
+        os.close(ready_write)
+        _, status = os.waitpid(pid, 0)
+        code = os.waitstatus_to_exitcode(status)
+        conn.sendall(f"\n{EXIT_MARKER}{code}\n".encode('utf-8'))
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        os._exit(0)
+
+def _reap_children():
+    while True:
+        try:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+
+def serve():
+    import nuitka.Version
+
+    socket_path = Path(COMPILE_SERVER_SOCKET)
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+    if get_status():
+        print("Compile server is already running", file=sys.stderr)
+        return
+    if socket_path.exists():
+        socket_path.unlink()
+
+    status = {
+        'type': 'status',
+        'pid': os.getpid(),
+        'python': os.path.realpath(sys.executable),
+        'nuitka': nuitka.Version.getNuitkaVersion()
+    }
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(str(socket_path))
+    os.chmod(socket_path, 0o600)
+    server.listen(16)
+    # Wake up regularly to reap finished jobs
+    server.settimeout(1.0)
+    print(f"Compile server listening on {socket_path}", file=sys.stderr)
+
+    try:
+        while True:
+            _reap_children()
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                continue
+            try:
+                conn.settimeout(CONNECT_TIMEOUT)
+                request = json.loads(conn.makefile('rb').readline())
+                conn.settimeout(None)
+                if request.get('type') == 'status':
+                    conn.sendall(json.dumps(status).encode('utf-8') + b"\n")
+                elif request.get('type') == 'job':
+                    if os.fork() == 0:
+                        server.close()
+                        _supervise_job(conn, request)
+            except (OSError, ValueError) as e:
+                print(f"Compile server: bad request: {e}", file=sys.stderr)
+            finally:
+                conn.close()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        try:
+            socket_path.unlink()
+        except OSError:
+            pass
+
+def main():
+    if not is_supported():
+        print("The compile server needs fork() and Unix sockets", file=sys.stderr)
+        sys.exit(1)
+    if not sys.flags.no_site or os.environ.get('PYTHONHASHSEED') != '0':
+        _exec_warm_server()
+    _warm_up()
+    serve()
+
+# Captured at import, before Nuitka jobs modify either of them
+_SERVER_SYS_PATH = list(sys.path)
+_SERVER_ENV = dict(os.environ)
+
+if __name__ == "__main__":
+    main()
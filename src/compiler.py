@@ -1,5 +1,5 @@
 import subprocess
-from typing import List, Callable
+from typing import List, Callable, Optional
 import os
 import sys
 import re
@@ -9,10 +9,20 @@ import pkg_resources
 import io
 import threading
 import queue
+import signal
+from src import compile_server, jobserver
+from src.workspaces import WorkspaceManager
+from src.replay import StreamRecorder, ReplayProcess
+from src.toolchains import toolchain_settings
+from src.build_logs import BuildLog, save_record
+from src import speedup, dedup, onefile, preflight, abort_rules, data_files
+from src.build_limits import LIMIT_OPTIONS, creation_flags, limit_setter, parse_cpu_list
 
 # Initialize colorama with no output wrapping
 colorama.init(wrap=False)
 
+ANSI_ESCAPE = re.compile(r'\033\[[0-9;]*[mGKH]')
+
 class NuitkaCompiler:
     REQUIRED_PACKAGES = {
         'nuitka': '2.0.0',
@@ -39,8 +49,11 @@ class NuitkaCompiler:
             return False
 
     @staticmethod
-    def get_python_path() -> str:
+    def get_python_path(options: Optional[dict] = None) -> str:
         """Get the correct Python interpreter path"""
+        # An interpreter picked in the GUI wins over the one running it
+        if options and options.get('python_exe') and os.path.isfile(options['python_exe']):
+            return options['python_exe']
         if sys.platform == "win32":
             python_exe = os.path.join(sys.prefix, "python.exe")
             if not os.path.exists(python_exe):
@@ -49,26 +62,221 @@ class NuitkaCompiler:
         return sys.executable
 
     @staticmethod
-    def _stream_reader(stream, output_queue: queue.Queue):
-        """Read from a stream and put lines into a queue"""
+    def build_env(toolchain_env: dict) -> dict:
+        """Environment for Nuitka with the selected toolchain's variables"""
+        env = dict(os.environ)
+        env.update({
+            'PYTHONIOENCODING': 'utf-8',
+            'PYTHONLEGACYWINDOWSFSENCODING': '0',
+            'PYTHONLEGACYWINDOWSSTDIO': '0',
+            'PYTHONDONTWRITEBYTECODE': '1'
+        })
+        for name, value in toolchain_env.items():
+            # Keep linker flags the user already exports
+            if name == 'LDFLAGS' and env.get('LDFLAGS'):
+                value = f"{env['LDFLAGS']} {value}"
+            env[name] = value
+        return env
+
+    @staticmethod
+    def find_executable(output_dir: str, file_path: str, options: dict) -> Optional[str]:
+        """Locate the binary Nuitka produced for file_path in output_dir"""
+        stem = os.path.splitext(os.path.basename(file_path))[0]
+        base = options.get('build_name') or stem
+        directories = [output_dir]
+        if options.get('standalone') and not options.get('onefile'):
+            directories.insert(0, os.path.join(output_dir, f"{stem}.dist"))
+        for directory in directories:
+            for name in (base, f"{base}.exe", f"{base}.bin"):
+                path = os.path.join(directory, name)
+                if os.path.isfile(path) and os.access(path, os.X_OK):
+                    return path
+        return None
+
+    @staticmethod
+    def _report_speedup(file_path: str, options: dict, output_callback: Callable[[str], None],
+                        cancel_event: Optional[threading.Event], build_log: Optional[BuildLog]):
+        """Time the workload on the compiled binary and on the plain script"""
+        output_dir = options.get('output_dir') or os.getcwd()
+        executable = NuitkaCompiler.find_executable(output_dir, file_path, options)
+        if not executable:
+            output_callback("\nSpeedup report skipped: compiled executable not found\n")
+            return
+        runs = int(options.get('speedup_runs') or speedup.DEFAULT_RUNS)
+        output_callback(f"\nMeasuring runtime of compiled and interpreted program ({runs} runs each)...\n")
+        try:
+            report = speedup.compare_programs(
+                [executable],
+                [NuitkaCompiler.get_python_path(options), file_path],
+                options.get('speedup_command', ''),
+                runs,
+                cwd=os.path.dirname(file_path),
+                cancel_event=cancel_event
+            )
+        except (OSError, subprocess.SubprocessError, RuntimeError) as e:
+            output_callback(f"\nSpeedup report failed: {str(e)}\n")
+            return
+        if report is None:
+            return
+        output_callback("\n" + speedup.format_report(report) + "\n")
+        if build_log:
+            # Stored next to the build record, rotated together with it
+            report_path = build_log.log_dir / f"{build_log.name}.speedup.json"
+            save_record(report_path, report)
+            build_log.update(speedup=report['speedup'], speedup_report=report_path.name)
+            output_callback(f"Speedup report: {report_path}\n")
+
+    @staticmethod
+    def _dedup_dist(file_path: str, options: dict, output_callback: Callable[[str], None],
+                    build_log: Optional[BuildLog]):
+        """Share identical dist files with earlier builds through the content store"""
+        stem = os.path.splitext(os.path.basename(file_path))[0]
+        dist_dir = os.path.join(options.get('output_dir') or os.getcwd(), f"{stem}.dist")
+        if not os.path.isdir(dist_dir):
+            return
+        try:
+            report = dedup.dedup_directory(dist_dir)
+        except OSError as e:
+            output_callback(f"\nDeduplication failed: {str(e)}\n")
+            return
+        output_callback(f"\n{dedup.format_report(report)}\nManifest: {dedup.manifest_path(dist_dir)}\n")
+        if build_log:
+            build_log.update(dedup=report)
+
+    @staticmethod
+    def _measure_onefile(file_path: str, options: dict, output_callback: Callable[[str], None],
+                         build_log: Optional[BuildLog]):
+        """Size and launch latency of the onefile binary with the chosen settings"""
+        output_dir = options.get('output_dir') or os.getcwd()
+        executable = NuitkaCompiler.find_executable(output_dir, file_path, options)
+        if not executable:
+            output_callback("\nOnefile measurement skipped: executable not found\n")
+            return
+        output_callback("\nMeasuring onefile launch latency...\n")
+        if not onefile.cold_launches_isolated(options):
+            output_callback("Warning: the tempdir spec is outside {TEMP}, {HOME} and {CACHE_DIR}, "
+                            "cold launches reuse the first extraction\n")
+        try:
+            measurement = onefile.measure_launches(executable, options.get('speedup_command', ''))
+        except (OSError, subprocess.SubprocessError) as e:
+            output_callback(f"\nOnefile measurement failed: {str(e)}\n")
+            return
+        measurements = onefile.record_measurement(file_path, options, measurement)
+        output_callback("\n" + onefile.format_measurements(measurements, onefile.settings_label(options)) + "\n")
+        if build_log:
+            build_log.update(onefile=dict(measurement, settings=onefile.settings_label(options)))
+
+    @staticmethod
+    def _stream_reader(stream, output_queue: queue.Queue, name: str = 'stdout',
+                       recorder: Optional[StreamRecorder] = None):
+        """Read from a stream and put (stream name, line) pairs into a queue"""
         try:
             for line in iter(stream.readline, ''):
-                output_queue.put(line)
+                if recorder:
+                    recorder.record(name, line)
+                output_queue.put((name, line))
         except (IOError, UnicodeDecodeError):
             pass
         finally:
             stream.close()
 
+    @staticmethod
+    def _terminate(process):
+        """Stop a build together with the processes it started"""
+        if not isinstance(process, subprocess.Popen):
+            process.terminate()
+        elif sys.platform == "win32":
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(process.pid)],
+                           capture_output=True)
+        else:
+            try:
+                os.killpg(process.pid, signal.SIGTERM)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _start_on_compile_server(command: List[str], env: dict, options: dict,
+                                 output_callback: Callable[[str], None]):
+        """Hand the job to the warm compile server, or return None to run it cold"""
+        if not compile_server.is_supported():
+            output_callback("Warm compile server is not supported on this platform\n")
+            return None
+
+        status = compile_server.get_status()
+        if status is None:
+            compile_server.start_server(command[0])
+            output_callback("Starting warm compile server, this build runs without it\n")
+            return None
+        if status.get('python') != os.path.realpath(command[0]):
+            output_callback(f"Warm compile server runs {status.get('python')}, "
+                            f"not {command[0]}; running without it\n")
+            return None
+
+        try:
+            # Everything after "python -m nuitka" goes to the server
+            process = compile_server.CompileServerProcess(
+                command[3:], env, limits={key: options.get(key) for key in LIMIT_OPTIONS})
+        except OSError as e:
+            output_callback(f"Warm compile server unavailable ({str(e)}), running without it\n")
+            return None
+        output_callback(f"Running on warm compile server (pid {status.get('pid')})\n")
+        return process
+
+    @staticmethod
+    def _acquire_job_tokens(file_path: str, options: dict,
+                            output_callback: Callable[[str], None],
+                            cancel_event: Optional[threading.Event]):
+        """Wait for compile job tokens from the machine-wide job server.
+
+        Returns (tokens, cancelled), tokens is None when the build runs
+        without the server.
+        """
+        if not jobserver.is_supported():
+            output_callback("Job server is not supported on this platform\n")
+            return None, False
+        if jobserver.ensure_server(sys.executable) is None:
+            output_callback("Job server did not start, building without shared job tokens\n")
+            return None, False
+
+        # Ask for what this build could use on its own
+        want = os.cpu_count() or 1
+        try:
+            want = len(parse_cpu_list(str(options.get('build_cpus', '')))) or want
+        except ValueError:
+            pass
+
+        def on_queued(report):
+            builds = "build" if report['holders'] == 1 else "builds"
+            output_callback(f"{jobserver.WAIT_MARKER}CPU cores, position {report['position']} in queue "
+                            f"behind {report['holders']} running {builds}...\n")
+
+        try:
+            tokens = jobserver.acquire(want, os.path.basename(file_path), on_queued, cancel_event)
+        except OSError as e:
+            output_callback(f"Job server unavailable ({str(e)}), building without shared job tokens\n")
+            return None, False
+        if tokens is None:
+            return None, True
+        output_callback(f"{jobserver.GRANT_MARKER}{tokens.tokens} of {tokens.total} job tokens "
+                        f"after {tokens.wait:.1f}s in queue\n")
+        return tokens, False
+
     @staticmethod
     def compile(
         file_path: str,
         options: dict,
         output_callback: Callable[[str], None],
-        progress_callback: Callable[[], None]
+        progress_callback: Callable[[], None],
+        cancel_event: Optional[threading.Event] = None
     ) -> tuple[bool, str]:
         """
-        Compile the Python file using Nuitka with the specified options
+        Compile the Python file using Nuitka with the specified options.
+        Setting cancel_event stops the build and everything it started.
         """
+        build_log = None
+        recorder = None
+        job_tokens = None
+        workspace = None
         try:
             # Verify dependencies first
             if not NuitkaCompiler.verify_dependencies(output_callback):
@@ -81,8 +289,32 @@ class NuitkaCompiler:
             # Normalize path to avoid encoding issues
             file_path = os.path.abspath(file_path)
             
+            # Catch mistakes now instead of minutes into the build
+            if not options.get('replay_file'):
+                problems, seconds = preflight.run_checks(
+                    file_path, options, NuitkaCompiler.get_python_path(options))
+                if problems:
+                    output_callback(preflight.format_problems(problems) + "\n")
+                    return False, f"Pre-flight checks failed: {problems[0]}"
+                output_callback(f"Pre-flight checks passed in {seconds * 1000:.0f} ms\n")
+
+            # Share the machine's cores with the other builds running on it
+            if options.get('use_jobserver') and not options.get('replay_file'):
+                job_tokens, cancelled = NuitkaCompiler._acquire_job_tokens(
+                    file_path, options, output_callback, cancel_event)
+                if cancelled:
+                    output_callback("\nCompilation cancelled\n")
+                    return False, "Compilation cancelled"
+            
+            # Build in a persistent workspace to keep the scons state
+            if options.get('use_workspace'):
+                workspace_manager = WorkspaceManager()
+                workspace = workspace_manager.acquire(file_path, options)
+                state = "reusing" if workspace.reused else "new"
+                output_callback(f"Build workspace ({state}): {workspace.path}\n")
+            
             # Get correct Python interpreter path
-            python_exe = NuitkaCompiler.get_python_path()
+            python_exe = NuitkaCompiler.get_python_path(options)
             command = [python_exe, "-m", "nuitka"]
             
             # Disable color output from Nuitka to avoid ANSI issues
@@ -105,7 +337,8 @@ class NuitkaCompiler:
                 command.append("--standalone")
             if options.get('onefile'):
                 command.append("--onefile")
-            if options.get('remove_output'):
+                command.extend(onefile.onefile_arguments(options, file_path))
+            if options.get('remove_output') and not workspace:
                 command.append("--remove-output")
             if options.get('follow_imports'):
                 command.append("--follow-imports")
@@ -119,7 +352,9 @@ class NuitkaCompiler:
                 command.extend(["--product-name="+options['product_name']])
             if options.get('file_version'):
                 command.extend(["--file-version="+options['file_version']])
-            if options.get('output_dir'):
+            if workspace:
+                command.append(f"--output-dir={workspace.path}")
+            elif options.get('output_dir'):
                 # Ensure output directory exists
                 os.makedirs(options['output_dir'], exist_ok=True)
                 command.append(f"--output-dir={options['output_dir']}")
@@ -143,30 +378,54 @@ class NuitkaCompiler:
                 for module in options['include_module'].split(','):
                     if module.strip():
                         command.extend(["--include-module="+module.strip()])
+            if options.get('data_dirs'):
+                command.extend(data_files.data_arguments(options['data_dirs']))
+            
+            # C level profile guided optimization, Nuitka runs the training itself
+            if options.get('use_pgo'):
+                command.append("--pgo-c")
+                if options.get('pgo_args'):
+                    command.append(f"--pgo-args={options['pgo_args']}")
             
             # Build name option
             if options.get('build_name'):
                 command.append(f"--output-filename={options['build_name']}")
             
-            # Add C compiler if specified
-            if options.get('c_compiler'):
-                command.extend(["--mingw64" if options['c_compiler'] == 'mingw64' else
-                              "--msvc" if options['c_compiler'] == 'msvc' else 
-                              "--mingw32" if options['c_compiler'] == 'mingw32' else
-                              "--clang" if options['c_compiler'] == 'clang' else ""])
+            if job_tokens:
+                command.append(f"--jobs={job_tokens.tokens}")
+            
+            # Add C compiler if specified, the choices differ per platform
+            toolchain_env = {}
+            if sys.platform == "win32":
+                compiler_flag = {
+                    'mingw64': "--mingw64",
+                    'msvc': "--msvc=latest",
+                    'clang': "--clang"
+                }.get(options.get('c_compiler'))
+                if compiler_flag:
+                    command.append(compiler_flag)
+            elif options.get('toolchain'):
+                toolchain_args, toolchain_env = toolchain_settings(options['toolchain'])
+                command.extend(toolchain_args)
             
             command.append(file_path)
             
             output_callback("Starting compilation with command:\n" + " ".join(command) + "\n")
+
+            # Keep the full raw output on disk, the widget only holds the tail
+            try:
+                build_log = BuildLog(file_path)
+                build_log.update(command=command, options=options)
+                if job_tokens:
+                    build_log.update(job_tokens=job_tokens.tokens, job_token_wait=round(job_tokens.wait, 2))
+                build_log.write(" ".join(command) + "\n")
+                output_callback(f"Build log: {build_log.log_path}\n")
+            except OSError as e:
+                build_log = None
+                output_callback(f"Warning: could not create build log: {str(e)}\n")
             
             # Add environment variables for better compatibility
-            env = dict(os.environ)
-            env.update({
-                'PYTHONIOENCODING': 'utf-8',
-                'PYTHONLEGACYWINDOWSFSENCODING': '0',
-                'PYTHONLEGACYWINDOWSSTDIO': '0',
-                'PYTHONDONTWRITEBYTECODE': '1'
-            })
+            env = NuitkaCompiler.build_env(toolchain_env)
 
             # Create process with no ANSI color codes
             startupinfo = None
@@ -179,27 +438,43 @@ class NuitkaCompiler:
             # Create output queue for thread-safe reading
             output_queue = queue.Queue()
             
-            process = subprocess.Popen(
-                command,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True,
-                bufsize=1,
-                shell=False,
-                encoding='utf-8',
-                errors='replace',
-                startupinfo=startupinfo,
-                env=env
-            )
+            # Raw streams with timing, for replaying this build later
+            if options.get('record_output'):
+                recorder = StreamRecorder(options['record_output'], command)
+                output_callback(f"Recording output to {options['record_output']}\n")
+
+            process = None
+            if options.get('replay_file'):
+                # Play back a recorded build instead of running Nuitka
+                process = ReplayProcess(options['replay_file'], options.get('replay_speed', 1.0))
+            elif options.get('use_compile_server'):
+                process = NuitkaCompiler._start_on_compile_server(command, env, options, output_callback)
+            if process is None:
+                process = subprocess.Popen(
+                    command,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    universal_newlines=True,
+                    bufsize=1,
+                    shell=False,
+                    encoding='utf-8',
+                    errors='replace',
+                    startupinfo=startupinfo,
+                    creationflags=creation_flags(options),
+                    preexec_fn=limit_setter(options),
+                    env=env,
+                    # Own process group, so cancelling reaches scons and the C compiler
+                    start_new_session=sys.platform != "win32"
+                )
 
             # Start output reader threads
             stdout_thread = threading.Thread(
                 target=NuitkaCompiler._stream_reader,
-                args=(process.stdout, output_queue)
+                args=(process.stdout, output_queue, 'stdout', recorder)
             )
             stderr_thread = threading.Thread(
                 target=NuitkaCompiler._stream_reader,
-                args=(process.stderr, output_queue)
+                args=(process.stderr, output_queue, 'stderr', recorder)
             )
             
             stdout_thread.daemon = True
@@ -207,30 +482,50 @@ class NuitkaCompiler:
             stdout_thread.start()
             stderr_thread.start()
 
-            # Track progress patterns
+            # Track progress patterns, plain substrings since every line is checked
             progress_patterns = {
-                r"Compiling module": "Compiling modules...",
-                r"Linking": "Linking executable...",
-                r"Creating executable": "Creating final executable...",
-                r"Copying dependency": "Copying dependencies...",
-                r"Packaging": "Packaging files..."
+                "Compiling module": "Compiling modules...",
+                "Linking": "Linking executable...",
+                "Creating executable": "Creating final executable...",
+                "Copying dependency": "Copying dependencies...",
+                "Packaging": "Packaging files..."
             }
 
             # Process output from queue
+            fatal_rules = abort_rules.load_rules(options)
+            aborted = None
+            cancelled = False
             while process.poll() is None or not output_queue.empty():
+                if cancel_event and cancel_event.is_set() and not cancelled:
+                    cancelled = True
+                    output_callback("\nCancelling compilation...\n")
+                    NuitkaCompiler._terminate(process)
                 try:
                     # Get output with timeout to prevent hanging
                     try:
-                        line = output_queue.get(timeout=0.1)
+                        _, line = output_queue.get(timeout=0.1)
                     except queue.Empty:
                         continue
 
+                    if build_log:
+                        build_log.write(line)
+
                     # Strip ANSI codes
-                    clean_line = re.sub(r'\033\[[0-9;]*[mGKH]', '', line)
+                    clean_line = ANSI_ESCAPE.sub('', line)
+
+                    # Stop a doomed build at once instead of letting other jobs finish
+                    if fatal_rules and not aborted and not cancelled:
+                        rule = abort_rules.match(fatal_rules, clean_line)
+                        if rule:
+                            aborted = f"{rule}: {clean_line.strip()}"
+                            NuitkaCompiler._terminate(process)
+                            output_callback(clean_line)
+                            output_callback("\n" + abort_rules.ABORT_MARKER + aborted + "\n")
+                            continue
 
                     # Check for progress patterns
                     for pattern, message in progress_patterns.items():
-                        if re.search(pattern, clean_line):
+                        if pattern in clean_line:
                             output_callback(f"\n{message}\n")
                             progress_callback()
                             break
@@ -250,6 +545,34 @@ class NuitkaCompiler:
 
             # Get the return code
             return_code = process.poll()
+            if recorder:
+                recorder.close(return_code)
+            if build_log:
+                build_log.update(return_code=return_code, success=return_code == 0)
+
+            if aborted:
+                return_code = return_code or 1
+                if build_log:
+                    build_log.update(success=False, error=aborted)
+
+            if workspace:
+                if return_code == 0 and not cancelled:
+                    target_dir = options.get('output_dir') or os.getcwd()
+                    workspace_manager.publish(workspace, target_dir)
+                report = workspace_manager.finish(workspace, return_code == 0 and not cancelled)
+                if report:
+                    output_callback("\n" + report + "\n")
+                if build_log:
+                    build_log.update(workspace=workspace.key, workspace_reused=workspace.reused)
+
+            if cancelled:
+                if build_log:
+                    build_log.update(success=False, error="cancelled")
+                output_callback("\nCompilation cancelled\n")
+                return False, "Compilation cancelled"
+
+            if aborted:
+                return False, f"Build aborted on fatal output ({aborted})"
 
             if return_code == 0:
                 output_callback("\nCompilation completed successfully!\n")
@@ -263,6 +586,13 @@ class NuitkaCompiler:
                 else:
                     output_callback(f"\nOutput directory: {output_dir}\n")
                 
+                if options.get('dedup_dist') and options.get('standalone') and not options.get('onefile'):
+                    NuitkaCompiler._dedup_dist(file_path, options, output_callback, build_log)
+                if options.get('onefile') and options.get('onefile_measure'):
+                    NuitkaCompiler._measure_onefile(file_path, options, output_callback, build_log)
+                if options.get('speedup_report'):
+                    NuitkaCompiler._report_speedup(file_path, options, output_callback,
+                                                   cancel_event, build_log)
                 return True, ""
             else:
                 error_msg = "Compilation failed with return code: " + str(return_code)
@@ -272,7 +602,20 @@ class NuitkaCompiler:
         except Exception as e:
             error_msg = f"Compilation error: {str(e)}"
             output_callback("\n" + error_msg + "\n")
+            if build_log:
+                build_log.update(success=False, error=error_msg)
             return False, error_msg
         finally:
+            if job_tokens:
+                job_tokens.release()
+            if workspace:
+                workspace.release()
+            if recorder:
+                recorder.close()
+            if build_log:
+                try:
+                    build_log.close()
+                except OSError as e:
+                    print(f"Error closing build log: {str(e)}", file=sys.stderr)
             # Clean up colorama
             colorama.deinit()
@@ -11,6 +11,53 @@ SUPPORTED_LANGUAGES = {
     "ar": "العربية"
 }
 
+# Per-user storage for build logs and other persistent state
+APP_DATA_DIR = Path.home() / ".nuitka-gui"
+
+# Build log storage and rotation limits
+BUILD_LOG_DIR = APP_DATA_DIR / "logs"
+MAX_BUILD_LOGS = 50
+MAX_BUILD_LOG_BYTES = 200 * 1024 * 1024
+
+# Default TCP port of remote build workers
+DEFAULT_WORKER_PORT = 8765
+
+# Unix socket of the warm compile server
+COMPILE_SERVER_SOCKET = APP_DATA_DIR / "compile-server.sock"
+
+# Unix socket of the job token server shared by all builds on this machine
+JOBSERVER_SOCKET = APP_DATA_DIR / "jobserver.sock"
+
+# Probe results of discovered Python interpreters
+INTERPRETER_CACHE_FILE = APP_DATA_DIR / "interpreters.json"
+
+# Probed C compilers, linkers and their capabilities, per machine
+TOOLCHAIN_CACHE_FILE = APP_DATA_DIR / "toolchains.json"
+
+# Settings remembered per project directory, such as build resource limits
+PROJECT_SETTINGS_FILE = APP_DATA_DIR / "projects.json"
+
+# Content store shared by deduplicated dist folders
+DEDUP_STORE_DIR = APP_DATA_DIR / "store"
+
+# Fatal output rules replacing the built-in ones
+ABORT_RULES_FILE = APP_DATA_DIR / "abort_rules.json"
+
+# Persistent build workspaces and their disk budget
+WORKSPACE_DIR = APP_DATA_DIR / "workspaces"
+WORKSPACE_BUDGET_BYTES = 10 * 1024 * 1024 * 1024
+
+# Quiet time after the last file change before watch mode rebuilds
+WATCH_DEBOUNCE_MS = 500
+
+# Diagnostics mode: heartbeat interval, stall threshold and dump location
+HEARTBEAT_INTERVAL_MS = 50
+STALL_THRESHOLD_MS = 200
+DIAGNOSTICS_DIR = APP_DATA_DIR / "diagnostics"
+
+# Lines kept in the live output widget, full logs are on disk
+MAX_OUTPUT_LINES = 5000
+
 def load_translations():
     try:
         translations_path = Path(__file__).parent / 'translations.json'
@@ -0,0 +1,149 @@
+import fnmatch
+import os
+import re
+import threading
+import time
+from typing import Iterator, List, Optional
+
+# How often the scanner hands a batch of results to the UI
+BATCH_INTERVAL = 0.1
+# Files listed in the preview, the counts always cover the whole tree
+PREVIEW_LIMIT = 500
+
+def split_patterns(text: str) -> List[str]:
+    return [pattern.strip() for pattern in (text or '').split(',') if pattern.strip()]
+
+def default_target(source: str) -> str:
+    return os.path.basename(os.path.normpath(source))
+
+def _glob_regex(pattern: str) -> re.Pattern:
+    """Regex matching relative paths like glob.glob(recursive=True) does"""
+    regex = ''
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith('**/', i):
+            regex += '(?:.*/)?'
+            i += 3
+        elif pattern.startswith('**', i):
+            regex += '.*'
+            i += 2
+        elif pattern[i] == '*':
+            regex += '[^/]*'
+            i += 1
+        elif pattern[i] == '?':
+            regex += '[^/]'
+            i += 1
+        elif pattern[i] == '[' and ']' in pattern[i + 2:]:
+            end = pattern.index(']', i + 2)
+            body = pattern[i + 1:end]
+            regex += '[^' + body[1:] + ']' if body.startswith('!') else '[' + body + ']'
+            i = end + 1
+        else:
+            regex += re.escape(pattern[i])
+            i += 1
+    return re.compile(regex + r'\Z')
+
+class DataSelection:
+    """Which files below source end up in the build, with Nuitka's own rules.
+
+    Include patterns are globs relative to source, like the pattern part of
+    --include-data-files, so "*.png" covers the top level only and
+    "**/*.png" the whole tree. Excludes become --noinclude-data-files, which
+    Nuitka matches with fnmatch against the target path, so there "*" also
+    crosses directories.
+    """
+
+    def __init__(self, entry: dict):
+        self.source = entry['source']
+        self.target = (entry.get('target') or default_target(self.source)).strip('/')
+        self.includes = [_glob_regex(p.replace('\\', '/')) for p in split_patterns(entry.get('include'))]
+        self.excludes = [self.target + '/' + p.replace('\\', '/') for p in split_patterns(entry.get('exclude'))]
+
+    def included(self, relative: str) -> bool:
+        if not self.includes:
+            return True
+        # glob skips hidden names unless the pattern spells them out
+        if any(part.startswith('.') for part in relative.split('/')):
+            return False
+        return any(regex.match(relative) for regex in self.includes)
+
+    def excluded(self, relative: str) -> bool:
+        destination = f"{self.target}/{relative}"
+        return any(fnmatch.fnmatch(destination, pattern) or destination.startswith(pattern + '/')
+                   for pattern in self.excludes)
+
+def scan(entry: dict, cancel_event: Optional[threading.Event] = None) -> Iterator[dict]:
+    """Walk a data directory with os.scandir, yielding running totals.
+
+    Each batch has the cumulative counts and sizes plus the newly matched
+    files, so a UI can show progress on trees with many thousands of files.
+    """
+    selection = DataSelection(entry)
+    totals = {'files': 0, 'bytes': 0, 'excluded': 0, 'excluded_bytes': 0,
+              'skipped': 0, 'errors': 0, 'done': False}
+    matched = []
+    last_batch = time.monotonic()
+    stack = ['']
+    while stack:
+        relative_dir = stack.pop()
+        try:
+            with os.scandir(os.path.join(selection.source, relative_dir)) as it:
+                for item in it:
+                    if cancel_event and cancel_event.is_set():
+                        return
+                    relative = f"{relative_dir}/{item.name}" if relative_dir else item.name
+                    try:
+                        if item.is_dir(follow_symlinks=False):
+                            stack.append(relative)
+                            continue
+                        size = item.stat().st_size
+                    except OSError:
+                        totals['errors'] += 1
+                        continue
+                    if not selection.included(relative):
+                        totals['skipped'] += 1
+                    elif selection.excluded(relative):
+                        totals['excluded'] += 1
+                        totals['excluded_bytes'] += size
+                    else:
+                        totals['files'] += 1
+                        totals['bytes'] += size
+                        matched.append((relative, size))
+                    if time.monotonic() - last_batch >= BATCH_INTERVAL:
+                        yield dict(totals, matched=matched)
+                        matched = []
+                        last_batch = time.monotonic()
+        except OSError:
+            totals['errors'] += 1
+    yield dict(totals, matched=matched, done=True)
+
+def data_arguments(entries: List[dict]) -> List[str]:
+    """Nuitka arguments for the data directories chosen in the GUI"""
+    arguments = []
+    for entry in entries:
+        source = entry['source']
+        target = (entry.get('target') or default_target(source)).strip('/')
+        includes = split_patterns(entry.get('include'))
+        if includes:
+            # The three value form keeps the directory structure below source
+            arguments.extend(f"--include-data-files={source}={target}/={pattern}" for pattern in includes)
+        else:
+            arguments.append(f"--include-data-dir={source}={target}")
+        arguments.extend(f"--noinclude-data-files={pattern}"
+                         for pattern in DataSelection(entry).excludes)
+    return arguments
+
+def format_size(size: int) -> str:
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+
+def describe(entry: dict) -> str:
+    """One line summary of a data directory entry for lists"""
+    text = f"{entry['source']} -> {entry.get('target') or default_target(entry['source'])}"
+    if entry.get('include'):
+        text += f"  [{entry['include']}]"
+    if entry.get('exclude'):
+        text += f"  [-{entry['exclude']}]"
+    return text
@@ -0,0 +1,261 @@
+"""Content-addressed deduplication of standalone dist folders.
+
+    python -m src.dedup link app.dist [other.dist ...]
+    python -m src.dedup verify app.dist
+    python -m src.dedup materialize app.dist
+    python -m src.dedup gc
+
+Identical files of every dist folder share one object in a local store,
+through a reflink where the file system supports it and a hardlink
+otherwise. A manifest next to each dist folder lists every file with its
+hash, so a copy made elsewhere can be verified. Hardlinked files are made
+read-only, editing one in place would change every build that shares it.
+The store registers every manifest it wrote, garbage collection keeps the
+objects any registered dist folder still lists. A reflinked object has a
+link count of 1 like an unused one, so the count alone cannot tell.
+"""
+import argparse
+import errno
+import hashlib
+import json
+import os
+import stat
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+from src.config import DEDUP_STORE_DIR
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Small files are not worth a store object
+MIN_FILE_BYTES = 64 * 1024
+MANIFEST_SUFFIX = ".dedup-manifest.json"
+MAX_HASH_WORKERS = 8
+# Store subdirectory naming the manifests of deduplicated dist folders
+REGISTRY_DIR = "dists"
+_FICLONE = 0x40049409
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def manifest_path(dist_dir: str) -> str:
+    return os.path.normpath(dist_dir) + MANIFEST_SUFFIX
+
+def _reflink(source: str, target: str):
+    """Copy-on-write clone, fails unless the file system supports it"""
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, "reflinks are not supported on this platform")
+    with open(source, 'rb') as src, open(target, 'wb') as dst:
+        fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+    os.chmod(target, stat.S_IMODE(os.stat(source).st_mode))
+
+def _link_into(source: str, target: str) -> str:
+    """Make target share source's data, returns "reflink" or "hardlink" """
+    temp = f"{target}.dedup-{os.getpid()}"
+    try:
+        _reflink(source, temp)
+        kind = "reflink"
+    except OSError:
+        if os.path.exists(temp):
+            os.unlink(temp)
+        os.link(source, temp)
+        kind = "hardlink"
+    os.replace(temp, target)
+    return kind
+
+class ContentStore:
+    def __init__(self, root: Optional[Path] = None):
+        self.root = Path(root or DEDUP_STORE_DIR)
+
+    def object_path(self, digest: str, executable: bool) -> Path:
+        # The mode is part of the key, hardlinks share it
+        name = digest + ("-x" if executable else "")
+        return self.root / digest[:2] / name
+
+    def add(self, path: str, digest: str, executable: bool) -> tuple:
+        """Store path or link it to the stored copy, returns (link kind, bytes saved)"""
+        target = self.object_path(digest, executable)
+        if target.exists():
+            if os.path.samefile(path, target):
+                return "hardlink", 0
+            kind = _link_into(str(target), path)
+            return kind, os.path.getsize(path)
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # First copy of this content, the dist file becomes the store object
+        kind = _link_into(path, str(target))
+        if kind == "hardlink":
+            mode = os.stat(path).st_mode
+            os.chmod(path, mode & ~(stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH))
+        return kind, 0
+
+    def register(self, manifest: str):
+        """Remember a dist folder's manifest, its objects survive garbage collection"""
+        manifest = os.path.abspath(manifest)
+        registry = self.root / REGISTRY_DIR
+        registry.mkdir(parents=True, exist_ok=True)
+        # One file per dist folder, several GUI instances may register at once
+        name = hashlib.sha256(manifest.encode('utf-8')).hexdigest()[:16]
+        (registry / name).write_text(manifest, encoding='utf-8')
+
+    def referenced(self) -> Optional[set]:
+        """Object names listed by registered dist folders, None if a manifest is unreadable"""
+        names = set()
+        for entry in (self.root / REGISTRY_DIR).glob("*"):
+            try:
+                manifest = entry.read_text(encoding='utf-8')
+                dist_dir = manifest[:-len(MANIFEST_SUFFIX)]
+                if not os.path.isfile(manifest) or not os.path.isdir(dist_dir):
+                    # The dist folder is gone, so is its claim on the store
+                    entry.unlink()
+                    continue
+                with open(manifest, 'r', encoding='utf-8') as f:
+                    files = json.load(f)['files']
+            except (OSError, ValueError, KeyError):
+                return None
+            for item in files:
+                if item.get('link'):
+                    names.add(self.object_path(item['sha256'], bool(item['mode'] & stat.S_IXUSR)).name)
+        return names
+
+    def collect_garbage(self) -> int:
+        """Delete objects no registered dist folder uses anymore, returns bytes freed"""
+        referenced = self.referenced()
+        if referenced is None:
+            # Better keep everything than delete what a dist folder still lists
+            return 0
+        freed = 0
+        for path in self.root.glob("*/*"):
+            if path.parent.name == REGISTRY_DIR or path.name in referenced:
+                continue
+            try:
+                info = path.stat()
+                # Hardlinks from dist folders that were never registered
+                if info.st_nlink == 1:
+                    path.unlink()
+                    freed += info.st_size
+            except OSError:
+                pass
+        return freed
+
+def _candidates(dist_dir: str):
+    for dirpath, _, filenames in os.walk(dist_dir):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            try:
+                info = os.lstat(path)
+            except OSError:
+                continue
+            if stat.S_ISREG(info.st_mode):
+                yield path, info
+
+def dedup_directory(dist_dir: str, store: Optional[ContentStore] = None) -> dict:
+    """Link the large files of dist_dir into the store and write its manifest"""
+    store = store or ContentStore()
+    started = time.monotonic()
+    files = list(_candidates(dist_dir))
+
+    with ThreadPoolExecutor(max_workers=MAX_HASH_WORKERS) as pool:
+        digests = list(pool.map(lambda item: file_hash(item[0]), files))
+
+    entries = []
+    report = {'files': len(files), 'linked': 0, 'reflinks': 0, 'hardlinks': 0,
+              'bytes_saved': 0, 'total_bytes': 0, 'skipped': 0}
+    for (path, info), digest in zip(files, digests):
+        relative = os.path.relpath(path, dist_dir)
+        entry = {'path': relative.replace(os.sep, '/'), 'sha256': digest,
+                 'size': info.st_size, 'mode': stat.S_IMODE(info.st_mode), 'link': None}
+        report['total_bytes'] += info.st_size
+        if info.st_size >= MIN_FILE_BYTES:
+            executable = bool(info.st_mode & stat.S_IXUSR)
+            try:
+                kind, saved = store.add(path, digest, executable)
+                entry['link'] = kind
+                report['linked'] += 1
+                report[kind + 's'] += 1
+                report['bytes_saved'] += saved
+            except OSError as e:
+                # Typically the store is on another file system
+                if e.errno not in (errno.EXDEV, errno.EPERM, errno.EACCES, errno.EMLINK):
+                    raise
+                report['skipped'] += 1
+        entries.append(entry)
+
+    manifest = {'created': time.time(), 'store': str(store.root), 'files': entries}
+    with open(manifest_path(dist_dir), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=4)
+    store.register(manifest_path(dist_dir))
+    report['seconds'] = time.monotonic() - started
+    return report
+
+def verify(dist_dir: str) -> list:
+    """Compare a dist folder, or a copy of it, with its manifest, returns the problems"""
+    with open(manifest_path(dist_dir), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    problems = []
+    for entry in manifest['files']:
+        path = os.path.join(dist_dir, *entry['path'].split('/'))
+        if not os.path.isfile(path):
+            problems.append(f"missing: {entry['path']}")
+        elif os.path.getsize(path) != entry['size'] or file_hash(path) != entry['sha256']:
+            problems.append(f"changed: {entry['path']}")
+    return problems
+
+def materialize(dist_dir: str) -> int:
+    """Give every hardlinked file its own writable copy again, returns the count"""
+    count = 0
+    for path, info in _candidates(dist_dir):
+        if info.st_nlink < 2:
+            continue
+        temp = f"{path}.dedup-{os.getpid()}"
+        with open(path, 'rb') as src, open(temp, 'wb') as dst:
+            for chunk in iter(lambda: src.read(1024 * 1024), b''):
+                dst.write(chunk)
+        os.chmod(temp, stat.S_IMODE(info.st_mode) | stat.S_IWUSR)
+        os.replace(temp, path)
+        count += 1
+    return count
+
+def format_report(report: dict) -> str:
+    return (f"Deduplicated {report['linked']} of {report['files']} files "
+            f"({report['reflinks']} reflinks, {report['hardlinks']} hardlinks): "
+            f"{report['bytes_saved'] / (1024 * 1024):.1f} MB saved of "
+            f"{report['total_bytes'] / (1024 * 1024):.1f} MB in {report['seconds']:.1f}s"
+            + (f", {report['skipped']} files on another file system skipped" if report['skipped'] else ""))
+
+def main():
+    parser = argparse.ArgumentParser(description="Deduplicate standalone dist folders")
+    commands = parser.add_subparsers(dest='action', required=True)
+    link = commands.add_parser('link', help="Link dist folders into the content store")
+    link.add_argument('dist_dirs', nargs='+')
+    check = commands.add_parser('verify', help="Check a dist folder against its manifest")
+    check.add_argument('dist_dir')
+    copy = commands.add_parser('materialize', help="Replace hardlinks by independent copies")
+    copy.add_argument('dist_dir')
+    commands.add_parser('gc', help="Delete store objects no longer used")
+    args = parser.parse_args()
+
+    if args.action == 'link':
+        for dist_dir in args.dist_dirs:
+            print(f"{dist_dir}: {format_report(dedup_directory(dist_dir))}")
+    elif args.action == 'verify':
+        problems = verify(args.dist_dir)
+        print("\n".join(problems) if problems else "All files match the manifest")
+        sys.exit(1 if problems else 0)
+    elif args.action == 'materialize':
+        print(f"Copied {materialize(args.dist_dir)} hardlinked files")
+    else:
+        print(f"Freed {ContentStore().collect_garbage() / (1024 * 1024):.1f} MB")
+
+if __name__ == "__main__":
+    main()
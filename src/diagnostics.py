@@ -0,0 +1,197 @@
+import cProfile
+import io
+import json
+import marshal
+import pstats
+import sys
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from PyQt6.QtCore import QObject, QTimer
+
+from src.config import DIAGNOSTICS_DIR, HEARTBEAT_INTERVAL_MS, STALL_THRESHOLD_MS
+
+# One profiler for the whole process, it records all threads
+SHARED_PROFILER = sys.version_info >= (3, 12)
+
+class StallDetector(QObject):
+    """Measure event loop latency with a heartbeat timer and record stalls.
+
+    A watchdog thread notices when the heartbeat stops and captures the GUI
+    thread's stack while the stall is still in progress, so the timeline
+    shows what the event loop was busy with.
+    """
+    def __init__(self, parent=None, interval_ms: int = HEARTBEAT_INTERVAL_MS,
+                 threshold_ms: int = STALL_THRESHOLD_MS):
+        super().__init__(parent)
+        self.interval = interval_ms / 1000
+        self.threshold = threshold_ms / 1000
+        self.stalls = []
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+        self.beats = 0
+        self.gui_thread_id = threading.get_ident()
+        self.last_beat = time.perf_counter()
+        self.stall_stack = None
+        self.lock = threading.Lock()
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self.on_heartbeat)
+
+        self.running = False
+        self.watchdog = threading.Thread(target=self.watch, name="stall-watchdog", daemon=True)
+
+    def start(self):
+        self.running = True
+        self.last_beat = time.perf_counter()
+        self.timer.start()
+        self.watchdog.start()
+
+    def stop(self):
+        self.running = False
+        self.timer.stop()
+
+    def on_heartbeat(self):
+        now = time.perf_counter()
+        with self.lock:
+            lag = max(0.0, now - self.last_beat - self.interval)
+            self.last_beat = now
+            stack, self.stall_stack = self.stall_stack, None
+        self.beats += 1
+        self.total_lag += lag
+        self.max_lag = max(self.max_lag, lag)
+        if lag >= self.threshold:
+            self.stalls.append({
+                'at': datetime.now().isoformat(timespec='milliseconds'),
+                'duration_ms': round(lag * 1000, 1),
+                'stack': stack
+            })
+
+    def watch(self):
+        while self.running:
+            time.sleep(self.threshold / 2)
+            with self.lock:
+                stalled = time.perf_counter() - self.last_beat - self.interval >= self.threshold
+                if stalled and self.stall_stack is None:
+                    frame = sys._current_frames().get(self.gui_thread_id)
+                    if frame is not None:
+                        self.stall_stack = traceback.format_stack(frame)
+
+    def summary(self) -> dict:
+        return {
+            'heartbeats': self.beats,
+            'mean_lag_ms': round(self.total_lag / self.beats * 1000, 2) if self.beats else 0.0,
+            'max_lag_ms': round(self.max_lag * 1000, 1),
+            'stalls': len(self.stalls)
+        }
+
+class Diagnostics:
+    """Stall detection plus cProfile for the GUI thread and compiler threads"""
+    def __init__(self, parent=None):
+        self.started = datetime.now()
+        self.stall_detector = StallDetector(parent)
+        self.gui_profile = cProfile.Profile()
+        self.thread_profiles = []
+        self.running_threads = []
+        self.lock = threading.Lock()
+
+    def start(self):
+        self.stall_detector.start()
+        self.gui_profile.enable()
+
+    @contextmanager
+    def profile_thread(self, name: str):
+        """Profile the calling thread for the duration of the block"""
+        with self.lock:
+            self.running_threads.append(name)
+        profile = None
+        try:
+            # From 3.12 cProfile sits on the process-wide sys.monitoring, a second
+            # profiler cannot start and the GUI profile already sees every thread
+            if not SHARED_PROFILER:
+                profile = cProfile.Profile()
+                profile.enable()
+            yield
+        finally:
+            if profile is not None:
+                # create_stats() disables profiling of the calling thread, so only
+                # the profiled thread itself may call it
+                profile.disable()
+                profile.create_stats()
+            with self.lock:
+                self.running_threads.remove(name)
+                if profile is not None:
+                    self.thread_profiles.append((name, profile))
+
+    def dump(self) -> Path:
+        """Write profiles, the stall timeline and a readable summary"""
+        target = DIAGNOSTICS_DIR / datetime.now().strftime("%Y%m%d-%H%M%S")
+        target.mkdir(parents=True, exist_ok=True)
+
+        # Snapshot the GUI profile without ending the session, dump() runs
+        # on the GUI thread so disabling here only pauses the GUI profile
+        self.gui_profile.disable()
+        try:
+            self.gui_profile.dump_stats(str(target / "gui.prof"))
+        finally:
+            self.gui_profile.enable()
+        profiles = [("gui", target / "gui.prof")]
+
+        with self.lock:
+            thread_profiles = list(self.thread_profiles)
+            running = list(self.running_threads)
+        for i, (name, profile) in enumerate(thread_profiles):
+            filename = f"{name}-{i}.prof"
+            # What dump_stats() writes, without its create_stats() call
+            with open(target / filename, 'wb') as f:
+                marshal.dump(profile.stats, f)
+            profiles.append((f"{name}-{i}", target / filename))
+
+        timeline = {
+            'session_started': self.started.isoformat(timespec='seconds'),
+            'summary': self.stall_detector.summary(),
+            'stalls': self.stall_detector.stalls
+        }
+        with open(target / "stalls.json", 'w', encoding='utf-8') as f:
+            json.dump(timeline, f, indent=4)
+
+        with open(target / "summary.txt", 'w', encoding='utf-8') as f:
+            f.write(f"Event loop: {json.dumps(timeline['summary'])}\n")
+            if SHARED_PROFILER:
+                f.write("Python 3.12+: the gui profile covers the compiler threads as well\n")
+            elif running:
+                f.write(f"Still running, profiled once finished: {', '.join(running)}\n")
+            for name, path in profiles:
+                stream = io.StringIO()
+                # Loaded from the dumped file, Stats(profile) would disable profiling
+                pstats.Stats(str(path), stream=stream).sort_stats('cumulative').print_stats(30)
+                f.write(f"\n===== {name} =====\n{stream.getvalue()}")
+        return target
+
+_active: Optional[Diagnostics] = None
+
+def enable(parent=None) -> Diagnostics:
+    """Start the diagnostics session for this process"""
+    global _active
+    if _active is None:
+        _active = Diagnostics(parent)
+        _active.start()
+    return _active
+
+def get() -> Optional[Diagnostics]:
+    return _active
+
+@contextmanager
+def profile_thread(name: str):
+    """Profile the block when diagnostics are enabled, otherwise do nothing"""
+    if _active is None:
+        yield
+    else:
+        with _active.profile_thread(name):
+            yield
@@ -1,6 +1,89 @@
 from PyQt6.QtWidgets import (QFrame, QVBoxLayout, QHBoxLayout, QLabel, 
                             QLineEdit, QPushButton, QCheckBox, QComboBox,
-                            QFileDialog)
+                            QFileDialog, QDialog, QPlainTextEdit, QListWidget)
+import os
+import sys
+import threading
+from PyQt6.QtCore import QThread, QTimer, pyqtSignal
+from PyQt6.QtGui import QTextCursor
+from src.build_logs import read_log_chunks
+from src.interpreters import cached_interpreters, discover_interpreters, describe
+from src import toolchains, data_files
+from src.build_limits import LIMIT_OPTIONS
+
+# Lines the log viewer keeps, older ones scroll out so a huge log shows its end
+LOG_VIEW_MAX_LINES = 200000
+# Log chunks decompressed ahead of the viewer
+LOG_READ_AHEAD = 2
+
+class InterpreterDiscoveryThread(QThread):
+    """Probe the Python interpreters on this machine without blocking the UI"""
+    interpreters_found = pyqtSignal(list)
+
+    def run(self):
+        try:
+            self.interpreters_found.emit(discover_interpreters())
+        except Exception as e:
+            print(f"Error discovering interpreters: {e}")
+
+class ToolchainDiscoveryThread(QThread):
+    """Probe C compilers and linkers without blocking the UI"""
+    toolchains_found = pyqtSignal(dict)
+
+    def run(self):
+        try:
+            self.toolchains_found.emit(toolchains.discover_toolchains())
+        except Exception as e:
+            print(f"Error probing toolchains: {e}")
+
+class DataScanThread(QThread):
+    """Walk a data directory and stream counts and matched files to the UI"""
+    batch_ready = pyqtSignal(dict)
+
+    def __init__(self, entry):
+        super().__init__()
+        self.entry = entry
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        try:
+            for batch in data_files.scan(self.entry, self.cancel_event):
+                self.batch_ready.emit(batch)
+        except Exception as e:
+            print(f"Error scanning data directory: {e}")
+
+class LogReadThread(QThread):
+    """Decompress a build log in chunks without blocking the UI"""
+    chunk_ready = pyqtSignal(str)
+    read_failed = pyqtSignal(str)
+
+    def __init__(self, log_path):
+        super().__init__()
+        self.log_path = log_path
+        self.cancel_event = threading.Event()
+        # The viewer hands a slot back per shown chunk, so reading stays
+        # only a few chunks ahead of it
+        self.slots = threading.Semaphore(LOG_READ_AHEAD)
+
+    def cancel(self):
+        self.cancel_event.set()
+        self.slots.release()
+
+    def chunk_shown(self):
+        self.slots.release()
+
+    def run(self):
+        try:
+            for chunk in read_log_chunks(self.log_path):
+                self.slots.acquire()
+                if self.cancel_event.is_set():
+                    return
+                self.chunk_ready.emit(chunk)
+        except (OSError, EOFError) as e:
+            self.read_failed.emit(str(e))
 
 class AdvancedOptionsFrame(QFrame):
     def __init__(self, parent, translator, options):
@@ -10,6 +93,16 @@ class AdvancedOptionsFrame(QFrame):
         self.widgets = {}
         self.flag_dropdown = None
         self.current_flag_mapping = {}
+        self.interpreter_dropdown = None
+        self.interpreter_mapping = {}
+        self.interpreters = []
+        self.toolchains = None
+        self.toolchain_chosen = False
+        self.limit_entries = {}
+        self.data_scan_thread = None
+        self.stopped_scans = []
+        self.data_scan_totals = None
+        self.data_preview_count = 0
         
         # Add default options with corrected python_flag value
         self.options.update({
@@ -21,11 +114,46 @@ class AdvancedOptionsFrame(QFrame):
             'product_name': '',
             'file_version': '',
             'include_package': '',
-            'include_module': ''
+            'include_module': '',
+            'remote_workers': '',
+            'use_compile_server': False,
+            'use_jobserver': False,
+            'use_workspace': False,
+            'python_exe': '',
+            'use_pgo': False,
+            'pgo_args': '',
+            'c_compiler': '',
+            'toolchain': '',
+            'speedup_report': False,
+            'speedup_command': '',
+            'dedup_dist': False,
+            'onefile_compression': True,
+            'onefile_cached': False,
+            'onefile_tempdir_spec': '',
+            'onefile_measure': False,
+            'early_abort': True,
+            'abort_pattern': '',
+            'data_dirs': [],
+            'package_mode': False,
+            'package_modules': ''
         })
+        self.options.update(LIMIT_OPTIONS)
         
         self.create_widgets()
         
+        # Show cached interpreters at once, refresh them in the background
+        self.populate_interpreters(cached_interpreters())
+        self.discovery_thread = InterpreterDiscoveryThread()
+        self.discovery_thread.interpreters_found.connect(self.populate_interpreters)
+        self.discovery_thread.start()
+        
+        # Windows keeps the fixed list, elsewhere the probed toolchains are offered
+        if sys.platform != "win32":
+            self.populate_toolchains(toolchains.cached_toolchains())
+            self.toolchain_thread = ToolchainDiscoveryThread()
+            self.toolchain_thread.toolchains_found.connect(self.populate_toolchains)
+            self.toolchain_thread.start()
+        
     def safe_disconnect(self, widget):
         """Safely disconnect all signals from a widget"""
         try:
@@ -66,6 +194,8 @@ class AdvancedOptionsFrame(QFrame):
         options_layout.addWidget(left_frame)
         options_layout.addWidget(right_frame)
         layout.addWidget(options_container)
+        
+        self.create_data_options(layout)
 
     def create_left_options(self, layout):
         # Add build name
@@ -97,7 +227,8 @@ class AdvancedOptionsFrame(QFrame):
 
     def create_right_options(self, layout):
         # Text fields
-        fields = ['include_module']
+        fields = ['include_module', 'remote_workers', 'pgo_args', 'speedup_command',
+                  'onefile_tempdir_spec', 'abort_pattern', 'package_modules']
         for field in fields:
             label = QLabel(self.translator(field))
             layout.addWidget(label)
@@ -108,6 +239,15 @@ class AdvancedOptionsFrame(QFrame):
             entry.textChanged.connect(lambda text, f=field: self.update_option(f, text))
             layout.addWidget(entry)
         
+        # Python interpreter dropdown
+        interpreter_label = QLabel(self.translator('python_interpreter'))
+        layout.addWidget(interpreter_label)
+        self.widgets['python_interpreter'] = interpreter_label
+        
+        self.interpreter_dropdown = QComboBox()
+        self.interpreter_dropdown.currentTextChanged.connect(self.on_interpreter_selected)
+        layout.addWidget(self.interpreter_dropdown)
+        
         # Python Flag dropdown
         flag_frame = QFrame()
         flag_layout = QHBoxLayout(flag_frame)
@@ -140,23 +280,26 @@ class AdvancedOptionsFrame(QFrame):
         self.compiler_mapping = {
             'MinGW64 (default)': 'mingw64',
             'MSVC': 'msvc',
-            'MinGW32': 'mingw32',
             'Clang': 'clang'
         }
         
         self.compiler_dropdown = QComboBox()
-        self.compiler_dropdown.addItems(self.compiler_mapping.keys())
         self.compiler_dropdown.currentTextChanged.connect(self.on_compiler_selected)
+        if sys.platform == "win32":
+            self.compiler_dropdown.addItems(self.compiler_mapping.keys())
         compiler_layout.addWidget(self.compiler_dropdown)
         
         layout.addWidget(compiler_frame)
         
         # C Compiler dropdown styling
-        self.compiler_dropdown.setFixedWidth(200)  # Set fixed width
+        self.compiler_dropdown.setMinimumWidth(200)
         self.compiler_dropdown.setMaxVisibleItems(8)  # Show max 8 items in dropdown
         
         # Checkboxes
-        checkboxes = ['enable_console', 'windows_uac_admin', 'windows_uac_uiaccess']
+        checkboxes = ['enable_console', 'windows_uac_admin', 'windows_uac_uiaccess',
+                      'use_compile_server', 'use_jobserver', 'use_workspace', 'use_pgo', 'speedup_report',
+                      'dedup_dist', 'onefile_compression', 'onefile_cached', 'onefile_measure',
+                      'early_abort', 'package_mode']
         for cb in checkboxes:
             checkbox = QCheckBox(self.translator(cb))
             checkbox.setChecked(self.options[cb])
@@ -167,6 +310,186 @@ class AdvancedOptionsFrame(QFrame):
         # Special buttons
         self.create_file_selector(layout, "windows_icon", "*.ico")
         self.create_dir_selector(layout, "output_dir")
+        
+        self.create_limit_options(layout)
+
+    def create_limit_options(self, layout):
+        """Priority and resource limits of the build, remembered per project"""
+        for field in ['build_nice', 'build_cpus', 'build_memory_limit_mb']:
+            label = QLabel(self.translator(field))
+            layout.addWidget(label)
+            self.widgets[field] = label
+            
+            entry = QLineEdit()
+            entry.setText(self.options[field])
+            entry.textChanged.connect(lambda text, f=field: self.update_option(f, text))
+            layout.addWidget(entry)
+            self.limit_entries[field] = entry
+        
+        checkbox = QCheckBox(self.translator('build_io_idle'))
+        checkbox.setChecked(self.options['build_io_idle'])
+        checkbox.stateChanged.connect(lambda state: self.update_option('build_io_idle', bool(state)))
+        layout.addWidget(checkbox)
+        self.widgets['build_io_idle'] = checkbox
+        self.limit_entries['build_io_idle'] = checkbox
+
+    def create_data_options(self, layout):
+        """Data directories to ship, previewed by a background scan"""
+        title = QLabel(self.translator('data_files'))
+        layout.addWidget(title)
+        self.widgets['data_files'] = title
+        
+        self.data_entries = {}
+        editor = QFrame()
+        editor_layout = QHBoxLayout(editor)
+        for field in ['data_source', 'data_target', 'data_include', 'data_exclude']:
+            label = QLabel(self.translator(field))
+            editor_layout.addWidget(label)
+            self.widgets[field] = label
+            
+            entry = QLineEdit()
+            entry.textChanged.connect(self.schedule_data_scan)
+            editor_layout.addWidget(entry)
+            self.data_entries[field] = entry
+            if field == 'data_source':
+                browse_btn = QPushButton("...")
+                browse_btn.setFixedWidth(30)
+                browse_btn.clicked.connect(self.browse_data_dir)
+                editor_layout.addWidget(browse_btn)
+        
+        for button_name, handler in [('add_data_dir', self.add_data_dir),
+                                     ('remove_data_dir', self.remove_data_dir)]:
+            button = QPushButton(self.translator(button_name))
+            button.clicked.connect(handler)
+            editor_layout.addWidget(button)
+            self.widgets[button_name] = button
+        layout.addWidget(editor)
+        
+        self.data_list = QListWidget()
+        self.data_list.setMaximumHeight(80)
+        self.data_list.currentRowChanged.connect(self.on_data_dir_selected)
+        layout.addWidget(self.data_list)
+        
+        self.data_status = QLabel()
+        layout.addWidget(self.data_status)
+        
+        self.data_preview = QPlainTextEdit()
+        self.data_preview.setReadOnly(True)
+        self.data_preview.setMaximumHeight(120)
+        layout.addWidget(self.data_preview)
+        
+        # Rescan once typing pauses, not on every key
+        self.data_scan_timer = QTimer(self)
+        self.data_scan_timer.setSingleShot(True)
+        self.data_scan_timer.setInterval(300)
+        self.data_scan_timer.timeout.connect(self.start_data_scan)
+        self.refresh_data_list()
+
+    def current_data_entry(self):
+        source = self.data_entries['data_source'].text().strip()
+        if not source:
+            return None
+        return {'source': os.path.abspath(source),
+                'target': self.data_entries['data_target'].text().strip(),
+                'include': self.data_entries['data_include'].text().strip(),
+                'exclude': self.data_entries['data_exclude'].text().strip()}
+
+    def browse_data_dir(self):
+        dirname = QFileDialog.getExistingDirectory(self, self.translator('data_source'), "")
+        if dirname:
+            self.data_entries['data_source'].setText(dirname)
+
+    def schedule_data_scan(self):
+        self.data_scan_timer.start()
+
+    def start_data_scan(self):
+        """Replace any running scan by one for the entry being edited"""
+        if self.data_scan_thread:
+            self.data_scan_thread.cancel()
+            # Keep a reference until it has stopped, Qt aborts on destroying a running thread
+            self.stopped_scans.append(self.data_scan_thread)
+            self.data_scan_thread.finished.connect(self.forget_stopped_scans)
+            self.data_scan_thread = None
+        
+        self.data_preview.clear()
+        self.data_preview_count = 0
+        self.data_scan_totals = None
+        self.data_status.clear()
+        entry = self.current_data_entry()
+        if not entry or not os.path.isdir(entry['source']):
+            return
+        
+        thread = DataScanThread(entry)
+        thread.batch_ready.connect(lambda batch, t=thread: self.on_data_scan_batch(t, batch))
+        self.data_scan_thread = thread
+        thread.start()
+
+    def forget_stopped_scans(self):
+        self.stopped_scans = [t for t in self.stopped_scans if t.isRunning()]
+
+    def on_data_scan_batch(self, thread, batch):
+        if thread is not self.data_scan_thread:
+            return
+        # Only the first files are listed, the counts cover everything
+        room = data_files.PREVIEW_LIMIT - self.data_preview_count
+        if room > 0 and batch['matched']:
+            shown = batch['matched'][:room]
+            self.data_preview.appendPlainText("\n".join(
+                f"{path}  ({data_files.format_size(size)})" for path, size in shown))
+            self.data_preview_count += len(shown)
+        self.data_scan_totals = batch
+        self.show_data_status()
+
+    def show_data_status(self):
+        batch = self.data_scan_totals
+        if not batch:
+            return
+        key = 'data_scan_done' if batch['done'] else 'data_scan_progress'
+        self.data_status.setText(self.translator(key).format(
+            files=f"{batch['files']:,}", size=data_files.format_size(batch['bytes']),
+            excluded=f"{batch['excluded']:,}",
+            excluded_size=data_files.format_size(batch['excluded_bytes'])))
+
+    def add_data_dir(self):
+        entry = self.current_data_entry()
+        if not entry or not os.path.isdir(entry['source']):
+            return
+        # Editing an existing entry replaces it
+        entries = [e for e in self.options['data_dirs']
+                   if (e['source'], e['target']) != (entry['source'], entry['target'])]
+        entries.append(entry)
+        self.update_option('data_dirs', entries)
+        self.refresh_data_list()
+
+    def remove_data_dir(self):
+        row = self.data_list.currentRow()
+        if 0 <= row < len(self.options['data_dirs']):
+            entries = list(self.options['data_dirs'])
+            del entries[row]
+            self.update_option('data_dirs', entries)
+            self.refresh_data_list()
+
+    def refresh_data_list(self):
+        self.data_list.blockSignals(True)
+        self.data_list.clear()
+        self.data_list.addItems([data_files.describe(entry) for entry in self.options['data_dirs']])
+        self.data_list.blockSignals(False)
+
+    def on_data_dir_selected(self, row):
+        if 0 <= row < len(self.options['data_dirs']):
+            entry = self.options['data_dirs'][row]
+            for field, key in [('data_source', 'source'), ('data_target', 'target'),
+                               ('data_include', 'include'), ('data_exclude', 'exclude')]:
+                self.data_entries[field].setText(entry.get(key, ''))
+
+    def set_limit_options(self, limits):
+        """Show the resource settings stored for the selected project"""
+        for field, value in limits.items():
+            widget = self.limit_entries.get(field)
+            if isinstance(widget, QCheckBox):
+                widget.setChecked(bool(value))
+            elif widget is not None:
+                widget.setText(str(value))
 
     def create_file_selector(self, layout, option_name, file_type):
         frame = QFrame()
@@ -267,17 +590,69 @@ class AdvancedOptionsFrame(QFrame):
         if display_text in self.current_flag_mapping:
             self.update_option('python_flag', self.current_flag_mapping[display_text])
 
+    def populate_interpreters(self, interpreters):
+        """Fill the interpreter dropdown, keeping the current selection"""
+        self.interpreters = interpreters
+        current_path = self.options.get('python_exe', '')
+        
+        self.interpreter_mapping = {self.translator('current_interpreter'): ''}
+        for info in interpreters:
+            self.interpreter_mapping[describe(info)] = info['executable']
+        
+        self.interpreter_dropdown.blockSignals(True)
+        self.interpreter_dropdown.clear()
+        self.interpreter_dropdown.addItems(self.interpreter_mapping.keys())
+        current_text = next(
+            (k for k, v in self.interpreter_mapping.items() if v == current_path),
+            self.translator('current_interpreter')
+        )
+        self.interpreter_dropdown.setCurrentText(current_text)
+        self.interpreter_dropdown.blockSignals(False)
+        self.on_interpreter_selected(current_text)
+
+    def on_interpreter_selected(self, display_text):
+        """Handle interpreter selection from dropdown"""
+        if display_text in self.interpreter_mapping:
+            self.update_option('python_exe', self.interpreter_mapping[display_text])
+
     def on_compiler_selected(self, display_text):
         """Handle C compiler selection from dropdown"""
-        if display_text in self.compiler_mapping:
+        if display_text not in self.compiler_mapping:
+            return
+        if sys.platform == "win32":
             self.update_option('c_compiler', self.compiler_mapping[display_text])
+        else:
+            self.toolchain_chosen = True
+            self.update_option('toolchain', self.compiler_mapping[display_text])
+
+    def populate_toolchains(self, result):
+        """List probed compiler and linker combinations, fastest first"""
+        self.toolchains = result
+        combinations = (result or {}).get('combinations', [])
+        
+        self.compiler_mapping = {self.translator('default_toolchain'): ''}
+        for combination in combinations:
+            self.compiler_mapping[toolchains.describe(combination)] = toolchains.toolchain_key(combination)
+        
+        # Preselect the fastest combination until the user picks one
+        current = self.options.get('toolchain', '')
+        if current not in self.compiler_mapping.values() or not self.toolchain_chosen:
+            current = toolchains.toolchain_key(combinations[0]) if combinations else ''
+        self.update_option('toolchain', current)
+        
+        self.compiler_dropdown.blockSignals(True)
+        self.compiler_dropdown.clear()
+        self.compiler_dropdown.addItems(self.compiler_mapping.keys())
+        self.compiler_dropdown.setCurrentText(
+            next(k for k, v in self.compiler_mapping.items() if v == current))
+        self.compiler_dropdown.blockSignals(False)
 
     def update_translations(self, current_language):
         """Update translations for all widgets in the frame"""
         try:
             # Update labels and checkboxes
             for widget_name, widget in self.widgets.items():
-                if isinstance(widget, (QLabel, QCheckBox)):
+                if isinstance(widget, (QLabel, QCheckBox, QPushButton)):
                     widget.setText(self.translator(widget_name))
                 elif isinstance(widget, QLineEdit):
                     # Update placeholders for file/dir selectors
@@ -298,6 +673,69 @@ class AdvancedOptionsFrame(QFrame):
                     list(localized_flags.keys())[0]
                 )
                 self.flag_dropdown.setCurrentText(current_text)
+            
+            if self.interpreter_dropdown:
+                self.populate_interpreters(self.interpreters)
+            
+            if sys.platform != "win32":
+                self.populate_toolchains(self.toolchains)
+            
+            self.show_data_status()
                 
         except Exception as e:
-            print(f"Error updating translations: {e}")
\ No newline at end of file
+            print(f"Error updating translations: {e}")
+
+class LogViewerDialog(QDialog):
+    """Read-only viewer for a stored build log"""
+    def __init__(self, parent, translator, log_path):
+        super().__init__(parent)
+        self.translator = translator
+        self.setWindowTitle(f"{translator('build_log')} - {log_path.name}")
+        self.resize(900, 600)
+
+        layout = QVBoxLayout(self)
+        self.text = QPlainTextEdit()
+        self.text.setReadOnly(True)
+        self.text.setStyleSheet("""
+            QPlainTextEdit {
+                background-color: #1E1E1E;
+                color: #D4D4D4;
+                font-family: Consolas, monospace;
+                padding: 10px;
+            }
+        """)
+        self.text.setMaximumBlockCount(LOG_VIEW_MAX_LINES)
+        layout.addWidget(self.text)
+        self.status = QLabel(translator('log_loading').format(size=0))
+        layout.addWidget(self.status)
+
+        self.loaded_chars = 0
+        self.reader = LogReadThread(log_path)
+        self.reader.chunk_ready.connect(self.append_chunk)
+        self.reader.read_failed.connect(self.show_read_error)
+        self.reader.finished.connect(self.on_loaded)
+        self.reader.start()
+
+    def append_chunk(self, chunk):
+        # A cursor of its own leaves the user's position and selection alone
+        cursor = QTextCursor(self.text.document())
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        cursor.insertText(chunk)
+        self.loaded_chars += len(chunk)
+        self.status.setText(self.translator('log_loading').format(
+            size=self.loaded_chars // (1024 * 1024)))
+        self.reader.chunk_shown()
+
+    def show_read_error(self, error):
+        self.text.appendPlainText(f"Error reading build log: {error}")
+
+    def on_loaded(self):
+        if self.text.blockCount() >= LOG_VIEW_MAX_LINES:
+            self.status.setText(self.translator('log_truncated').format(lines=LOG_VIEW_MAX_LINES))
+        else:
+            self.status.hide()
+
+    def done(self, result):
+        self.reader.cancel()
+        self.reader.wait()
+        super().done(result)
@@ -0,0 +1,199 @@
+import glob
+import json
+import os
+import re
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from src.config import INTERPRETER_CACHE_FILE
+
+PROBE_TIMEOUT = 15
+MAX_PROBE_WORKERS = 16
+
+# Printed by each candidate interpreter about itself
+PROBE_SCRIPT = """
+import json, platform, struct, sys, sysconfig
+try:
+    from importlib.metadata import version
+    nuitka = version('nuitka')
+except Exception:
+    nuitka = None
+print(json.dumps({
+    'version': platform.python_version(),
+    'implementation': platform.python_implementation(),
+    'arch': platform.machine(),
+    'bits': struct.calcsize('P') * 8,
+    'prefix': sys.prefix,
+    'site_packages': sysconfig.get_paths().get('purelib'),
+    'nuitka': nuitka
+}))
+"""
+
+_PYTHON_NAME = re.compile(r"^python(\d+(\.\d+)?)?(\.exe)?$", re.IGNORECASE)
+
+def _bin_python(env_dir: str) -> Optional[str]:
+    """Get the interpreter inside a venv, conda env or installation prefix"""
+    for relative in (('bin', 'python'), ('bin', 'python3'), ('Scripts', 'python.exe'), ('python.exe',)):
+        path = os.path.join(env_dir, *relative)
+        if os.path.isfile(path):
+            return path
+    return None
+
+def find_candidates(project_dir: Optional[str] = None) -> List[str]:
+    """List interpreter executables on PATH and in pyenv, conda and venv locations"""
+    candidates = [sys.executable]
+
+    for directory in os.environ.get('PATH', '').split(os.pathsep):
+        # pyenv shims only dispatch to the versions found below
+        if os.path.basename(os.path.normpath(directory)) == 'shims':
+            continue
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            continue
+        for name in names:
+            if _PYTHON_NAME.match(name):
+                path = os.path.join(directory, name)
+                if os.path.isfile(path) and os.access(path, os.X_OK):
+                    candidates.append(path)
+
+    home = Path.home()
+    env_dirs = []
+
+    pyenv_root = os.environ.get('PYENV_ROOT', str(home / '.pyenv'))
+    env_dirs += glob.glob(os.path.join(pyenv_root, 'versions', '*'))
+
+    conda_roots = [os.environ.get('CONDA_PREFIX'), '/opt/conda'] + [
+        str(home / name) for name in ('miniconda3', 'anaconda3', 'miniforge3', 'mambaforge')
+    ]
+    for root in filter(None, conda_roots):
+        env_dirs.append(root)
+        env_dirs += glob.glob(os.path.join(root, 'envs', '*'))
+
+    venv_homes = [os.environ.get('WORKON_HOME'), str(home / '.virtualenvs'),
+                  str(home / '.venvs'), str(home / '.local' / 'share' / 'virtualenvs')]
+    for venv_home in filter(None, venv_homes):
+        env_dirs += glob.glob(os.path.join(venv_home, '*'))
+    if os.environ.get('VIRTUAL_ENV'):
+        env_dirs.append(os.environ['VIRTUAL_ENV'])
+    if project_dir:
+        env_dirs += [os.path.join(project_dir, name) for name in ('.venv', 'venv', 'env')]
+
+    for env_dir in env_dirs:
+        python = _bin_python(env_dir)
+        if python:
+            candidates.append(python)
+
+    # Keep the first spelling of every path
+    seen = set()
+    unique = []
+    for path in candidates:
+        path = os.path.abspath(path)
+        if path not in seen:
+            seen.add(path)
+            unique.append(path)
+    return unique
+
+def _stamp(path: Optional[str]) -> Optional[float]:
+    try:
+        return os.stat(path).st_mtime if path else None
+    except OSError:
+        return None
+
+def probe(executable: str) -> dict:
+    """Ask an interpreter for its version, architecture and Nuitka version"""
+    try:
+        result = subprocess.run(
+            [executable, '-c', PROBE_SCRIPT],
+            capture_output=True, text=True, timeout=PROBE_TIMEOUT,
+            stdin=subprocess.DEVNULL
+        )
+        info = json.loads(result.stdout.strip().splitlines()[-1])
+    except (OSError, subprocess.SubprocessError, ValueError, IndexError):
+        # Remember broken candidates too, so they are not probed every time
+        info = {'failed': True}
+    info['executable'] = executable
+    info['mtime'] = _stamp(executable)
+    # Installing Nuitka changes site-packages but not the executable
+    info['site_mtime'] = _stamp(info.get('site_packages'))
+    return info
+
+def _load_cache() -> Dict[str, dict]:
+    try:
+        with open(INTERPRETER_CACHE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_cache(cache: Dict[str, dict]):
+    try:
+        INTERPRETER_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with open(INTERPRETER_CACHE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, indent=4)
+    except OSError as e:
+        print(f"Error saving interpreter cache: {e}")
+
+def _is_fresh(info: dict) -> bool:
+    return (info.get('mtime') == _stamp(info['executable'])
+            and info.get('site_mtime') == _stamp(info.get('site_packages')))
+
+def _unique_sorted(infos: List[dict]) -> List[dict]:
+    """Drop symlinked duplicates of the same environment, newest Python first"""
+    seen = set()
+    result = []
+    for info in infos:
+        key = (info.get('prefix'), info.get('version'))
+        if key not in seen:
+            seen.add(key)
+            result.append(info)
+
+    def version_key(info):
+        return tuple(int(p) for p in re.findall(r"\d+", info.get('version', ''))[:3])
+    return sorted(result, key=version_key, reverse=True)
+
+def cached_interpreters() -> List[dict]:
+    """Return previously discovered interpreters without probing anything"""
+    cache = _load_cache()
+    return _unique_sorted([info for info in cache.values()
+                           if not info.get('failed') and os.path.isfile(info['executable'])])
+
+def discover_interpreters(project_dir: Optional[str] = None) -> List[dict]:
+    """Find interpreters, probing only new or changed ones, all at once"""
+    cache = _load_cache()
+    candidates = find_candidates(project_dir)
+
+    results = []
+    to_probe = []
+    for path in candidates:
+        info = cache.get(path)
+        if info and _is_fresh(info):
+            if not info.get('failed'):
+                results.append(info)
+        else:
+            to_probe.append(path)
+
+    if to_probe:
+        with ThreadPoolExecutor(max_workers=min(MAX_PROBE_WORKERS, len(to_probe))) as pool:
+            for path, info in zip(to_probe, pool.map(probe, to_probe)):
+                cache[path] = info
+                if not info.get('failed'):
+                    results.append(info)
+
+    # Forget interpreters that disappeared
+    for path in list(cache):
+        if not os.path.isfile(path):
+            del cache[path]
+    _save_cache(cache)
+
+    # Keep discovery order for ties so PATH entries win over symlinked duplicates
+    order = {path: i for i, path in enumerate(candidates)}
+    results.sort(key=lambda info: order.get(info['executable'], len(order)))
+    return _unique_sorted(results)
+
+def describe(info: dict) -> str:
+    """Human readable one-line description for dropdowns"""
+    nuitka = f"Nuitka {info['nuitka']}" if info.get('nuitka') else "no Nuitka"
+    return f"Python {info.get('version')} {info.get('arch')} ({nuitka}) - {info['executable']}"
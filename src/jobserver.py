@@ -0,0 +1,313 @@
+"""Machine-wide job token server.
+
+A small local daemon that hands out C compile job tokens, so several GUI
+instances, CI jobs or users on one host share its cores instead of each
+running full width builds. A build asks for tokens before Nuitka starts,
+passes the number it got as --jobs and holds the connection open while it
+runs. Tokens come back when that connection closes, also when the build
+crashes. Waiting builds are served first come, first served.
+
+Start it with ``python -m src.jobserver [--tokens N]``; the GUI also starts
+it on demand when "Share CPU Cores Through the Job Server" is enabled.
+``python -m src.jobserver --status`` lists holders and waiting builds.
+POSIX only.
+"""
+import argparse
+import json
+import os
+import selectors
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+from src.config import JOBSERVER_SOCKET
+
+CONNECT_TIMEOUT = 1.0
+# How long a build waits for an auto-started server to come up
+START_TIMEOUT = 3.0
+# How often a waiting build checks for cancellation
+POLL_INTERVAL = 0.2
+
+# Output lines the GUI reacts to while a build waits for tokens
+WAIT_MARKER = "Job server: waiting for "
+GRANT_MARKER = "Job server: got "
+
+def is_supported() -> bool:
+    return hasattr(socket, 'AF_UNIX')
+
+def _connect(timeout: Optional[float] = CONNECT_TIMEOUT) -> socket.socket:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(str(JOBSERVER_SOCKET))
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+def _send(sock: socket.socket, message: dict):
+    sock.sendall(json.dumps(message).encode('utf-8') + b"\n")
+
+def get_status() -> Optional[dict]:
+    """Return the running server's status, or None if no server answers"""
+    if not is_supported():
+        return None
+    try:
+        with _connect() as sock:
+            with sock.makefile('rwb') as sock_file:
+                sock_file.write(json.dumps({'type': 'status'}).encode('utf-8') + b"\n")
+                sock_file.flush()
+                return json.loads(sock_file.readline())
+    except (OSError, ValueError):
+        return None
+
+def start_server(python_exe: str, tokens: Optional[int] = None):
+    """Launch a detached job server"""
+    command = [python_exe, "-m", "src.jobserver"]
+    if tokens:
+        command.append(f"--tokens={tokens}")
+    subprocess.Popen(
+        command,
+        cwd=str(Path(__file__).resolve().parent.parent),
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True
+    )
+
+def ensure_server(python_exe: str) -> Optional[dict]:
+    """Status of the running server, starting one first if none answers"""
+    status = get_status()
+    if status is not None:
+        return status
+    start_server(python_exe)
+    deadline = time.monotonic() + START_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        status = get_status()
+        if status is not None:
+            return status
+    return None
+
+class JobTokens:
+    """Tokens granted to one build, returned by release() or on process exit"""
+    def __init__(self, sock: socket.socket, tokens: int, total: int, wait: float):
+        self._sock = sock
+        self.tokens = tokens
+        self.total = total
+        self.wait = wait
+
+    def release(self):
+        try:
+            self._sock.close()
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+def acquire(want: int, name: str = '',
+            on_queued: Optional[Callable[[dict], None]] = None,
+            cancel_event: Optional[threading.Event] = None) -> Optional[JobTokens]:
+    """Block until the server grants between 1 and want tokens.
+
+    on_queued gets the server's queue report when the build has to wait.
+    Returns None if cancel_event is set first. Raises OSError when the
+    server cannot be reached or goes away while waiting.
+    """
+    sock = _connect()
+    started = time.monotonic()
+    try:
+        _send(sock, {'type': 'acquire', 'want': max(1, want), 'pid': os.getpid(), 'name': name})
+        sock.settimeout(POLL_INTERVAL)
+        buffer = b''
+        while True:
+            if cancel_event and cancel_event.is_set():
+                sock.close()
+                return None
+            try:
+                data = sock.recv(4096)
+            except socket.timeout:
+                continue
+            if not data:
+                raise OSError("Job server closed the connection")
+            buffer += data
+            while b"\n" in buffer:
+                line, buffer = buffer.split(b"\n", 1)
+                message = json.loads(line)
+                if message.get('type') == 'queued':
+                    if on_queued:
+                        on_queued(message)
+                elif message.get('type') == 'granted':
+                    sock.settimeout(None)
+                    return JobTokens(sock, message['tokens'], message['total'],
+                                     time.monotonic() - started)
+    except (OSError, ValueError, KeyError):
+        sock.close()
+        raise OSError("Lost the connection to the job server")
+
+class TokenPool:
+    """Tokens and the queue of builds waiting for them"""
+    def __init__(self, tokens: int):
+        self.tokens = tokens
+        self.holders = {}
+        self.queue = []
+
+    @property
+    def free(self) -> int:
+        return self.tokens - sum(holder['tokens'] for holder in self.holders.values())
+
+    def request(self, conn: socket.socket, request: dict):
+        self.queue.append({
+            'conn': conn,
+            'want': min(max(1, int(request.get('want', 1))), self.tokens),
+            'pid': request.get('pid'),
+            'name': request.get('name', ''),
+            'since': time.monotonic()
+        })
+
+    def release(self, conn: socket.socket):
+        self.holders.pop(conn, None)
+        self.queue = [waiting for waiting in self.queue if waiting['conn'] is not conn]
+
+    def dispatch(self) -> list:
+        """Grant tokens to waiting builds in order, returns the new holders"""
+        granted = []
+        while self.queue and self.free > 0:
+            waiting = self.queue.pop(0)
+            waiting['tokens'] = min(waiting['want'], self.free)
+            self.holders[waiting['conn']] = waiting
+            granted.append(waiting)
+        return granted
+
+    def status(self) -> dict:
+        now = time.monotonic()
+        return {
+            'type': 'status',
+            'pid': os.getpid(),
+            'tokens': self.tokens,
+            'free': self.free,
+            'holders': [{'pid': holder['pid'], 'name': holder['name'], 'tokens': holder['tokens']}
+                        for holder in self.holders.values()],
+            'queue': [{'pid': waiting['pid'], 'name': waiting['name'], 'want': waiting['want'],
+                       'waiting': round(now - waiting['since'], 1)} for waiting in self.queue]
+        }
+
+def serve(tokens: int):
+    import fcntl
+
+    socket_path = Path(JOBSERVER_SOCKET)
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # Two GUIs may start a server at the same moment, only one may bind
+    lock_file = open(socket_path.with_suffix('.lock'), 'w')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        print("Job server is already running", file=sys.stderr)
+        return
+    if socket_path.exists():
+        socket_path.unlink()
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(str(socket_path))
+    os.chmod(socket_path, 0o600)
+    server.listen(64)
+    print(f"Job server handing out {tokens} tokens on {socket_path}", file=sys.stderr)
+
+    pool = TokenPool(tokens)
+    buffers = {}
+    selector = selectors.DefaultSelector()
+    selector.register(server, selectors.EVENT_READ)
+
+    def drop(conn):
+        selector.unregister(conn)
+        buffers.pop(conn, None)
+        pool.release(conn)
+        conn.close()
+
+    def handle(conn, request):
+        if request.get('type') == 'status':
+            _send(conn, pool.status())
+        elif request.get('type') == 'acquire' and conn not in pool.holders:
+            pool.request(conn, request)
+            if pool.free == 0:
+                _send(conn, {'type': 'queued', 'position': len(pool.queue),
+                             'holders': len(pool.holders), 'tokens': pool.tokens})
+
+    try:
+        while True:
+            for key, _ in selector.select():
+                if key.fileobj is server:
+                    conn, _ = server.accept()
+                    selector.register(conn, selectors.EVENT_READ)
+                    buffers[conn] = b''
+                    continue
+                conn = key.fileobj
+                try:
+                    data = conn.recv(4096)
+                    if not data:
+                        drop(conn)
+                        continue
+                    buffers[conn] += data
+                    while b"\n" in buffers[conn]:
+                        line, buffers[conn] = buffers[conn].split(b"\n", 1)
+                        handle(conn, json.loads(line))
+                except (OSError, ValueError) as e:
+                    print(f"Job server: bad request: {e}", file=sys.stderr)
+                    drop(conn)
+            for holder in pool.dispatch():
+                try:
+                    _send(holder['conn'], {'type': 'granted', 'tokens': holder['tokens'],
+                                           'total': pool.tokens})
+                except OSError:
+                    drop(holder['conn'])
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        try:
+            socket_path.unlink()
+        except OSError:
+            pass
+        lock_file.close()
+
+def format_status(status: dict) -> str:
+    lines = [f"Job server (pid {status['pid']}): {status['tokens'] - status['free']} "
+             f"of {status['tokens']} tokens in use"]
+    for holder in status['holders']:
+        lines.append(f"  running  pid {holder['pid']}  {holder['tokens']} tokens  {holder['name']}")
+    for waiting in status['queue']:
+        lines.append(f"  waiting  pid {waiting['pid']}  wants {waiting['want']}  "
+                     f"for {waiting['waiting']:.1f}s  {waiting['name']}")
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="Share C compile jobs between builds on this machine")
+    parser.add_argument('--tokens', type=int, default=os.cpu_count() or 1,
+                        help="Compile jobs running at once across all builds (default: CPU count)")
+    parser.add_argument('--status', action='store_true',
+                        help="Show the running server's holders and queue, then exit")
+    args = parser.parse_args()
+
+    if not is_supported():
+        print("The job server needs Unix sockets", file=sys.stderr)
+        sys.exit(1)
+    if args.status:
+        status = get_status()
+        if status is None:
+            print("No job server is running", file=sys.stderr)
+            sys.exit(1)
+        print(format_status(status))
+        return
+    serve(max(1, args.tokens))
+
+if __name__ == "__main__":
+    main()
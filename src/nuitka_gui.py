@@ -1,12 +1,26 @@
+import html
+import os
+import threading
+import time
+from pathlib import Path
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                             QLabel, QPushButton, QCheckBox, QLineEdit, QFileDialog,
                             QProgressBar, QTextEdit, QScrollArea, QFrame,
                             QMessageBox, QComboBox)
 from PyQt6.QtCore import Qt, QThread, pyqtSignal
+from PyQt6.QtGui import QKeySequence, QShortcut
 from src.config import (DEFAULT_WINDOW_SIZE, DEFAULT_LANGUAGE, SUPPORTED_LANGUAGES,
-                       load_translations)
+                       BUILD_LOG_DIR, MAX_OUTPUT_LINES, load_translations)
 from src.compiler import NuitkaCompiler
-from src.gui_components import AdvancedOptionsFrame
+from src.worker import RemoteCompiler
+from src.pgo import PGOPipeline
+from src.package_build import PackageCompiler
+from src.gui_components import AdvancedOptionsFrame, LogViewerDialog
+from src.watch import BuildWatcher
+from src import diagnostics
+from src.abort_rules import ABORT_MARKER
+from src.jobserver import WAIT_MARKER, GRANT_MARKER
+from src.build_limits import load_project_limits, save_project_limits
 from src.ui import create_theme_button, get_theme_styles
 
 class CompilerThread(QThread):
@@ -18,15 +32,43 @@ class CompilerThread(QThread):
         super().__init__()
         self.file_path = file_path
         self.options = options
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
 
     def run(self):
         try:
-            success, error = NuitkaCompiler.compile(
-                self.file_path,
-                self.options,
-                lambda x: self.output_signal.emit(x),
-                lambda: self.progress_signal.emit()
-            )
+            # Package mode comes first and always builds locally, then remote
+            # workers, then the PGO pipeline, otherwise a plain local build
+            if self.options.get('package_mode'):
+                compiler = PackageCompiler
+                ignored = [name for name, enabled in (
+                    ("remote workers", self.options.get('remote_workers', '').strip()),
+                    ("PGO", self.options.get('use_pgo')),
+                    ("warm compile server", self.options.get('use_compile_server')),
+                    ("build workspace", self.options.get('use_workspace')),
+                    ("speedup report", self.options.get('speedup_report'))) if enabled]
+                if ignored:
+                    self.output_signal.emit(f"Package mode builds locally, ignoring: {', '.join(ignored)}\n")
+            elif self.options.get('remote_workers', '').strip():
+                compiler = RemoteCompiler
+                if self.options.get('use_pgo'):
+                    # The worker gets use_pgo and pgo_args, the pipeline around them stays here
+                    self.output_signal.emit("Remote build runs with C level PGO, the baseline build "
+                                            "and runtime comparison are skipped\n")
+            elif self.options.get('use_pgo'):
+                compiler = PGOPipeline
+            else:
+                compiler = NuitkaCompiler
+            with diagnostics.profile_thread("compiler"):
+                success, error = compiler.compile(
+                    self.file_path,
+                    self.options,
+                    lambda x: self.output_signal.emit(x),
+                    lambda: self.progress_signal.emit(),
+                    self.cancel_event
+                )
             self.finished_signal.emit(success, error)
         except Exception as e:
             self.finished_signal.emit(False, str(e))
@@ -39,10 +81,16 @@ class NuitkaGUI(QMainWindow):
         self.translatable_widgets = {}
         self.is_compiling = False
         self.is_dark_theme = False
+        self.pending_rebuild = False
+        self.change_time = None
+        self.build_watcher = BuildWatcher(self)
+        self.build_watcher.rebuild_requested.connect(self.on_rebuild_requested)
         self.load_translations()
         self.setup_window()
         self.create_widgets()
         self.apply_theme()
+        if diagnostics.get():
+            QShortcut(QKeySequence("Ctrl+Shift+D"), self, self.dump_diagnostics)
 
     def setup_window(self):
         self.setWindowTitle("Nuitka GUI Compiler")
@@ -160,6 +208,7 @@ class NuitkaGUI(QMainWindow):
         
         self.file_path = QLineEdit()
         self.file_path.setPlaceholderText(self.translate("select_file"))
+        self.file_path.textChanged.connect(self.on_file_path_changed)
         layout.addWidget(self.file_path)
         
         browse_btn = QPushButton("...")
@@ -269,6 +318,12 @@ class NuitkaGUI(QMainWindow):
         self.compile_btn.clicked.connect(self.compile)
         layout.addWidget(self.compile_btn)
         
+        self.watch_cb = QCheckBox(self.translate("watch_mode"))
+        self.watch_cb.setToolTip(self.translate("tooltip_watch_mode"))
+        self.watch_cb.stateChanged.connect(self.toggle_watch_mode)
+        layout.addWidget(self.watch_cb)
+        self.translatable_widgets["watch_mode"] = self.watch_cb
+        
         self.progress = QProgressBar()
         layout.addWidget(self.progress)
         
@@ -291,8 +346,15 @@ class NuitkaGUI(QMainWindow):
             }
         """)
         self.output_text.setMinimumHeight(200)
+        # Full logs are kept on disk, so only the tail stays in memory
+        self.output_text.document().setMaximumBlockCount(MAX_OUTPUT_LINES)
         layout.addWidget(self.output_text)
         
+        self.open_log_btn = QPushButton(self.translate("open_log"))
+        self.open_log_btn.clicked.connect(self.open_build_log)
+        layout.addWidget(self.open_log_btn, alignment=Qt.AlignmentFlag.AlignRight)
+        self.translatable_widgets["open_log"] = self.open_log_btn
+        
         return container
 
     def browse_file(self):
@@ -305,6 +367,27 @@ class NuitkaGUI(QMainWindow):
         if filename:
             self.file_path.setText(filename)
 
+    def on_file_path_changed(self, path):
+        if os.path.isfile(path):
+            self.advanced_frame.set_limit_options(load_project_limits(path))
+
+    def open_build_log(self):
+        filename, _ = QFileDialog.getOpenFileName(
+            self,
+            self.translate("open_log"),
+            str(BUILD_LOG_DIR),
+            "Build logs (*.log.gz);;All files (*.*)"
+        )
+        if filename:
+            LogViewerDialog(self, self.translate, Path(filename)).exec()
+
+    def dump_diagnostics(self):
+        try:
+            path = diagnostics.get().dump()
+            self.update_output(self.translate("diagnostics_dumped").format(path=path))
+        except OSError as e:
+            self.update_output(f"{self.translate('error')}: {e}")
+
     def update_option(self, option, value):
         self.options[option] = value
 
@@ -321,6 +404,14 @@ class NuitkaGUI(QMainWindow):
             )
             return
             
+        save_project_limits(self.file_path.text(), self.options)
+        
+        # Watch mode keeps the build directory so scons only redoes changed C files
+        options = dict(self.options)
+        if self.build_watcher.is_active():
+            options['remove_output'] = False
+        self.change_time = self.build_watcher.take_change_time() or time.monotonic()
+            
         self.is_compiling = True
         self.compile_btn.setEnabled(False)
         self.compile_btn.setText(self.translate("compilation_started"))
@@ -331,15 +422,51 @@ class NuitkaGUI(QMainWindow):
         # Create and start compiler thread
         self.compiler_thread = CompilerThread(
             self.file_path.text(),
-            self.options
+            options
         )
         self.compiler_thread.output_signal.connect(self.update_output)
         self.compiler_thread.finished_signal.connect(self.compilation_finished)
         self.compiler_thread.progress_signal.connect(self.update_progress)
         self.compiler_thread.start()
 
+    def toggle_watch_mode(self, state):
+        if not state:
+            self.build_watcher.stop()
+            return
+        
+        if not self.file_path.text().strip():
+            QMessageBox.warning(
+                self,
+                self.translate("error"),
+                self.translate("no_file_selected"),
+                QMessageBox.StandardButton.Ok
+            )
+            self.watch_cb.setChecked(False)
+            return
+        
+        self.build_watcher.watch(self.file_path.text())
+        if not self.is_compiling:
+            self.compile()
+
+    def on_rebuild_requested(self):
+        if self.is_compiling:
+            # Obsolete build, restart once it has stopped
+            self.pending_rebuild = True
+            self.compiler_thread.cancel()
+            return
+        self.compile()
+
     def update_output(self, text):
-        self.output_text.append(text)
+        # Show on the button that the build is queued for CPU cores, not stuck
+        if text.startswith(WAIT_MARKER):
+            self.compile_btn.setText(self.translate("waiting_for_job_tokens"))
+        elif text.startswith(GRANT_MARKER):
+            self.compile_btn.setText(self.translate("compilation_started"))
+        if ABORT_MARKER in text:
+            # The line that stopped the build is the failure reason, make it stand out
+            self.output_text.append(f'<b style="color: #e05252;">{html.escape(text.strip())}</b>')
+        else:
+            self.output_text.append(text)
         self.output_text.verticalScrollBar().setValue(
             self.output_text.verticalScrollBar().maximum()
         )
@@ -355,6 +482,18 @@ class NuitkaGUI(QMainWindow):
         self.compile_btn.setEnabled(True)
         self.compile_btn.setText(self.translate("compile"))
         
+        # A newer change cancelled this build, start the replacement
+        if self.pending_rebuild:
+            self.pending_rebuild = False
+            self.compile()
+            return
+        
+        if self.build_watcher.is_active():
+            turnaround = time.monotonic() - self.change_time
+            key = "watch_rebuild_finished" if success else "watch_rebuild_failed"
+            self.output_text.append(self.translate(key).format(seconds=turnaround))
+            return
+        
         if success:
             QMessageBox.information(
                 self,
@@ -424,6 +563,8 @@ def main():
     
     try:
         app = QApplication(sys.argv)
+        if '--diagnostics' in sys.argv or os.environ.get('NUITKA_GUI_DIAGNOSTICS'):
+            diagnostics.enable(app)
         window = NuitkaGUI()
         window.show()
         sys.exit(app.exec())
@@ -0,0 +1,99 @@
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Optional
+
+from src.project_settings import load_project_settings, update_project_settings
+from src.speedup import build_command
+
+LAUNCH_RUNS = 3
+LAUNCH_TIMEOUT = 120
+# Spec roots the measurement can point at an empty directory per cold launch
+ISOLATED_SPEC_ROOTS = ('{TEMP}', '{HOME}', '{CACHE_DIR}')
+
+def onefile_arguments(options: dict, file_path: str) -> List[str]:
+    """Nuitka arguments for the onefile compression and extraction settings"""
+    arguments = []
+    if not options.get('onefile_compression', True):
+        arguments.append("--onefile-no-compression")
+    spec = options.get('onefile_tempdir_spec', '').strip()
+    if options.get('onefile_cached'):
+        if not spec:
+            # Nuitka's default cached spec needs company and product names
+            stem = os.path.splitext(os.path.basename(file_path))[0]
+            spec = f"{{CACHE_DIR}}/nuitka-gui/{stem}"
+        # Unpack once and reuse it, the bootstrap compares checksums on launch
+        arguments.append("--onefile-cache-mode=cached")
+    if spec:
+        arguments.append(f"--onefile-tempdir-spec={spec}")
+    return arguments
+
+def settings_label(options: dict) -> str:
+    parts = ["compressed" if options.get('onefile_compression', True) else "uncompressed",
+             "cached extraction" if options.get('onefile_cached') else "temporary extraction"]
+    spec = options.get('onefile_tempdir_spec', '').strip()
+    if spec:
+        parts.append(f"spec {spec}")
+    return ", ".join(parts)
+
+def cold_launches_isolated(options: dict) -> bool:
+    """Whether every cold launch extracts afresh, not with a spec like {PROGRAM_DIR}/x"""
+    spec = options.get('onefile_tempdir_spec', '').strip()
+    return not spec or spec.startswith(ISOLATED_SPEC_ROOTS)
+
+def _isolated_env(root: str) -> dict:
+    """Point {TEMP}, {HOME} and {CACHE_DIR} of the onefile bootstrap at root"""
+    env = dict(os.environ)
+    env.update({'TMPDIR': root, 'TEMP': root, 'TMP': root, 'HOME': root,
+                'XDG_CACHE_HOME': os.path.join(root, 'cache')})
+    return env
+
+def _launch(command: List[str], env: Optional[dict] = None) -> float:
+    start = time.perf_counter()
+    subprocess.run(command, env=env, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                   stderr=subprocess.DEVNULL, timeout=LAUNCH_TIMEOUT, check=True)
+    return time.perf_counter() - start
+
+def measure_launches(executable: str, workload: str = '', runs: int = LAUNCH_RUNS) -> dict:
+    """File size and median cold and warm launch latency of a onefile binary"""
+    command = build_command(workload, [executable])
+    result = {'size_bytes': os.path.getsize(executable)}
+
+    if sys.platform == "win32":
+        # The cache location comes from the shell folders, it cannot be
+        # redirected, so only the first launch counts as cold
+        result['cold_s'] = _launch(command)
+        result['warm_s'] = statistics.median(_launch(command) for _ in range(runs))
+        return result
+
+    cold = []
+    for _ in range(runs):
+        # Every cold launch gets an empty cache and temporary directory
+        with tempfile.TemporaryDirectory(prefix='nuitka-gui-onefile-') as root:
+            cold.append(_launch(command, _isolated_env(root)))
+    with tempfile.TemporaryDirectory(prefix='nuitka-gui-onefile-') as root:
+        env = _isolated_env(root)
+        _launch(command, env)
+        warm = [_launch(command, env) for _ in range(runs)]
+    result['cold_s'] = statistics.median(cold)
+    result['warm_s'] = statistics.median(warm)
+    return result
+
+def record_measurement(file_path: str, options: dict, measurement: dict) -> dict:
+    """Remember the result per settings for this project, returns all of them"""
+    history = load_project_settings(file_path).get('onefile', {})
+    script = os.path.basename(file_path)
+    history.setdefault(script, {})[settings_label(options)] = measurement
+    update_project_settings(file_path, 'onefile', history)
+    return history[script]
+
+def format_measurements(measurements: dict, current: str) -> str:
+    lines = ["Onefile settings (size, cold launch, warm launch):"]
+    for label, result in sorted(measurements.items(), key=lambda item: item[1]['warm_s']):
+        marker = "*" if label == current else " "
+        lines.append(f" {marker} {label}: {result['size_bytes'] / (1024 * 1024):.1f} MB, "
+                     f"{result['cold_s'] * 1000:.0f} ms, {result['warm_s'] * 1000:.0f} ms")
+    return "\n".join(lines)
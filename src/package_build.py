@@ -0,0 +1,345 @@
+"""Package mode: compile modules of a package into separate extension modules.
+
+Every selected module is built with "nuitka --module" in its own process,
+several at once. The result is a copy of the package in which the compiled
+modules replace their .py files, usable as a drop-in replacement. A state
+file in the output directory remembers the source hash of every built
+module, so later runs only rebuild what changed.
+"""
+import fnmatch
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, List, Optional
+
+from src import preflight
+from src.build_limits import creation_flags, limit_setter
+from src.build_logs import BuildLog
+from src.compiler import NuitkaCompiler
+from src.toolchains import toolchain_settings
+
+STATE_FILE = ".nuitka-package.json"
+BUILD_SUBDIR = ".nuitka-package-build"
+EXTENSION_SUFFIXES = ('.so', '.pyd')
+SKIPPED_DIRS = {'__pycache__', '.git', '.hg', '.svn', '.mypy_cache', '.pytest_cache'}
+# Output lines shown when a module fails, the full output is in the build log
+FAILURE_TAIL_LINES = 20
+
+def find_package_root(path: str) -> str:
+    """Top level package directory containing path, a directory or a file in it"""
+    directory = os.path.abspath(path if os.path.isdir(path) else os.path.dirname(path))
+    if not os.path.isfile(os.path.join(directory, '__init__.py')):
+        raise ValueError(f"{directory} is not a package, it has no __init__.py")
+    while os.path.isfile(os.path.join(os.path.dirname(directory), '__init__.py')):
+        directory = os.path.dirname(directory)
+    return directory
+
+def discover_modules(package_root: str) -> Dict[str, str]:
+    """Dotted name to source path of every module in the package"""
+    parent = os.path.dirname(package_root)
+    modules = {}
+    for dirpath, dirnames, filenames in os.walk(package_root):
+        # Directories without __init__.py are not part of the package
+        dirnames[:] = sorted(d for d in dirnames if d not in SKIPPED_DIRS and not d.startswith('.')
+                             and os.path.isfile(os.path.join(dirpath, d, '__init__.py')))
+        for filename in sorted(filenames):
+            if filename.endswith('.py'):
+                relative = os.path.relpath(os.path.join(dirpath, filename[:-3]), parent)
+                modules[relative.replace(os.sep, '.')] = os.path.join(dirpath, filename)
+    return modules
+
+def _is_test_module(name: str) -> bool:
+    parts = name.split('.')
+    return (any(part in ('test', 'tests', 'testing') for part in parts[:-1])
+            or parts[-1].startswith('test_') or parts[-1].endswith('_test')
+            or parts[-1] == 'conftest')
+
+def select_modules(modules: Dict[str, str], text: str) -> List[str]:
+    """Modules named or matched by the comma separated patterns in text.
+
+    Without patterns every module is picked except package __init__ and
+    __main__ files, setup scripts and tests.
+    """
+    patterns = [p.strip() for p in (text or '').split(',') if p.strip()]
+    # Nuitka cannot build a package's __init__ on its own
+    candidates = [name for name in modules if name.split('.')[-1] not in ('__init__', '__main__')]
+    if not patterns:
+        return [name for name in candidates
+                if name.split('.')[-1] != 'setup' and not _is_test_module(name)]
+    selected = []
+    for pattern in patterns:
+        matches = [name for name in candidates if fnmatch.fnmatchcase(name, pattern)]
+        if not matches:
+            raise ValueError(f"No module of the package matches '{pattern}'")
+        selected.extend(name for name in matches if name not in selected)
+    return selected
+
+def source_hash(path: str) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def _load_state(output_root: str) -> dict:
+    try:
+        with open(os.path.join(output_root, STATE_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_state(output_root: str, state: dict):
+    with open(os.path.join(output_root, STATE_FILE), 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=4)
+
+def _module_artifacts(directory: str, stem: str) -> List[str]:
+    """Extension module and stub Nuitka wrote for stem, e.g. fast.cpython-311-x86_64-linux-gnu.so"""
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+    return [os.path.join(directory, name) for name in names
+            if (name.startswith(stem + '.') and name.endswith(EXTENSION_SUFFIXES)) or name == stem + '.pyi']
+
+class PackageCompiler:
+    """Compile the modules of a package in parallel, rebuilding only changed ones"""
+
+    @staticmethod
+    def _command(python_exe: str, options: dict, jobs: int) -> List[str]:
+        command = [python_exe, "-m", "nuitka", "--module", "--remove-output", f"--jobs={jobs}"]
+        if options.get('python_flag'):
+            command.append(f"--python-flag=-{options['python_flag']}")
+        if sys.platform == "win32":
+            compiler_flag = {'mingw64': "--mingw64", 'msvc': "--msvc=latest",
+                             'clang': "--clang"}.get(options.get('c_compiler'))
+            if compiler_flag:
+                command.append(compiler_flag)
+        return command
+
+    @staticmethod
+    def _build_module(command: List[str], source: str, build_dir: str, env: dict, options: dict,
+                      processes: dict) -> tuple:
+        """Run one Nuitka build, returns (return code, output)"""
+        shutil.rmtree(build_dir, ignore_errors=True)
+        os.makedirs(build_dir)
+        process = subprocess.Popen(
+            command + [f"--output-dir={build_dir}", source],
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL,
+            universal_newlines=True, encoding='utf-8', errors='replace', env=env,
+            creationflags=creation_flags(options), preexec_fn=limit_setter(options),
+            start_new_session=sys.platform != "win32")
+        processes[source] = process
+        output = process.communicate()[0]
+        return process.returncode, output
+
+    @staticmethod
+    def _sync_tree(package_root: str, output_root: str, compiled: Dict[str, str],
+                   modules: Dict[str, str], previous_files: List[str]) -> List[str]:
+        """Copy the package into output_root, leaving out the .py files of compiled modules.
+
+        Returns the copied files, relative to output_root. Files copied by an
+        earlier run whose source is gone are removed.
+        """
+        parent = os.path.dirname(package_root)
+        compiled_sources = {modules[name] for name in compiled}
+        copied = []
+        for dirpath, dirnames, filenames in os.walk(package_root):
+            dirnames[:] = [d for d in dirnames if d not in SKIPPED_DIRS]
+            for filename in filenames:
+                source = os.path.join(dirpath, filename)
+                if source in compiled_sources:
+                    continue
+                relative = os.path.relpath(source, parent)
+                target = os.path.join(output_root, relative)
+                copied.append(relative)
+                try:
+                    source_info, target_info = os.stat(source), os.stat(target)
+                    if (source_info.st_size, int(source_info.st_mtime)) == \
+                            (target_info.st_size, int(target_info.st_mtime)):
+                        continue
+                except OSError:
+                    pass
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copy2(source, target)
+
+        for relative in set(previous_files) - set(copied):
+            try:
+                os.unlink(os.path.join(output_root, relative))
+            except OSError:
+                pass
+        return copied
+
+    @staticmethod
+    def compile(
+        file_path: str,
+        options: dict,
+        output_callback: Callable[[str], None],
+        progress_callback: Callable[[], None],
+        cancel_event: Optional[threading.Event] = None
+    ) -> tuple[bool, str]:
+        """Build the package containing file_path, file_path may also be the package directory"""
+        build_log = None
+        job_tokens = None
+        try:
+            if not NuitkaCompiler.verify_dependencies(output_callback):
+                return False, "Missing or outdated dependencies"
+            package_root = find_package_root(file_path)
+            modules = discover_modules(package_root)
+            selected = select_modules(modules, options.get('package_modules', ''))
+            if not selected:
+                return False, f"No modules to compile in {package_root}"
+
+            python_exe = NuitkaCompiler.get_python_path(options)
+            problems, seconds = preflight.run_checks(package_root, options, python_exe)
+            if problems:
+                output_callback(preflight.format_problems(problems) + "\n")
+                return False, f"Pre-flight checks failed: {problems[0]}"
+            output_callback(f"Pre-flight checks passed in {seconds * 1000:.0f} ms\n")
+            if options.get('standalone') or options.get('onefile'):
+                output_callback("Standalone and onefile do not apply to package mode, building extension modules\n")
+
+            package_name = os.path.basename(package_root)
+            output_root = os.path.abspath(options.get('output_dir') or f"{package_root}.compiled")
+            os.makedirs(output_root, exist_ok=True)
+
+            toolchain_args, toolchain_env = [], {}
+            if sys.platform != "win32" and options.get('toolchain'):
+                toolchain_args, toolchain_env = toolchain_settings(options['toolchain'])
+            env = NuitkaCompiler.build_env(toolchain_env)
+
+            # Anything that changes the generated code invalidates every module
+            fingerprint_command = PackageCompiler._command(python_exe, options, 1) + toolchain_args
+            fingerprint = hashlib.sha256(json.dumps(
+                [fingerprint_command, toolchain_env], sort_keys=True).encode('utf-8')).hexdigest()[:16]
+            state = _load_state(output_root)
+            built = state.get('modules', {}) if state.get('fingerprint') == fingerprint else {}
+
+            hashes = {name: source_hash(modules[name]) for name in selected}
+            changed = []
+            for name in selected:
+                module_dir = os.path.join(output_root, *name.split('.')[:-1])
+                if built.get(name) != hashes[name] or not _module_artifacts(module_dir, name.split('.')[-1]):
+                    changed.append(name)
+
+            output_callback(f"Package {package_name}: {len(selected)} modules selected, "
+                            f"{len(changed)} to compile, {len(selected) - len(changed)} unchanged\n")
+
+            build_log = BuildLog(package_root)
+            build_log.update(package=package_root, modules=selected, rebuilt=changed, options=options)
+
+            # One module per core, a single module gets all cores for its C files
+            cpus = os.cpu_count() or 1
+            if changed and options.get('use_jobserver'):
+                job_tokens, cancelled = NuitkaCompiler._acquire_job_tokens(
+                    package_root, options, output_callback, cancel_event)
+                if cancelled:
+                    build_log.update(success=False, error="cancelled")
+                    output_callback("\nCompilation cancelled\n")
+                    return False, "Compilation cancelled"
+                if job_tokens:
+                    cpus = job_tokens.tokens
+                    build_log.update(job_tokens=job_tokens.tokens, job_token_wait=round(job_tokens.wait, 2))
+            workers = max(1, min(len(changed), cpus))
+            command = PackageCompiler._command(python_exe, options, max(1, cpus // workers)) + toolchain_args
+            build_root = os.path.join(output_root, BUILD_SUBDIR)
+            processes = {}
+            failed = {}
+            started = time.monotonic()
+
+            compiled_now = {}
+            # Skip the pool when every module is up to date
+            if changed:
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    futures = {}
+                    for name in changed:
+                        build_dir = os.path.join(build_root, name)
+                        future = pool.submit(PackageCompiler._build_module, command, modules[name],
+                                             build_dir, env, options, processes)
+                        futures[future] = (name, build_dir)
+                    output_callback(f"Compiling with {workers} parallel builds\n")
+
+                    pending = set(futures)
+                    while pending:
+                        done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                        if cancel_event and cancel_event.is_set():
+                            for future in pending:
+                                future.cancel()
+                            for process in list(processes.values()):
+                                if process.poll() is None:
+                                    NuitkaCompiler._terminate(process)
+                            continue
+                        for future in done:
+                            name, build_dir = futures[future]
+                            try:
+                                return_code, output = future.result()
+                            except Exception as e:
+                                # The build never ran, count the module as failed
+                                return_code, output = -1, f"Could not build {name}: {str(e)}\n"
+                            build_log.write(f"\n===== {name} (exit code {return_code}) =====\n{output}")
+                            artifacts = _module_artifacts(build_dir, name.split('.')[-1])
+                            if return_code == 0 and artifacts:
+                                compiled_now[name] = artifacts
+                                output_callback(f"[{len(compiled_now) + len(failed)}/{len(changed)}] "
+                                                f"Compiled {name}\n")
+                            else:
+                                failed[name] = output
+                                tail = "\n".join(output.strip().splitlines()[-FAILURE_TAIL_LINES:])
+                                output_callback(f"[{len(compiled_now) + len(failed)}/{len(changed)}] "
+                                                f"Failed {name}:\n{tail}\n")
+                            progress_callback()
+
+            if cancel_event and cancel_event.is_set():
+                build_log.update(success=False, error="cancelled")
+                output_callback("\nCompilation cancelled\n")
+                return False, "Compilation cancelled"
+
+            # Move fresh extensions into the tree, replacing older builds of the module
+            for name, artifacts in compiled_now.items():
+                module_dir = os.path.join(output_root, *name.split('.')[:-1])
+                os.makedirs(module_dir, exist_ok=True)
+                for old in _module_artifacts(module_dir, name.split('.')[-1]):
+                    os.unlink(old)
+                for artifact in artifacts:
+                    shutil.move(artifact, os.path.join(module_dir, os.path.basename(artifact)))
+                built[name] = hashes[name]
+            shutil.rmtree(build_root, ignore_errors=True)
+
+            # Modules no longer selected go back to their source
+            for name in list(built):
+                if name not in selected or name in failed:
+                    module_dir = os.path.join(output_root, *name.split('.')[:-1])
+                    for old in _module_artifacts(module_dir, name.split('.')[-1]):
+                        os.unlink(old)
+                    del built[name]
+            compiled = {name: modules[name] for name in built if name in modules}
+            files = PackageCompiler._sync_tree(package_root, output_root, compiled, modules,
+                                               state.get('files', []))
+            _save_state(output_root, {'fingerprint': fingerprint, 'modules': built, 'files': files})
+
+            elapsed = time.monotonic() - started
+            summary = (f"Compiled {len(compiled_now)} of {len(changed)} changed modules in {elapsed:.1f}s, "
+                       f"{len(selected) - len(changed)} unchanged, {len(failed)} failed")
+            output_callback(f"\n{summary}\nDrop-in package: {os.path.join(output_root, package_name)}\n")
+            build_log.update(success=not failed, compiled=list(compiled_now), failed=list(failed),
+                             duration=elapsed)
+            if failed:
+                return False, f"Compilation failed for {', '.join(failed)}"
+            output_callback("\nCompilation completed successfully!\n")
+            return True, ""
+        except Exception as e:
+            error_msg = f"Compilation error: {str(e)}"
+            output_callback("\n" + error_msg + "\n")
+            if build_log:
+                build_log.update(success=False, error=error_msg)
+            return False, error_msg
+        finally:
+            if job_tokens:
+                job_tokens.release()
+            if build_log:
+                try:
+                    build_log.close()
+                except OSError as e:
+                    print(f"Error closing build log: {str(e)}", file=sys.stderr)
@@ -0,0 +1,90 @@
+import os
+import shlex
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from typing import Callable, List, Optional
+
+from src.compiler import NuitkaCompiler
+
+# Timed runs of each binary for the before-and-after comparison
+COMPARISON_RUNS = 5
+BASELINE_SUBDIR = "pgo-baseline"
+
+def time_runs(command: List[str], runs: int, cancel_event: Optional[threading.Event] = None) -> List[float]:
+    """Wall time of each run of command, stops early when cancelled"""
+    timings = []
+    for _ in range(runs):
+        if cancel_event and cancel_event.is_set():
+            break
+        start = time.perf_counter()
+        subprocess.run(command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL, check=True)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+class PGOPipeline:
+    """Baseline build, PGO build with a training run, and a runtime comparison as one job"""
+
+    @staticmethod
+    def compile(
+        file_path: str,
+        options: dict,
+        output_callback: Callable[[str], None],
+        progress_callback: Callable[[], None],
+        cancel_event: Optional[threading.Event] = None
+    ) -> tuple[bool, str]:
+        output_dir = options.get('output_dir') or os.path.dirname(os.path.abspath(file_path))
+        baseline_dir = os.path.join(output_dir, BASELINE_SUBDIR)
+        training_args = options.get('pgo_args', '')
+
+        if options.get('standalone') or options.get('onefile'):
+            output_callback("Warning: Nuitka's C level PGO is experimental in standalone and onefile modes\n")
+
+        # 1. Reference build without PGO
+        output_callback(f"\n[PGO 1/3] Building baseline in {baseline_dir}\n")
+        baseline_options = dict(options, use_pgo=False, speedup_report=False, output_dir=baseline_dir)
+        success, error = NuitkaCompiler.compile(file_path, baseline_options, output_callback,
+                                                progress_callback, cancel_event)
+        if not success:
+            return False, f"PGO baseline build failed: {error}"
+
+        # 2. Nuitka builds an instrumented binary, runs the training
+        #    workload with it and rebuilds using the collected profile
+        output_callback(f"\n[PGO 2/3] Instrumented build, training run ({training_args or 'no arguments'}) "
+                        "and optimized rebuild\n")
+        pgo_options = dict(options, use_pgo=True, output_dir=output_dir)
+        success, error = NuitkaCompiler.compile(file_path, pgo_options, output_callback,
+                                                progress_callback, cancel_event)
+        if not success:
+            return False, f"PGO build failed: {error}"
+
+        # 3. Before-and-after comparison with the training workload
+        baseline_exe = NuitkaCompiler.find_executable(baseline_dir, file_path, options)
+        optimized_exe = NuitkaCompiler.find_executable(output_dir, file_path, options)
+        if not baseline_exe or not optimized_exe:
+            output_callback("\nCould not locate both binaries, skipping the runtime comparison\n")
+            return True, ""
+
+        output_callback(f"\n[PGO 3/3] Comparing runtimes over {COMPARISON_RUNS} runs each\n")
+        arguments = shlex.split(training_args, posix=sys.platform != "win32")
+        baseline_times, optimized_times = [], []
+        try:
+            # Alternate the binaries so drift in machine load hits both alike
+            for _ in range(COMPARISON_RUNS):
+                baseline_times += time_runs([baseline_exe] + arguments, 1, cancel_event)
+                optimized_times += time_runs([optimized_exe] + arguments, 1, cancel_event)
+        except (OSError, subprocess.CalledProcessError) as e:
+            output_callback(f"\nRuntime comparison failed: {e}\n")
+            return True, ""
+        if cancel_event and cancel_event.is_set():
+            return False, "Compilation cancelled"
+
+        before = statistics.median(baseline_times)
+        after = statistics.median(optimized_times)
+        output_callback(f"\nPGO runtime (median): baseline {before:.3f}s, optimized {after:.3f}s "
+                        f"({before / after:.2f}x)\n"
+                        f"Baseline binary: {baseline_exe}\nOptimized binary: {optimized_exe}\n")
+        return True, ""
@@ -0,0 +1,158 @@
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+from src import abort_rules
+from src.build_limits import limit_problems
+from src.config import WORKSPACE_DIR
+from src.toolchains import toolchain_settings
+
+# A standalone build of a small program already needs several hundred MB
+MIN_FREE_DISK_MB = 1024
+IMPORT_CHECK_TIMEOUT = 30
+
+# Runs in the target interpreter. find_spec locates a module like Nuitka
+# does, without running it; only the parents of dotted names get imported.
+_FIND_MODULES = """
+import importlib.util, json, sys
+missing = {}
+for name in sys.argv[1:]:
+    try:
+        if importlib.util.find_spec(name) is None:
+            missing[name] = "not found"
+    except (ImportError, ValueError) as e:
+        missing[name] = str(e) or type(e).__name__
+    except Exception as e:
+        missing[name] = f"{type(e).__name__}: {e}"
+print(json.dumps(missing))
+"""
+
+def _existing_parent(path: str) -> str:
+    """path itself or its closest ancestor that exists"""
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+def _output_dir(file_path: str, options: dict) -> str:
+    if options.get('use_workspace'):
+        return str(WORKSPACE_DIR)
+    return options.get('output_dir') or os.path.dirname(os.path.abspath(file_path))
+
+def check_icon(file_path: str, options: dict, python_exe: str) -> List[str]:
+    icon = options.get('windows_icon_path')
+    if not icon:
+        return []
+    if not os.path.isfile(icon):
+        return [f"Icon file not found: {icon}"]
+    if not os.access(icon, os.R_OK):
+        return [f"Icon file is not readable: {icon}"]
+    return []
+
+def check_output_dir(file_path: str, options: dict, python_exe: str) -> List[str]:
+    output_dir = _output_dir(file_path, options)
+    existing = _existing_parent(output_dir)
+    if not os.path.isdir(existing):
+        return [f"Output directory {output_dir} is blocked by the file {existing}"]
+    if not os.access(existing, os.W_OK | os.X_OK):
+        return [f"Output directory is not writable: {existing}"]
+    return []
+
+def check_disk_space(file_path: str, options: dict, python_exe: str) -> List[str]:
+    output_dir = _output_dir(file_path, options)
+    try:
+        free = shutil.disk_usage(_existing_parent(output_dir)).free
+    except OSError as e:
+        return [f"Cannot determine free disk space for {output_dir}: {str(e)}"]
+    if free < MIN_FREE_DISK_MB * 1024 * 1024:
+        return [f"Only {free / (1024 * 1024):.0f} MB free for {output_dir}, "
+                f"at least {MIN_FREE_DISK_MB} MB are needed"]
+    return []
+
+def check_c_compiler(file_path: str, options: dict, python_exe: str) -> List[str]:
+    if sys.platform == "win32":
+        if options.get('c_compiler') != 'msvc':
+            # Nuitka downloads MinGW64 itself when no compiler is installed
+            return []
+        vswhere = os.path.join(os.environ.get('ProgramFiles(x86)', r"C:\Program Files (x86)"),
+                               "Microsoft Visual Studio", "Installer", "vswhere.exe")
+        return [] if os.path.isfile(vswhere) else ["MSVC was selected but Visual Studio is not installed"]
+
+    if options.get('toolchain'):
+        _, env = toolchain_settings(options['toolchain'])
+        compiler = env.get('CC')
+        if not compiler:
+            return [f"Selected toolchain is no longer available: {options['toolchain']}"]
+        return [] if os.access(compiler, os.X_OK) else [f"C compiler is not executable: {compiler}"]
+
+    candidates = [os.environ['CC']] if os.environ.get('CC') else ['cc', 'gcc', 'clang']
+    if any(shutil.which(candidate) for candidate in candidates):
+        return []
+    return [f"No C compiler found, looked for {', '.join(candidates)}"]
+
+def _listed(text: str) -> List[str]:
+    return [entry.strip() for entry in (text or '').split(',') if entry.strip()]
+
+def check_imports(file_path: str, options: dict, python_exe: str) -> List[str]:
+    """Nuitka itself and every included package and module in the target interpreter"""
+    names = ['nuitka'] + _listed(options.get('include_package')) + _listed(options.get('include_module'))
+    try:
+        # The script's directory is on sys.path at build time, like when it runs
+        result = subprocess.run([python_exe, "-c", _FIND_MODULES] + names, capture_output=True,
+                                text=True, timeout=IMPORT_CHECK_TIMEOUT, stdin=subprocess.DEVNULL,
+                                cwd=os.path.dirname(os.path.abspath(file_path)))
+        missing = json.loads(result.stdout)
+    except (OSError, subprocess.SubprocessError, ValueError) as e:
+        return [f"Cannot run {python_exe} to check imports: {str(e)}"]
+
+    problems = []
+    for name, reason in missing.items():
+        if name == 'nuitka':
+            problems.append(f"Nuitka is not installed in {python_exe}")
+        else:
+            kind = "Package" if name in _listed(options.get('include_package')) else "Module"
+            problems.append(f"{kind} '{name}' cannot be imported by {python_exe}: {reason}")
+    return problems
+
+def check_data_dirs(file_path: str, options: dict, python_exe: str) -> List[str]:
+    return [f"Data directory not found: {entry['source']}"
+            for entry in options.get('data_dirs') or [] if not os.path.isdir(entry['source'])]
+
+def check_abort_rules(file_path: str, options: dict, python_exe: str) -> List[str]:
+    try:
+        abort_rules.load_rules(options)
+    except ValueError as e:
+        return [str(e)]
+    except re.error as e:
+        return [f"Invalid early abort pattern: {str(e)}"]
+    return []
+
+def check_build_limits(file_path: str, options: dict, python_exe: str) -> List[str]:
+    return limit_problems(options)
+
+CHECKS = [check_icon, check_output_dir, check_disk_space, check_c_compiler, check_imports,
+          check_data_dirs, check_abort_rules, check_build_limits]
+
+def run_checks(file_path: str, options: dict, python_exe: str,
+               checks: Optional[List[Callable]] = None) -> Tuple[List[str], float]:
+    """Run all checks at once, returns the problems found and the time taken"""
+    checks = checks or CHECKS
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(checks)) as pool:
+        results = list(pool.map(lambda check: check(file_path, options, python_exe), checks))
+    problems = [problem for result in results for problem in result]
+    return problems, time.perf_counter() - started
+
+def format_problems(problems: List[str]) -> str:
+    lines = ["Pre-flight checks failed, the build was not started:"]
+    lines.extend(f"  - {problem}" for problem in problems)
+    return "\n".join(lines)
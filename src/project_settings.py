@@ -0,0 +1,29 @@
+import json
+import os
+
+from src.config import PROJECT_SETTINGS_FILE
+
+def _project_key(file_path: str) -> str:
+    return os.path.dirname(os.path.abspath(file_path))
+
+def _load_all() -> dict:
+    try:
+        with open(PROJECT_SETTINGS_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def load_project_settings(file_path: str) -> dict:
+    """Settings stored for the project directory containing file_path"""
+    return _load_all().get(_project_key(file_path), {})
+
+def update_project_settings(file_path: str, key: str, value):
+    """Store one settings section of the project containing file_path"""
+    settings = _load_all()
+    settings.setdefault(_project_key(file_path), {})[key] = value
+    try:
+        PROJECT_SETTINGS_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with open(PROJECT_SETTINGS_FILE, 'w', encoding='utf-8') as f:
+            json.dump(settings, f, indent=4)
+    except OSError as e:
+        print(f"Error saving project settings: {e}")
@@ -0,0 +1,216 @@
+"""Record raw Nuitka output streams and replay them in place of the real build.
+
+    python -m src.replay record script.py -o build.jsonl.gz [--standalone ...]
+    python -m src.replay replay build.jsonl.gz --speed 10
+    python -m src.replay replay build.jsonl.gz --speed 0 --gui
+
+A recording is gzipped JSON lines. The first line is a header with the
+command. Every other line holds one output line with its offset in seconds
+and its stream. The last line holds the exit code. A speed of 0 replays as
+fast as the reader consumes the lines.
+"""
+import argparse
+import gzip
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import List, Optional
+
+FORMAT_VERSION = 1
+STREAMS = ('stdout', 'stderr')
+
+class StreamRecorder:
+    """Write output lines of both streams with their arrival time"""
+    def __init__(self, path: str, command: Optional[List[str]] = None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.file = gzip.open(path, 'wt', encoding='utf-8')
+        self._write({'version': FORMAT_VERSION, 'command': command or [],
+                     'recorded': time.strftime("%Y-%m-%dT%H:%M:%S")})
+
+    def _write(self, record: dict):
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def record(self, stream: str, line: str):
+        with self.lock:
+            if self.file:
+                self._write({'t': round(time.monotonic() - self.started, 6), 's': stream, 'l': line})
+
+    def close(self, return_code: Optional[int] = None):
+        with self.lock:
+            if self.file:
+                self._write({'t': round(time.monotonic() - self.started, 6), 'exit': return_code})
+                self.file.close()
+                self.file = None
+
+def load_recording(path: str):
+    """Return the header, the (offset, stream, line) entries and the exit code"""
+    entries = []
+    return_code = 0
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        header = json.loads(f.readline())
+        if header.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported recording version: {header.get('version')}")
+        for line in f:
+            record = json.loads(line)
+            if 'exit' in record:
+                return_code = record['exit']
+            else:
+                entries.append((record['t'], record['s'], record['l']))
+    return header, entries, return_code
+
+class ReplayProcess:
+    """Stands in for the subprocess.Popen of a build and plays back a recording.
+
+    Lines go through real pipes, so reader threads block and wake up the same
+    way they do for a live build.
+    """
+    def __init__(self, path: str, speed: float = 1.0):
+        self.header, self.entries, self.recorded_code = load_recording(path)
+        self.speed = speed
+        self.pid = None
+        self.returncode = None
+        self.stopped = threading.Event()
+
+        pipes = {}
+        for name in STREAMS:
+            read_fd, write_fd = os.pipe()
+            pipes[name] = io.open(write_fd, 'w', encoding='utf-8', errors='replace')
+            setattr(self, name, io.open(read_fd, 'r', encoding='utf-8', errors='replace'))
+        self.pipes = pipes
+        self.feeder = threading.Thread(target=self._feed, daemon=True)
+        self.feeder.start()
+
+    def _feed(self):
+        started = time.monotonic()
+        return_code = self.recorded_code
+        try:
+            for offset, stream, line in self.entries:
+                if self.speed > 0:
+                    delay = started + offset / self.speed - time.monotonic()
+                    if delay > 0 and self.stopped.wait(delay):
+                        break
+                if self.stopped.is_set():
+                    break
+                pipe = self.pipes[stream]
+                pipe.write(line)
+                # A live build flushes line by line too
+                pipe.flush()
+        except (OSError, ValueError):
+            pass
+        finally:
+            if self.stopped.is_set():
+                return_code = -15
+            for pipe in self.pipes.values():
+                try:
+                    pipe.close()
+                except OSError:
+                    pass
+            self.returncode = return_code
+
+    def poll(self) -> Optional[int]:
+        return self.returncode
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[int]:
+        self.feeder.join(timeout)
+        return self.returncode
+
+    def terminate(self):
+        self.stopped.set()
+
+    def kill(self):
+        self.stopped.set()
+
+def _replay_headless(options: dict):
+    from src.compiler import NuitkaCompiler
+
+    counts = {'lines': 0, 'progress': 0}
+
+    def on_output(text):
+        counts['lines'] += 1
+
+    def on_progress():
+        counts['progress'] += 1
+
+    with tempfile.TemporaryDirectory() as tmp:
+        script = os.path.join(tmp, 'replay.py')
+        open(script, 'w').close()
+        start = time.perf_counter()
+        success, error = NuitkaCompiler.compile(script, dict(options, output_dir=tmp),
+                                                on_output, on_progress)
+        elapsed = time.perf_counter() - start
+    print(f"Replayed {counts['lines']} output callbacks and {counts['progress']} progress steps "
+          f"in {elapsed:.2f}s ({counts['lines'] / elapsed:.0f} lines/s), "
+          f"success={success} {error}")
+
+def _replay_gui(options: dict):
+    from PyQt6.QtWidgets import QApplication
+    from src import diagnostics
+    from src.nuitka_gui import NuitkaGUI
+
+    app = QApplication(sys.argv)
+    if '--diagnostics' in sys.argv or os.environ.get('NUITKA_GUI_DIAGNOSTICS'):
+        diagnostics.enable(app)
+    window = NuitkaGUI()
+    window.options.update(options)
+    with tempfile.TemporaryDirectory() as tmp:
+        script = os.path.join(tmp, 'replay.py')
+        open(script, 'w').close()
+        window.options['output_dir'] = tmp
+        window.file_path.setText(script)
+        window.show()
+        start = time.perf_counter()
+        window.compile()
+        window.compiler_thread.finished.connect(
+            lambda: print(f"Replay finished in {time.perf_counter() - start:.2f}s"))
+        app.exec()
+
+def main():
+    parser = argparse.ArgumentParser(description="Record and replay Nuitka output streams")
+    commands = parser.add_subparsers(dest='action', required=True)
+
+    record = commands.add_parser('record', help="Run a real build and record its output")
+    record.add_argument('script')
+    record.add_argument('-o', '--output', required=True, help="Recording file (.jsonl.gz)")
+    record.add_argument('--output-dir', help="Output directory of the build")
+    record.add_argument('--standalone', action='store_true')
+    record.add_argument('--onefile', action='store_true')
+    record.add_argument('--show-progress', action='store_true')
+
+    replay = commands.add_parser('replay', help="Feed a recording through the compile pipeline")
+    replay.add_argument('recording')
+    replay.add_argument('--speed', type=float, default=1.0,
+                        help="Playback speed factor, 0 for as fast as possible")
+    replay.add_argument('--gui', action='store_true', help="Replay into the GUI window")
+    replay.add_argument('--diagnostics', action='store_true',
+                        help="Enable diagnostics mode in the GUI (Ctrl+Shift+D dumps)")
+    args = parser.parse_args()
+
+    if args.action == 'record':
+        from src.compiler import NuitkaCompiler
+        options = {
+            'output_dir': args.output_dir or os.path.dirname(os.path.abspath(args.script)),
+            'standalone': args.standalone,
+            'onefile': args.onefile,
+            'show_progress': args.show_progress,
+            'record_output': args.output
+        }
+        success, error = NuitkaCompiler.compile(args.script, options,
+                                                lambda text: print(text, end=''), lambda: None)
+        print(f"\nRecording written to {args.output}")
+        sys.exit(0 if success else 1)
+
+    options = {'replay_file': os.path.abspath(args.recording), 'replay_speed': args.speed}
+    if args.gui:
+        _replay_gui(options)
+    else:
+        _replay_headless(options)
+
+if __name__ == "__main__":
+    main()
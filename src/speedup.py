@@ -0,0 +1,153 @@
+import math
+import os
+import shlex
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from typing import List, Optional
+
+DEFAULT_RUNS = 10
+PROGRAM_PLACEHOLDER = "{program}"
+
+# Two-sided 95% Student t quantiles by degrees of freedom
+_T_95 = {1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365,
+         8: 2.306, 9: 2.262, 10: 2.228, 15: 2.131, 20: 2.086, 30: 2.042}
+
+def t_value(degrees: int) -> float:
+    if degrees > max(_T_95):
+        return 1.96
+    # The next smaller tabulated value is the conservative choice
+    return _T_95[max(k for k in _T_95 if k <= degrees)]
+
+def build_command(template: str, program: List[str]) -> List[str]:
+    """Insert the program at {program} in the workload command, or prepend it"""
+    arguments = shlex.split(template, posix=sys.platform != "win32") if template else []
+    if PROGRAM_PLACEHOLDER not in arguments:
+        return program + arguments
+    command = []
+    for argument in arguments:
+        command.extend(program if argument == PROGRAM_PLACEHOLDER else [argument])
+    return command
+
+class _PeakMemorySampler(threading.Thread):
+    """Track VmHWM of a running process from /proc.
+
+    On Linux the ru_maxrss of a child includes the peak memory of the
+    process that spawned it, which would add the whole GUI to every
+    measurement. VmHWM starts fresh with the exec'd program.
+    """
+    INTERVAL = 0.005
+
+    def __init__(self, pid: int):
+        super().__init__(daemon=True)
+        self.path = f"/proc/{pid}/status"
+        self.peak_kb = 0
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                with open(self.path, 'r') as f:
+                    for line in f:
+                        if line.startswith('VmHWM:'):
+                            self.peak_kb = max(self.peak_kb, int(line.split()[1]))
+                            break
+            except (OSError, ValueError):
+                pass
+            self.stopped.wait(self.INTERVAL)
+
+def measure_once(command: List[str], cwd: Optional[str] = None) -> dict:
+    """Wall time, CPU time and peak memory of one run, CPU and memory need wait4"""
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=cwd, stdin=subprocess.DEVNULL,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    sampler = None
+    if sys.platform.startswith('linux'):
+        sampler = _PeakMemorySampler(process.pid)
+        sampler.start()
+    if hasattr(os, 'wait4'):
+        if sampler:
+            # Wait without reaping, so the pid cannot be reused while sampling
+            os.waitid(os.P_PID, process.pid, os.WEXITED | os.WNOWAIT)
+            sampler.stopped.set()
+            sampler.join()
+        _, status, usage = os.wait4(process.pid, 0)
+        wall = time.perf_counter() - start
+        return_code = os.waitstatus_to_exitcode(status)
+        if sampler and sampler.peak_kb:
+            max_rss_mb = sampler.peak_kb / 1024
+        else:
+            # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+            max_rss_mb = usage.ru_maxrss * (1 if sys.platform == "darwin" else 1024) / (1024 * 1024)
+        sample = {'wall_s': wall, 'cpu_s': usage.ru_utime + usage.ru_stime, 'max_rss_mb': max_rss_mb}
+    else:
+        return_code = process.wait()
+        sample = {'wall_s': time.perf_counter() - start}
+    # Popen must not try to reap it again
+    process.returncode = return_code
+    if return_code != 0:
+        raise RuntimeError(f"{' '.join(command)} exited with code {return_code}")
+    return sample
+
+def summarize(values: List[float]) -> dict:
+    """Mean with a 95% confidence interval"""
+    mean = statistics.fmean(values)
+    half_width = 0.0
+    if len(values) > 1:
+        half_width = t_value(len(values) - 1) * statistics.stdev(values) / math.sqrt(len(values))
+    return {'mean': mean, 'ci95': [mean - half_width, mean + half_width],
+            'min': min(values), 'max': max(values), 'runs': len(values)}
+
+def compare_programs(compiled: List[str], interpreted: List[str], template: str,
+                     runs: int = DEFAULT_RUNS, cwd: Optional[str] = None,
+                     cancel_event: Optional[threading.Event] = None) -> Optional[dict]:
+    """Run the workload against both programs and summarize every metric"""
+    commands = {'compiled': build_command(template, compiled),
+                'interpreted': build_command(template, interpreted)}
+    samples = {name: [] for name in commands}
+
+    # One untimed run each, so both start with warm file caches
+    for command in commands.values():
+        measure_once(command, cwd)
+    # Alternate the programs so drift in machine load hits both alike
+    for _ in range(runs):
+        for name, command in commands.items():
+            if cancel_event and cancel_event.is_set():
+                return None
+            samples[name].append(measure_once(command, cwd))
+
+    report = {'runs': runs, 'commands': commands}
+    for name, program_samples in samples.items():
+        report[name] = {metric: summarize([s[metric] for s in program_samples])
+                        for metric in program_samples[0]}
+
+    compiled_wall = report['compiled']['wall_s']
+    interpreted_wall = report['interpreted']['wall_s']
+    # Conservative range from the interval ends
+    report['speedup'] = {
+        'mean': interpreted_wall['mean'] / compiled_wall['mean'],
+        'range': [interpreted_wall['ci95'][0] / compiled_wall['ci95'][1] if compiled_wall['ci95'][1] else 0.0,
+                  interpreted_wall['ci95'][1] / compiled_wall['ci95'][0] if compiled_wall['ci95'][0] > 0 else math.inf]
+    }
+    return report
+
+def format_report(report: dict) -> str:
+    units = {'wall_s': ("Wall time", "s", 3), 'cpu_s': ("CPU time", "s", 3),
+             'max_rss_mb': ("Max RSS", " MB", 1)}
+    lines = [f"Runtime comparison over {report['runs']} runs (mean, 95% confidence interval):"]
+    for metric, (label, unit, digits) in units.items():
+        if metric not in report['compiled']:
+            continue
+        parts = []
+        for name in ('compiled', 'interpreted'):
+            summary = report[name][metric]
+            low, high = summary['ci95']
+            parts.append(f"{name} {summary['mean']:.{digits}f}{unit} "
+                         f"[{low:.{digits}f}, {high:.{digits}f}]")
+        lines.append(f"  {label}: " + ", ".join(parts))
+    speedup = report['speedup']
+    lines.append(f"  Speedup: {speedup['mean']:.2f}x "
+                 f"(between {speedup['range'][0]:.2f}x and {speedup['range'][1]:.2f}x)")
+    return "\n".join(lines)
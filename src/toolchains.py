@@ -0,0 +1,202 @@
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from src.config import TOOLCHAIN_CACHE_FILE
+
+PROBE_TIMEOUT = 30
+MAX_PROBE_WORKERS = 8
+
+# Fastest first, "bfd" is the default GNU ld
+LINKERS = ['mold', 'lld', 'gold', 'bfd']
+LINKER_BINARIES = {'mold': ['mold', 'ld.mold'], 'lld': ['ld.lld', 'lld'],
+                   'gold': ['ld.gold'], 'bfd': ['ld.bfd', 'ld']}
+
+_COMPILER_NAME = re.compile(r"^(gcc|clang)(-\d+(\.\d+)?)?$")
+_VERSION = re.compile(r"(\d+\.\d+(\.\d+)?)")
+
+TEST_PROGRAM = "int main(void) { return 0; }\n"
+
+def find_compilers() -> List[str]:
+    """gcc and clang executables on PATH, including versioned names like gcc-12"""
+    found = {}
+    for directory in os.environ.get('PATH', '').split(os.pathsep):
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            continue
+        for name in names:
+            if _COMPILER_NAME.match(name):
+                path = os.path.join(directory, name)
+                if os.path.isfile(path) and os.access(path, os.X_OK):
+                    # gcc is often a symlink to gcc-12, keep one entry
+                    found.setdefault(os.path.realpath(path), path)
+    return sorted(found.values())
+
+def find_linkers() -> dict:
+    linkers = {}
+    for linker in LINKERS:
+        for binary in LINKER_BINARIES[linker]:
+            path = shutil.which(binary)
+            if path:
+                linkers[linker] = path
+                break
+    return linkers
+
+def _version(executable: str) -> Optional[str]:
+    try:
+        result = subprocess.run([executable, '--version'], capture_output=True, text=True,
+                                timeout=PROBE_TIMEOUT, stdin=subprocess.DEVNULL)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    first_line = (result.stdout or result.stderr).strip().splitlines()[:1]
+    match = _VERSION.search(first_line[0]) if first_line else None
+    return match.group(1) if match else None
+
+def _links(compiler: str, flags: List[str]) -> bool:
+    """Whether compiler can build and link a trivial program with flags"""
+    with tempfile.TemporaryDirectory(prefix='nuitka-gui-probe-') as tmp:
+        source = os.path.join(tmp, 'probe.c')
+        with open(source, 'w') as f:
+            f.write(TEST_PROGRAM)
+        try:
+            result = subprocess.run([compiler, source, '-o', os.path.join(tmp, 'probe')] + flags,
+                                    capture_output=True, timeout=PROBE_TIMEOUT,
+                                    stdin=subprocess.DEVNULL)
+        except (OSError, subprocess.SubprocessError):
+            return False
+        return result.returncode == 0
+
+def _probe_combination(compiler: dict, linker: str) -> Optional[dict]:
+    flags = [] if linker == 'bfd' else [f"-fuse-ld={linker}"]
+    if not _links(compiler['path'], flags):
+        return None
+    return dict(compiler, linker=linker, lto=_links(compiler['path'], flags + ['-flto']))
+
+def _fingerprint(compilers: List[str], linkers: dict, ccache: Optional[str]) -> dict:
+    """Paths and modification times, a changed install invalidates the cache"""
+    stamps = {}
+    for path in compilers + list(linkers.values()) + ([ccache] if ccache else []):
+        try:
+            stamps[path] = os.stat(path).st_mtime
+        except OSError:
+            pass
+    return stamps
+
+def probe_toolchains() -> dict:
+    """Find compilers, linkers, ccache and which combinations work, with LTO support"""
+    compiler_paths = find_compilers()
+    linkers = find_linkers()
+    ccache = shutil.which('ccache')
+
+    compilers = []
+    for path in compiler_paths:
+        name = os.path.basename(path)
+        compilers.append({'name': name, 'path': path, 'family': name.split('-')[0],
+                          'version': _version(path)})
+
+    pairs = [(compiler, linker) for compiler in compilers for linker in linkers]
+    combinations = []
+    if pairs:
+        with ThreadPoolExecutor(max_workers=min(MAX_PROBE_WORKERS, len(pairs))) as pool:
+            for result in pool.map(lambda pair: _probe_combination(*pair), pairs):
+                if result:
+                    # Nuitka puts ccache in front of any compiler it finds
+                    result['ccache'] = ccache is not None
+                    combinations.append(result)
+
+    return {
+        'machine': platform.node(),
+        'fingerprint': _fingerprint(compiler_paths, linkers, ccache),
+        'linkers': linkers,
+        'ccache': {'path': ccache, 'version': _version(ccache)} if ccache else None,
+        'combinations': sort_by_speed(combinations)
+    }
+
+def sort_by_speed(combinations: List[dict]) -> List[dict]:
+    """Fastest linker first, then clang, which usually compiles faster than gcc, then newer versions"""
+    def version_key(combination):
+        return tuple(int(p) for p in re.findall(r"\d+", combination.get('version') or ''))
+
+    ordered = sorted(combinations, key=version_key, reverse=True)
+    return sorted(ordered, key=lambda c: (LINKERS.index(c['linker']), c['family'] != 'clang'))
+
+def _load_cache() -> dict:
+    try:
+        with open(TOOLCHAIN_CACHE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_cache(cache: dict):
+    try:
+        TOOLCHAIN_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with open(TOOLCHAIN_CACHE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, indent=4)
+    except OSError as e:
+        print(f"Error saving toolchain cache: {e}")
+
+def cached_toolchains() -> Optional[dict]:
+    """Probe results of this machine without probing, None if never probed"""
+    # Keyed by host name, home directories may be shared between machines
+    return _load_cache().get(platform.node())
+
+def discover_toolchains(force: bool = False) -> dict:
+    """Probe unless the cached result for this machine is still current"""
+    cache = _load_cache()
+    cached = cache.get(platform.node())
+    if cached and not force:
+        linkers = find_linkers()
+        ccache = shutil.which('ccache')
+        if cached.get('fingerprint') == _fingerprint(find_compilers(), linkers, ccache):
+            return cached
+    result = probe_toolchains()
+    cache[platform.node()] = result
+    _save_cache(cache)
+    return result
+
+def toolchain_key(combination: dict) -> str:
+    return f"{combination['path']}|{combination['linker']}"
+
+def find_toolchain(key: str, toolchains: Optional[dict] = None) -> Optional[dict]:
+    toolchains = toolchains if toolchains is not None else cached_toolchains()
+    for combination in (toolchains or {}).get('combinations', []):
+        if toolchain_key(combination) == key:
+            return combination
+    return None
+
+def describe(combination: dict) -> str:
+    """Human readable one-line description for dropdowns"""
+    extras = [name for name, present in (('LTO', combination.get('lto')),
+                                         ('ccache', combination.get('ccache'))) if present]
+    suffix = f" ({', '.join(extras)})" if extras else ""
+    return f"{combination['name']} {combination.get('version') or ''} + {combination['linker']}{suffix}"
+
+def toolchain_settings(key: str) -> Tuple[List[str], dict]:
+    """Nuitka arguments and environment variables selecting a probed toolchain"""
+    combination = find_toolchain(key) if key else None
+    if not combination and key:
+        # Not probed on this machine, the key still names compiler and linker
+        path, _, linker = key.partition('|')
+        if not os.path.isfile(path) or linker not in LINKERS:
+            return [], {}
+        family = os.path.basename(path).split('-')[0]
+        combination = {'path': path, 'linker': linker, 'family': family, 'lto': None}
+    if not combination:
+        return [], {}
+    arguments = []
+    # Nuitka takes the compiler from CC and appends LDFLAGS when linking
+    env = {'CC': combination['path']}
+    if combination['family'] == 'clang':
+        arguments.append("--clang")
+    if combination['linker'] != 'bfd':
+        env['LDFLAGS'] = f"-fuse-ld={combination['linker']}"
+    if combination.get('lto') is False:
+        arguments.append("--lto=no")
+    return arguments, env
@@ -0,0 +1,122 @@
+import ast
+import os
+import time
+from typing import Optional, Set
+
+from PyQt6.QtCore import QObject, QFileSystemWatcher, QTimer, pyqtSignal
+
+from src.config import WATCH_DEBOUNCE_MS
+
+def _module_candidates(base_dir: str, module_name: str):
+    """Yield the files a dotted module name can refer to below base_dir"""
+    parts = module_name.split('.')
+    for i in range(1, len(parts) + 1):
+        path = os.path.join(base_dir, *parts[:i])
+        yield path + '.py'
+        yield os.path.join(path, '__init__.py')
+
+def find_local_imports(file_path: str) -> Set[str]:
+    """Return the script and every module it imports from its own directory tree"""
+    file_path = os.path.abspath(file_path)
+    root = os.path.dirname(file_path)
+    found = set()
+    pending = [file_path]
+
+    while pending:
+        current = pending.pop()
+        if current in found:
+            continue
+        found.add(current)
+        try:
+            with open(current, 'r', encoding='utf-8') as f:
+                tree = ast.parse(f.read(), current)
+        except (OSError, SyntaxError, ValueError):
+            # Keep watching broken files, the next save may fix them
+            continue
+
+        current_dir = os.path.dirname(current)
+        for node in ast.walk(tree):
+            names = []
+            if isinstance(node, ast.Import):
+                names = [(root, alias.name) for alias in node.names]
+            elif isinstance(node, ast.ImportFrom):
+                base_dir = root
+                if node.level:
+                    base_dir = current_dir
+                    for _ in range(node.level - 1):
+                        base_dir = os.path.dirname(base_dir)
+                module = node.module or ''
+                prefix = module + '.' if module else ''
+                if module:
+                    names.append((base_dir, module))
+                # "from pkg import mod" may name submodules
+                names.extend((base_dir, prefix + alias.name) for alias in node.names)
+            for base_dir, name in names:
+                for candidate in _module_candidates(base_dir, name):
+                    if os.path.isfile(candidate) and candidate not in found:
+                        pending.append(candidate)
+    return found
+
+class BuildWatcher(QObject):
+    """Watch a script and its local imports and request debounced rebuilds"""
+    rebuild_requested = pyqtSignal()
+
+    def __init__(self, parent=None, debounce_ms: int = WATCH_DEBOUNCE_MS):
+        super().__init__(parent)
+        self.file_path = None
+        self.first_change = None
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self.on_changed)
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(debounce_ms)
+        self.timer.timeout.connect(self.on_settled)
+
+    def watch(self, file_path: str):
+        self.stop()
+        self.file_path = os.path.abspath(file_path)
+        self.refresh_paths()
+
+    def stop(self):
+        self.timer.stop()
+        self.first_change = None
+        files = self.watcher.files()
+        if files:
+            self.watcher.removePaths(files)
+        self.file_path = None
+
+    def is_active(self) -> bool:
+        return self.file_path is not None
+
+    def refresh_paths(self):
+        """Follow imports added or removed since the last build"""
+        wanted = find_local_imports(self.file_path)
+        current = set(self.watcher.files())
+        stale = current - wanted
+        if stale:
+            self.watcher.removePaths(list(stale))
+        # Editors that save by rename drop the old inode from the watch list
+        missing = [p for p in wanted - current if os.path.exists(p)]
+        if missing:
+            self.watcher.addPaths(missing)
+
+    def on_changed(self, path: str):
+        if self.file_path is None:
+            return
+        if self.first_change is None:
+            self.first_change = time.monotonic()
+        if os.path.exists(path) and path not in self.watcher.files():
+            self.watcher.addPath(path)
+        # Restart the debounce interval on every change
+        self.timer.start()
+
+    def on_settled(self):
+        if self.file_path is None:
+            return
+        self.refresh_paths()
+        self.rebuild_requested.emit()
+
+    def take_change_time(self) -> Optional[float]:
+        """Return and clear the time of the first change since the last rebuild"""
+        changed, self.first_change = self.first_change, None
+        return changed
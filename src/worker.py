@@ -0,0 +1,465 @@
+"""Remote build workers.
+
+A worker is a small TCP daemon that accepts a build job (a zip bundle of the
+entry script's directory plus the GUI options), runs NuitkaCompiler.compile
+on it and streams output lines and the zipped artifacts back.
+
+Start a worker with:
+
+    python -m src.worker --host 0.0.0.0 --port 8765 --token SECRET
+
+Messages are JSON objects, one per line, in both directions.
+"""
+import argparse
+import base64
+import hmac
+import io
+import json
+import os
+import select
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+from src.config import DEFAULT_WORKER_PORT
+from src import data_files
+from src.workspaces import BUILD_OPTIONS
+
+# Directories never shipped to a worker
+BUNDLE_EXCLUDED_DIRS = {'.git', '.hg', '.svn', '__pycache__', '.venv', 'venv',
+                        '.tox', '.nox', '.mypy_cache', '.pytest_cache', '.ruff_cache',
+                        '.eggs', 'node_modules'}
+BUNDLE_EXCLUDED_SUFFIXES = ('.build', '.dist', '.onefile-build')
+# Largest compressed bundle a client sends, and the longest message line a
+# worker or client reads. A job line carries the bundle base64 encoded.
+MAX_BUNDLE_SIZE = 256 * 1024 * 1024
+MAX_MESSAGE_SIZE = MAX_BUNDLE_SIZE * 4 // 3 + 1024 * 1024
+ASSETS_DIR = '__remote_assets__'
+ARTIFACT_CHUNK_SIZE = 1024 * 1024
+STATUS_TIMEOUT = 2.0
+
+# Options a worker accepts, anything else (commands, local paths, resource
+# limits, local servers) stays on the client. The worker picks its own
+# interpreter and toolchain.
+REMOTE_OPTIONS = (BUILD_OPTIONS - {'python_exe', 'toolchain'}) | {
+    'remove_output', 'show_progress', 'show_memory', 'early_abort'}
+
+def parse_workers(text: str) -> List[Tuple[str, int]]:
+    """Parse a comma-separated list of host[:port] entries"""
+    workers = []
+    for entry in text.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        host, _, port = entry.rpartition(':')
+        if not host:
+            host, port = port, ''
+        workers.append((host, int(port) if port else DEFAULT_WORKER_PORT))
+    return workers
+
+class MessageTooLarge(ValueError):
+    pass
+
+def _send(sock_file, message: dict):
+    sock_file.write(json.dumps(message).encode('utf-8') + b"\n")
+    sock_file.flush()
+
+def _receive(sock_file) -> Optional[dict]:
+    line = sock_file.readline(MAX_MESSAGE_SIZE + 1)
+    if not line:
+        return None
+    if len(line) > MAX_MESSAGE_SIZE:
+        raise MessageTooLarge(f"Message larger than {MAX_MESSAGE_SIZE // (1024 * 1024)} MB")
+    return json.loads(line)
+
+def _is_excluded_dir(path: str, name: str) -> bool:
+    return (name in BUNDLE_EXCLUDED_DIRS
+            or name.endswith(BUNDLE_EXCLUDED_SUFFIXES)
+            # Virtual environments under any name
+            or os.path.isfile(os.path.join(path, 'pyvenv.cfg')))
+
+def create_bundle(file_path: str, options: dict) -> Tuple[bytes, str, dict]:
+    """Zip the entry script's directory for shipping to a worker.
+
+    Returns the zip data, the entry path inside the bundle and a copy of the
+    options with local file paths rewritten to bundle paths.
+    """
+    file_path = os.path.abspath(file_path)
+    root = os.path.dirname(file_path)
+    output_dir = os.path.abspath(options['output_dir']) if options.get('output_dir') else None
+    remote_options = dict(options)
+
+    buffer = io.BytesIO()
+
+    def check_size():
+        if buffer.tell() > MAX_BUNDLE_SIZE:
+            raise ValueError(
+                f"Project bundle exceeds {MAX_BUNDLE_SIZE // (1024 * 1024)} MB, move large "
+                f"files or environments out of {root} before building remotely")
+
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as bundle:
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [
+                d for d in dirnames
+                if not _is_excluded_dir(os.path.join(dirpath, d), d)
+                and os.path.join(dirpath, d) != output_dir
+            ]
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                bundle.write(path, os.path.relpath(path, root))
+                check_size()
+
+        # Ship referenced files that live outside the project directory
+        icon = options.get('windows_icon_path')
+        if icon and os.path.isfile(icon):
+            icon = os.path.abspath(icon)
+            if os.path.commonpath([icon, root]) == root:
+                arcname = os.path.relpath(icon, root)
+            else:
+                arcname = f"{ASSETS_DIR}/{os.path.basename(icon)}"
+                bundle.write(icon, arcname)
+            remote_options['windows_icon_path'] = arcname
+
+        data_dirs = []
+        for number, entry in enumerate(options.get('data_dirs') or []):
+            source = os.path.abspath(entry['source'])
+            if os.path.commonpath([source, root]) == root:
+                arcname = os.path.relpath(source, root)
+            else:
+                arcname = f"{ASSETS_DIR}/data-{number}"
+                for dirpath, _, filenames in os.walk(source):
+                    for filename in filenames:
+                        path = os.path.join(dirpath, filename)
+                        bundle.write(path, f"{arcname}/{os.path.relpath(path, source)}")
+                        check_size()
+            data_dirs.append(dict(entry, source=arcname,
+                                  target=entry.get('target') or data_files.default_target(source)))
+        if data_dirs:
+            remote_options['data_dirs'] = data_dirs
+    check_size()
+
+    remote_options = {k: v for k, v in remote_options.items() if k in REMOTE_OPTIONS}
+    return buffer.getvalue(), os.path.relpath(file_path, root), remote_options
+
+def _bundle_path(source_dir: str, relative: str) -> str:
+    """Path of a file inside the extracted bundle, refusing anything outside it"""
+    if os.path.isabs(relative) or '..' in relative.replace('\\', '/').split('/'):
+        raise ValueError(f"Path outside the bundle: {relative}")
+    path = os.path.abspath(os.path.join(source_dir, relative))
+    if os.path.commonpath([path, source_dir]) != source_dir:
+        raise ValueError(f"Path outside the bundle: {relative}")
+    return path
+
+class WorkerHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            message = _receive(self.rfile)
+        except MessageTooLarge as e:
+            _send(self.wfile, {'type': 'result', 'success': False,
+                               'error': f"Worker rejected job: {e}"})
+            return
+        except ValueError:
+            return
+        if not message:
+            return
+
+        if message.get('type') == 'status':
+            _send(self.wfile, self.server.status())
+        elif message.get('type') == 'job':
+            if self.server.token and not hmac.compare_digest(
+                    str(message.get('token', '')).encode('utf-8'), self.server.token.encode('utf-8')):
+                _send(self.wfile, {'type': 'result', 'success': False,
+                                   'error': "Worker rejected job: invalid token"})
+                return
+            self.server.run_job(message, self.wfile, self.connection)
+        else:
+            _send(self.wfile, {'type': 'error', 'error': "Unknown request"})
+
+class WorkerServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address, token: str = '', max_jobs: int = 0):
+        super().__init__(address, WorkerHandler)
+        self.token = token
+        self.max_jobs = max_jobs
+        self.active_jobs = 0
+        self.lock = threading.Lock()
+
+    def status(self) -> dict:
+        try:
+            load = os.getloadavg()[0]
+        except (AttributeError, OSError):
+            load = 0.0
+        with self.lock:
+            active = self.active_jobs
+        return {
+            'type': 'status',
+            'active_jobs': active,
+            'max_jobs': self.max_jobs,
+            'cpus': os.cpu_count() or 1,
+            'load': load
+        }
+
+    @staticmethod
+    def _watch_client(connection: socket.socket, cancel_event: threading.Event,
+                      done: threading.Event):
+        """Cancel the build once the client hangs up, also while it prints nothing"""
+        try:
+            while not done.is_set():
+                readable, _, _ = select.select([connection], [], [], 0.5)
+                # Clients send nothing after the job, readable means gone
+                if readable and not connection.recv(4096):
+                    break
+        except (OSError, ValueError):
+            pass
+        if not done.is_set():
+            cancel_event.set()
+
+    def run_job(self, message: dict, wfile, connection: socket.socket):
+        from src.compiler import NuitkaCompiler
+
+        with self.lock:
+            if self.max_jobs and self.active_jobs >= self.max_jobs:
+                _send(wfile, {'type': 'result', 'success': False,
+                              'error': "Worker is busy"})
+                return
+            self.active_jobs += 1
+
+        cancel_event = threading.Event()
+        done = threading.Event()
+        send_lock = threading.Lock()
+        threading.Thread(target=self._watch_client, args=(connection, cancel_event, done),
+                         daemon=True).start()
+
+        def send(msg):
+            # A vanished client cancels its build
+            if cancel_event.is_set():
+                return
+            try:
+                with send_lock:
+                    _send(wfile, msg)
+            except OSError:
+                cancel_event.set()
+
+        try:
+            with tempfile.TemporaryDirectory(prefix='nuitka-worker-') as tmp:
+                source_dir = os.path.join(tmp, 'src')
+                output_dir = os.path.join(tmp, 'out')
+                with zipfile.ZipFile(io.BytesIO(base64.b64decode(message['bundle']))) as bundle:
+                    bundle.extractall(source_dir)
+
+                # Checked here as well, clients are not trusted to filter
+                options = {k: v for k, v in (message.get('options') or {}).items()
+                           if k in REMOTE_OPTIONS}
+                options['output_dir'] = output_dir
+                if options.get('windows_icon_path'):
+                    options['windows_icon_path'] = _bundle_path(source_dir, options['windows_icon_path'])
+                options['data_dirs'] = [dict(entry, source=_bundle_path(source_dir, entry['source']))
+                                        for entry in options.get('data_dirs') or []]
+
+                success, error = NuitkaCompiler.compile(
+                    _bundle_path(source_dir, message['entry']),
+                    options,
+                    lambda text: send({'type': 'output', 'text': text}),
+                    lambda: send({'type': 'progress'}),
+                    cancel_event
+                )
+
+                if success and os.path.isdir(output_dir):
+                    self.send_artifacts(output_dir, send)
+                send({'type': 'result', 'success': success, 'error': error})
+        except Exception as e:
+            send({'type': 'result', 'success': False, 'error': f"Worker error: {str(e)}"})
+        finally:
+            done.set()
+            with self.lock:
+                self.active_jobs -= 1
+
+    @staticmethod
+    def send_artifacts(output_dir: str, send: Callable[[dict], None]):
+        """Zip the build results (without intermediate build dirs) and stream them"""
+        with tempfile.TemporaryFile() as archive:
+            with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as artifacts:
+                for dirpath, dirnames, filenames in os.walk(output_dir):
+                    dirnames[:] = [d for d in dirnames if not d.endswith(('.build', '.onefile-build'))]
+                    for filename in filenames:
+                        path = os.path.join(dirpath, filename)
+                        artifacts.write(path, os.path.relpath(path, output_dir))
+            archive.seek(0)
+            while True:
+                chunk = archive.read(ARTIFACT_CHUNK_SIZE)
+                if not chunk:
+                    break
+                send({'type': 'artifact', 'data': base64.b64encode(chunk).decode('ascii')})
+
+class RemoteCompiler:
+    @staticmethod
+    def query_status(host: str, port: int) -> Optional[dict]:
+        """Ask a worker for its load, returning None if it is unreachable"""
+        try:
+            with socket.create_connection((host, port), timeout=STATUS_TIMEOUT) as sock:
+                with sock.makefile('rwb') as sock_file:
+                    _send(sock_file, {'type': 'status'})
+                    return _receive(sock_file)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def pick_worker(workers: List[Tuple[str, int]]) -> Optional[Tuple[str, int, dict]]:
+        """Return the least-loaded reachable worker"""
+        if not workers:
+            return None
+        with ThreadPoolExecutor(max_workers=len(workers)) as pool:
+            statuses = list(pool.map(lambda w: RemoteCompiler.query_status(*w), workers))
+
+        candidates = []
+        for (host, port), status in zip(workers, statuses):
+            if not status:
+                continue
+            if status.get('max_jobs') and status['active_jobs'] >= status['max_jobs']:
+                continue
+            cpus = max(1, status.get('cpus', 1))
+            # Running jobs dominate, system load breaks ties
+            score = (status['active_jobs'] / cpus, status.get('load', 0.0) / cpus)
+            candidates.append((score, host, port, status))
+        if not candidates:
+            return None
+        _, host, port, status = min(candidates)
+        return host, port, status
+
+    @staticmethod
+    def compile(
+        file_path: str,
+        options: dict,
+        output_callback: Callable[[str], None],
+        progress_callback: Callable[[], None],
+        cancel_event: Optional[threading.Event] = None
+    ) -> tuple[bool, str]:
+        """
+        Compile the Python file on the least-loaded configured worker.
+        Setting cancel_event drops the connection, which stops the remote build.
+        """
+        try:
+            if not os.path.exists(file_path):
+                return False, f"File not found: {file_path}"
+
+            workers = parse_workers(options.get('remote_workers', ''))
+            picked = RemoteCompiler.pick_worker(workers)
+            if not picked:
+                return False, "No build worker is reachable"
+            host, port, status = picked
+            output_callback(f"Using build worker {host}:{port} "
+                            f"({status['active_jobs']} active jobs, load {status.get('load', 0.0):.2f})\n")
+
+            bundle, entry, remote_options = create_bundle(file_path, options)
+            output_dir = options.get('output_dir') or os.path.dirname(os.path.abspath(file_path))
+            os.makedirs(output_dir, exist_ok=True)
+
+            with socket.create_connection((host, port)) as sock:
+                done = threading.Event()
+                if cancel_event:
+                    threading.Thread(
+                        target=RemoteCompiler._disconnect_on_cancel,
+                        args=(sock, cancel_event, done),
+                        daemon=True
+                    ).start()
+                try:
+                    result = RemoteCompiler._run_job(
+                        sock, bundle, entry, remote_options, output_dir,
+                        output_callback, progress_callback
+                    )
+                finally:
+                    done.set()
+
+            if cancel_event and cancel_event.is_set():
+                output_callback("\nCompilation cancelled\n")
+                return False, "Compilation cancelled"
+            return result
+
+        except Exception as e:
+            error_msg = f"Remote compilation error: {str(e)}"
+            output_callback("\n" + error_msg + "\n")
+            return False, error_msg
+
+    @staticmethod
+    def _disconnect_on_cancel(sock: socket.socket, cancel_event: threading.Event,
+                              done: threading.Event):
+        while not done.is_set():
+            if cancel_event.wait(0.2):
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+                return
+
+    @staticmethod
+    def _run_job(sock, bundle, entry, remote_options, output_dir,
+                 output_callback, progress_callback) -> tuple[bool, str]:
+        """Send one job over an open connection and collect its results"""
+        with sock.makefile('rwb') as sock_file:
+            _send(sock_file, {
+                'type': 'job',
+                'token': os.environ.get('NUITKA_GUI_WORKER_TOKEN', ''),
+                'entry': entry,
+                'bundle': base64.b64encode(bundle).decode('ascii'),
+                'options': remote_options
+            })
+
+            with tempfile.TemporaryFile() as archive:
+                while True:
+                    message = _receive(sock_file)
+                    if message is None:
+                        return False, "Connection to build worker lost"
+                    kind = message.get('type')
+                    if kind == 'output':
+                        output_callback(message['text'])
+                    elif kind == 'progress':
+                        progress_callback()
+                    elif kind == 'artifact':
+                        archive.write(base64.b64decode(message['data']))
+                    elif kind == 'result':
+                        break
+
+                if message['success'] and archive.tell():
+                    archive.seek(0)
+                    with zipfile.ZipFile(archive) as artifacts:
+                        artifacts.extractall(output_dir)
+                        # zipfile drops permission bits, restore them for
+                        # the files it actually wrote below output_dir
+                        root = os.path.realpath(output_dir)
+                        for info in artifacts.infolist():
+                            mode = info.external_attr >> 16
+                            target = os.path.realpath(os.path.join(root, info.filename))
+                            if not mode or os.path.commonpath([target, root]) != root:
+                                continue
+                            os.chmod(target, mode & 0o777)
+                    output_callback(f"\nArtifacts copied to: {output_dir}\n")
+
+        return message['success'], message.get('error', '')
+
+def main():
+    parser = argparse.ArgumentParser(description="Nuitka GUI remote build worker")
+    parser.add_argument('--host', default='127.0.0.1',
+                        help="Address to listen on (default: localhost only)")
+    parser.add_argument('--port', type=int, default=DEFAULT_WORKER_PORT)
+    parser.add_argument('--token', default=os.environ.get('NUITKA_GUI_WORKER_TOKEN', ''),
+                        help="Shared secret clients must send with each job")
+    parser.add_argument('--max-jobs', type=int, default=0,
+                        help="Reject jobs above this many concurrent builds (0 = unlimited)")
+    args = parser.parse_args()
+
+    with WorkerServer((args.host, args.port), args.token, args.max_jobs) as server:
+        print(f"Build worker listening on {args.host}:{args.port}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+if __name__ == "__main__":
+    main()
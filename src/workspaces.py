@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Optional
+
+from src.config import WORKSPACE_DIR, WORKSPACE_BUDGET_BYTES
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+INDEX_FILE = "index.json"
+# Held shared by every build using a workspace, eviction needs it exclusive
+LOCK_SUFFIX = ".lock"
+
+# Options that change Nuitka's command line, or the interpreter and C
+# compiler it runs with. Everything else leaves the build itself alone.
+BUILD_OPTIONS = {'standalone', 'onefile', 'onefile_compression', 'onefile_cached',
+                 'onefile_tempdir_spec', 'follow_imports', 'windows_icon_path',
+                 'company_name', 'product_name', 'file_version', 'python_flag',
+                 'enable_console', 'windows_uac_admin', 'windows_uac_uiaccess',
+                 'include_package', 'include_module', 'data_dirs', 'use_pgo', 'pgo_args',
+                 'build_name', 'c_compiler', 'toolchain', 'python_exe'}
+
+def directory_size(path: Path) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, filename)).st_size
+            except OSError:
+                pass
+    return total
+
+class Workspace:
+    def __init__(self, key: str, path: Path, reused: bool, lock_file=None):
+        self.key = key
+        self.path = path
+        self.reused = reused
+        self.started = time.monotonic()
+        self.lock_file = lock_file
+
+    def release(self):
+        """Let other GUI instances evict this workspace again"""
+        if self.lock_file:
+            self.lock_file.close()
+            self.lock_file = None
+
+class WorkspaceManager:
+    """Persistent per-project, per-option-set build directories with an LRU disk budget"""
+    def __init__(self, root: Optional[Path] = None, budget_bytes: int = WORKSPACE_BUDGET_BYTES):
+        self.root = Path(root or WORKSPACE_DIR)
+        self.budget_bytes = budget_bytes
+        self.index_path = self.root / INDEX_FILE
+
+    def load_index(self) -> dict:
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_index(self, index: dict):
+        self.root.mkdir(parents=True, exist_ok=True)
+        # Replace atomically, several GUI instances may share the index
+        tmp_path = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=4)
+        os.replace(tmp_path, self.index_path)
+
+    @staticmethod
+    def key_for(file_path: str, options: dict) -> str:
+        relevant = {k: v for k, v in options.items() if k in BUILD_OPTIONS}
+        payload = json.dumps({'file': os.path.abspath(file_path), 'options': relevant},
+                             sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+    def _lock_path(self, key: str) -> Path:
+        return self.root / f"{key}{LOCK_SUFFIX}"
+
+    def _lock_in_use(self, key: str):
+        """Hold the workspace's lock shared for the length of a build"""
+        if fcntl is None:
+            return None
+        self.root.mkdir(parents=True, exist_ok=True)
+        while True:
+            lock_file = open(self._lock_path(key), 'a')
+            fcntl.flock(lock_file, fcntl.LOCK_SH)
+            # Eviction unlinks the lock file, retry if we locked a stale one
+            try:
+                if os.stat(self._lock_path(key)).st_ino == os.fstat(lock_file.fileno()).st_ino:
+                    return lock_file
+            except OSError:
+                pass
+            lock_file.close()
+
+    def _lock_for_eviction(self, key: str):
+        """Exclusive lock on an idle workspace, None while a build uses it"""
+        if fcntl is None:
+            return open(os.devnull)
+        try:
+            lock_file = open(self._lock_path(key), 'a')
+        except OSError:
+            return None
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return None
+        return lock_file
+
+    def acquire(self, file_path: str, options: dict) -> Workspace:
+        """Get the build directory for this script and option set.
+
+        The workspace stays locked against eviction until release().
+        """
+        key = self.key_for(file_path, options)
+        path = self.root / key
+        lock_file = self._lock_in_use(key)
+        index = self.load_index()
+        entry = index.get(key)
+        reused = entry is not None and path.is_dir() and bool(entry.get('cold_duration'))
+
+        path.mkdir(parents=True, exist_ok=True)
+        if entry is None or not path.is_dir():
+            entry = {'file_path': os.path.abspath(file_path), 'created': time.time()}
+        entry['last_used'] = time.time()
+        index[key] = entry
+        self.save_index(index)
+        return Workspace(key, path, reused, lock_file)
+
+    def publish(self, workspace: Workspace, target_dir: str):
+        """Copy build results, but not the intermediate .build directories, to target_dir"""
+        os.makedirs(target_dir, exist_ok=True)
+        for entry in os.scandir(workspace.path):
+            if entry.name.endswith(('.build', '.onefile-build')):
+                continue
+            target = os.path.join(target_dir, entry.name)
+            if entry.is_dir(follow_symlinks=False):
+                # Drop files a previous build left behind
+                if os.path.isdir(target):
+                    shutil.rmtree(target)
+                shutil.copytree(entry.path, target, symlinks=True)
+            else:
+                shutil.copy2(entry.path, target)
+
+    def finish(self, workspace: Workspace, success: bool) -> str:
+        """Record the build time, enforce the budget and describe the reuse gain"""
+        duration = time.monotonic() - workspace.started
+        index = self.load_index()
+        entry = index.setdefault(workspace.key, {'created': time.time()})
+        entry['last_used'] = time.time()
+        entry['size'] = directory_size(workspace.path)
+
+        report = ""
+        if success:
+            cold = entry.get('cold_duration')
+            if workspace.reused and cold:
+                entry['last_warm_duration'] = duration
+                report = (f"Reused build workspace: {duration:.1f}s vs {cold:.1f}s cold "
+                          f"({cold / duration:.1f}x faster)")
+            else:
+                entry['cold_duration'] = duration
+                report = f"Cold build in new workspace: {duration:.1f}s"
+        index[workspace.key] = entry
+
+        evicted = self.enforce_budget(index, keep=workspace.key)
+        self.save_index(index)
+        if evicted:
+            report += f"\nEvicted {len(evicted)} least recently used workspace(s) to stay within budget"
+        return report
+
+    def enforce_budget(self, index: dict, keep: Optional[str] = None) -> list:
+        """Delete least recently used workspaces until the total fits the budget.
+
+        Workspaces another build currently holds are left alone.
+        """
+        total = sum(entry.get('size', 0) for entry in index.values())
+        evicted = []
+        for key in sorted(index, key=lambda k: index[k].get('last_used', 0)):
+            if total <= self.budget_bytes:
+                break
+            if key == keep:
+                continue
+            lock_file = self._lock_for_eviction(key)
+            if lock_file is None:
+                continue
+            with lock_file:
+                shutil.rmtree(self.root / key, ignore_errors=True)
+                if fcntl is not None:
+                    try:
+                        self._lock_path(key).unlink()
+                    except OSError:
+                        pass
+            total -= index[key].get('size', 0)
+            del index[key]
+            evicted.append(key)
+        return evicted